@@ -0,0 +1,54 @@
+"""Shared registry of the names Cricbuzz uses for teams and franchise leagues.
+
+Series matching (scraper.compile_series_matcher) and team scraping both read
+from here, so supporting a new associate nation or league means adding one
+entry below rather than editing the scrapers.
+
+TEAMS is keyed by the lowercase name as it appears in series names; aliases
+are the lowercase fragments that identify the team in match slugs and titles.
+LEAGUES maps a league's name in series names to the markers its match URLs carry.
+"""
+TEAMS = {
+    'india': {'short_name': 'IND', 'aliases': ('ind', 'india', 'indian'), 'color': '#FF9933'},
+    'new zealand': {'short_name': 'NZ', 'aliases': ('nz', 'new-zealand', 'newzealand'), 'color': '#000000'},
+    'australia': {'short_name': 'AUS', 'aliases': ('aus', 'australia', 'australian'), 'color': '#FFCD00'},
+    'england': {'short_name': 'ENG', 'aliases': ('eng', 'england', 'english'), 'color': '#002366'},
+    'pakistan': {'short_name': 'PAK', 'aliases': ('pak', 'pakistan'), 'color': '#01411C'},
+    'south africa': {'short_name': 'SA', 'aliases': ('sa', 'south-africa', 'southafrica'), 'color': '#007A4D'},
+    'sri lanka': {'short_name': 'SL', 'aliases': ('sl', 'sri-lanka', 'srilanka'), 'color': '#0033A0'},
+    'bangladesh': {'short_name': 'BAN', 'aliases': ('ban', 'bangladesh'), 'color': '#006A4E'},
+    'west indies': {'short_name': 'WI', 'aliases': ('wi', 'west-indies', 'westindies', 'windies'), 'color': '#7B0041'},
+    'afghanistan': {'short_name': 'AFG', 'aliases': ('afg', 'afghanistan'), 'color': '#000000'},
+    'zimbabwe': {'short_name': 'ZIM', 'aliases': ('zim', 'zimbabwe'), 'color': '#FCE300'},
+    'ireland': {'short_name': 'IRE', 'aliases': ('ire', 'ireland'), 'color': '#169B62'},
+    'uae': {'short_name': 'UAE', 'aliases': ('uae', 'emirates')},
+    'usa': {'short_name': 'USA', 'aliases': ('usa', 'united-states')},
+    'nepal': {'short_name': 'NEP', 'aliases': ('nep', 'nepal'), 'color': '#DC143C'},
+    'namibia': {'short_name': 'NAM', 'aliases': ('nam', 'namibia')},
+    'netherlands': {'short_name': 'NED', 'aliases': ('ned', 'netherlands', 'dutch'), 'color': '#FF6600'},
+    'scotland': {'short_name': 'SCO', 'aliases': ('sco', 'scotland'), 'color': '#0065BF'},
+    'oman': {'short_name': 'OMA', 'aliases': ('oman',)},
+    'canada': {'short_name': 'CAN', 'aliases': ('can', 'canada')},
+}
+
+LEAGUES = {
+    'big bash': ('bbl',),
+    'ipl': ('ipl', 'indian-premier-league'),
+    'psl': ('psl', 'pakistan-super-league'),
+    'cpl': ('cpl', 'caribbean-premier-league'),
+    'sa20': ('sa20',),
+    'wpl': ('wpl', 'womens-premier-league'),
+    'hundred': ('hundred',),
+}
+
+# Series name fragments that mark a franchise league, including leagues without URL markers above
+FRANCHISE_NAMES = tuple(LEAGUES) + ('bbl', 'bpl', 't20 league', 'major league')
+
+DEFAULT_COLOR = '#046A38'
+
+_BY_SLUG = {name.replace(' ', '-'): team for name, team in TEAMS.items()}
+
+
+def team_for_slug(slug):
+    """Registry entry for a Cricbuzz team slug like 'new-zealand', or None"""
+    return _BY_SLUG.get((slug or '').lower())
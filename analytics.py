@@ -0,0 +1,123 @@
+"""Projected totals, required rates and win probability for matches in play.
+
+refresh() runs once per lifecycle tick. It reads the latest point of every
+innings in score_progression for all matches in play with a single query,
+works out the numbers for all of them in one pass, and caches each match's
+result in scorecards.analytics, where /api/live-matches picks it up. Viewers
+therefore read a stored value instead of recomputing it on every request.
+
+The model is deliberately simple: the batting side keeps scoring at its
+current rate, scaled down as wickets fall, and the chase estimate turns the
+gap between those expected runs and the runs needed into a probability.
+"""
+import json
+import math
+
+from psycopg2.extras import execute_values
+
+import results
+import standings
+
+# Overs faced before the current run rate is trusted over the target's par rate
+SETTLE_BALLS = 18
+# Runs expected from the remaining balls shrink with the wickets in hand
+WICKET_EXPONENT = 0.6
+
+
+def _rate(runs, balls):
+    return runs * 6.0 / balls if balls else None
+
+
+def _expected_runs(rate, balls_left, wickets_in_hand):
+    return rate / 6.0 * balls_left * (wickets_in_hand / 10.0) ** WICKET_EXPONENT
+
+
+def _chase_probability(need, balls_left, wickets_in_hand, rate, target):
+    if need <= 0:
+        return 1.0
+    if balls_left <= 0 or wickets_in_hand <= 0:
+        return 0.0
+    margin = _expected_runs(rate, balls_left, wickets_in_hand) - need
+    scale = max(8.0, 0.1 * target)
+    return 1.0 / (1.0 + math.exp(-margin / scale))
+
+
+def project(match):
+    """Analytics for one match: {'match_format', 'innings' (latest point per recorded innings, by innings number)}"""
+    innings = match['innings']
+    current = innings[-1]
+    number = current['innings']
+    crr = _rate(current['runs'], current['balls'])
+    analytics = {
+        'innings': number,
+        'batting_team': current['team'],
+        'current_run_rate': round(crr, 2) if crr is not None else None
+    }
+    quota = standings.QUOTA_BALLS.get(match['match_format'])
+    # Tests can be drawn and super overs have their own quota, so only regular limited-overs innings are projected
+    if not quota or number > 2:
+        return analytics
+
+    wickets_in_hand = max(10 - current['wickets'], 0)
+    balls_left = max(quota - current['balls'], 0) if wickets_in_hand else 0
+    if number == 1:
+        rate = crr or 0.0
+        analytics['projected_score'] = round(current['runs'] + _expected_runs(rate, balls_left, wickets_in_hand))
+        return analytics
+
+    first = innings[0]
+    if first['innings'] != 1:
+        # The first innings was never recorded, so there is no target to chase
+        return analytics
+    target = first['runs'] + 1
+    need = target - current['runs']
+    par = _rate(target, quota)
+    rate = crr if crr is not None and current['balls'] >= SETTLE_BALLS else par
+    chase = _chase_probability(need, balls_left, wickets_in_hand, rate, target)
+    analytics.update({
+        'target': target,
+        'runs_needed': max(need, 0),
+        'balls_remaining': balls_left,
+        'required_run_rate': round(_rate(need, balls_left), 2) if need > 0 and balls_left else None,
+        'win_probability': {current['team']: round(chase * 100), first['team']: round((1 - chase) * 100)}
+    })
+    return analytics
+
+
+def refresh(cur):
+    """Recompute and cache analytics for every match in play. Runs in the caller's transaction"""
+    cur.execute('''
+        SELECT sp.match_id, sp.innings, sp.team,
+               sp.balls[cardinality(sp.balls)] AS balls,
+               sp.runs[cardinality(sp.runs)] AS runs,
+               sp.wickets[cardinality(sp.wickets)] AS wickets,
+               sc.match_title, m.match_title AS fixture_title, m.match_format, s.series_name
+        FROM scorecards sc
+        JOIN score_progression sp ON sp.match_id = sc.match_id
+        LEFT JOIN LATERAL (
+            SELECT match_title, match_format, series_id FROM matches WHERE match_id::text = sc.match_id LIMIT 1
+        ) m ON TRUE
+        LEFT JOIN series s ON s.id = m.series_id
+        WHERE sc.is_live IS TRUE
+        ORDER BY sp.match_id, sp.innings
+    ''')
+    matches = {}
+    for row in cur.fetchall():
+        match = matches.get(row['match_id'])
+        if match is None:
+            title = row['fixture_title'] or row['match_title']
+            match = matches[row['match_id']] = {
+                'match_format': results.match_format(title, row['series_name'], row['match_format']),
+                'innings': []
+            }
+        match['innings'].append(row)
+
+    if matches:
+        execute_values(cur, '''
+            UPDATE scorecards sc SET analytics = v.analytics::jsonb
+            FROM (VALUES %s) AS v (match_id, analytics)
+            WHERE sc.match_id = v.match_id
+        ''', [(match_id, json.dumps(dict(project(match), match_format=match['match_format'])))
+              for match_id, match in matches.items()])
+    cur.execute('UPDATE scorecards SET analytics = NULL WHERE analytics IS NOT NULL AND is_live IS NOT TRUE')
+    return len(matches)
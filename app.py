@@ -1,23 +1,53 @@
 import os
+import base64
+import hmac
 import re
-import uuid
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
+import threading
+import time
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash, g, send_from_directory, abort
 from functools import wraps
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from dotenv import load_dotenv
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_ERROR, EVENT_JOB_MISSED
 
+# Before the local modules below, several of which read their settings from the environment at import
 load_dotenv()
 
+from scraper import parse_match_date
+import assets
+import autocomplete
+import commentary
+import compression
+import images
+import jobs
+import json_provider
+import leaderboards
+import lifecycle
+import metrics
+import mirror
+import progression
+import ratelimit
+import results
+import search
+import sprites
+import standings
+
 scheduler_started = False
 scheduler = None
 live_scrape_job_id = 'auto_scrape_live_scores'
+# Postgres advisory lock held by the one process per deployment that runs the scheduler
+SCHEDULER_LOCK_ID = 7283014
+SCHEDULER_LOCK_RETRY = 60
+scheduler_leader_pid = None
 
 def auto_scrape_live_scores():
     """Background job to automatically scrape live scores"""
+    if ratelimit.is_paused():
+        print("Auto scrape skipped: Cricbuzz requests paused after repeated failures")
+        return
     try:
         from scraper import scrape_live_scores
         result = scrape_live_scores()
@@ -64,53 +94,48 @@ def update_auto_scrape_job(enabled, interval_seconds):
         print("Auto scrape disabled")
 
 def refresh_live_matches():
-    """Background job to refresh live match scores"""
+    """Background job to advance in-play, due and just-finished matches through their lifecycle"""
+    if ratelimit.is_paused():
+        print("Live match refresh skipped: Cricbuzz requests paused after repeated failures")
+        return
     try:
-        from scraper import scrape_scorecard
-        
-        with psycopg2.connect(os.environ.get('DATABASE_URL'), cursor_factory=RealDictCursor) as conn:
-            with conn.cursor() as cur:
-                cur.execute('''
-                    SELECT sc.match_id, m.match_url 
-                    FROM scorecards sc
-                    LEFT JOIN matches m ON sc.match_id::text = m.match_id::text
-                    WHERE sc.is_live = TRUE
-                ''')
-                live_matches = cur.fetchall()
-                
-                for match in live_matches:
-                    match_url = match.get('match_url')
-                    if match_url:
-                        scorecard_url = match_url.replace('/live-cricket-scores/', '/live-cricket-scorecard/')
-                        if '/cricket-match/' in match_url:
-                            scorecard_url = f"https://www.cricbuzz.com/live-cricket-scorecard/{match.get('match_id')}"
-                        
-                        result = scrape_scorecard(scorecard_url)
-                        
-                        if result.get('success'):
-                            is_live = result.get('is_live', False)
-                            final_score = result.get('final_score', '')
-                            status_text = result.get('status_text', '')
-                            
-                            cur.execute('''
-                                UPDATE scorecards 
-                                SET scorecard_html = %s, 
-                                    final_score = %s, 
-                                    match_status = %s,
-                                    is_live = %s, 
-                                    last_updated = CURRENT_TIMESTAMP
-                                WHERE match_id = %s
-                            ''', (result['html'], final_score, status_text, is_live, match.get('match_id')))
-                        else:
-                            cur.execute('''
-                                UPDATE scorecards SET is_live = FALSE WHERE match_id = %s
-                            ''', (match.get('match_id'),))
-                
-                conn.commit()
-                print(f"Refreshed {len(live_matches)} live matches")
+        result = lifecycle.refresh_matches()
+        print(result['message'])
     except Exception as e:
         print(f"Error refreshing live matches: {e}")
 
+def ingest_commentary():
+    """Background job to append new ball-by-ball commentary for matches in play"""
+    try:
+        result = commentary.ingest_live()
+        if result.get('count'):
+            print(result['message'])
+    except Exception as e:
+        print(f"Commentary ingest error: {e}")
+
+def mirror_remote_images():
+    """Background job to download newly scraped team flags and player headshots"""
+    if ratelimit.is_paused():
+        return
+    try:
+        result = mirror.mirror_pending()
+        if result.get('mirrored'):
+            sprites.build_flag_sprite()
+    except Exception as e:
+        print(f"Image mirror error: {e}")
+
+def record_scheduler_event(event):
+    """Scheduler listener feeding job lag, errors and missed runs into /metrics"""
+    from datetime import datetime
+    if event.code == EVENT_JOB_SUBMITTED:
+        for run_time in event.scheduled_run_times:
+            lag = (datetime.now(run_time.tzinfo) - run_time).total_seconds()
+            metrics.SCHEDULER_JOB_LAG.observe(max(lag, 0), job=event.job_id)
+    elif event.code == EVENT_JOB_ERROR:
+        metrics.SCHEDULER_JOB_EVENTS.inc(job=event.job_id, event='error')
+    elif event.code == EVENT_JOB_MISSED:
+        metrics.SCHEDULER_JOB_EVENTS.inc(job=event.job_id, event='missed')
+
 def start_scheduler():
     global scheduler_started, scheduler
     if scheduler_started:
@@ -119,14 +144,74 @@ def start_scheduler():
     import atexit
     
     scheduler = BackgroundScheduler()
+    scheduler.add_listener(record_scheduler_event, EVENT_JOB_SUBMITTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED)
     scheduler.start()
     scheduler_started = True
+    scheduler.add_job(func=refresh_live_matches, trigger="interval", seconds=60, id='refresh_live_matches', replace_existing=True)
+    scheduler.add_job(func=ingest_commentary, trigger="interval", seconds=commentary.POLL_INTERVAL, id='ingest_commentary', replace_existing=True)
+    scheduler.add_job(func=mirror_remote_images, trigger="interval", seconds=300, id='mirror_remote_images', replace_existing=True)
+    scheduler.add_job(func=sync_auto_scrape_job, trigger="interval", seconds=60, id='sync_auto_scrape_job', replace_existing=True)
     
     settings = get_auto_scrape_settings()
     if settings['enabled']:
         update_auto_scrape_job(True, settings['interval'])
     
-    atexit.register(lambda: scheduler.shutdown(wait=False))
+    atexit.register(stop_scheduler)
+
+def stop_scheduler():
+    global scheduler_started, scheduler
+    if scheduler is not None:
+        scheduler.shutdown(wait=False)
+    scheduler = None
+    scheduler_started = False
+
+def sync_auto_scrape_job():
+    """Apply auto scrape settings saved through another worker to the scheduler"""
+    if scheduler is None:
+        return
+    settings = get_auto_scrape_settings()
+    job = scheduler.get_job(live_scrape_job_id)
+    current = job.trigger.interval.total_seconds() if job else None
+    wanted = settings['interval'] if settings['enabled'] and settings['interval'] >= 10 else None
+    if current != wanted:
+        update_auto_scrape_job(settings['enabled'], settings['interval'])
+
+def run_scheduler_when_leader():
+    """Wait for the scheduler lock, then run the scheduler for as long as the lock's connection lives"""
+    while True:
+        conn = None
+        try:
+            conn = get_db()
+            conn.autocommit = True
+            cur = conn.cursor()
+            cur.execute('SELECT pg_try_advisory_lock(%s) AS locked', (SCHEDULER_LOCK_ID,))
+            if cur.fetchone()['locked']:
+                print(f"Scheduler started in process {os.getpid()}")
+                start_scheduler()
+                # The lock goes with the connection, so stop scheduling as soon as it breaks
+                while True:
+                    time.sleep(SCHEDULER_LOCK_RETRY)
+                    cur.execute('SELECT 1')
+        except Exception as e:
+            print(f"Scheduler lock error: {e}")
+        finally:
+            if scheduler_started:
+                stop_scheduler()
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        time.sleep(SCHEDULER_LOCK_RETRY)
+
+def start_scheduler_leader():
+    """Run the scheduler in one process per deployment; other processes stand by and take over if it exits"""
+    global scheduler_leader_pid
+    pid = os.getpid()
+    if scheduler_leader_pid == pid:
+        return
+    scheduler_leader_pid = pid
+    threading.Thread(target=run_scheduler_when_leader, name='scheduler-leader', daemon=True).start()
 
 def slugify(text):
     if not text:
@@ -139,11 +224,18 @@ def slugify(text):
     return text[:200]
 
 app = Flask(__name__)
+app.json = json_provider.FastJSONProvider(app)
+# Registered first so its after_request hook runs last, on the final response body
+compression.init_app(app)
 app.secret_key = os.environ.get('SESSION_SECRET', 'dev-secret-key')
 
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
+UPLOAD_FOLDER = images.UPLOAD_FOLDER
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.jinja_env.globals['picture'] = images.picture_tag
+app.jinja_env.filters['mirrored'] = mirror.local_url
+app.jinja_env.globals['flag_sprite_css'] = sprites.stylesheet_url
+assets.init_app(app)
 
 @app.context_processor
 def inject_nav_categories():
@@ -159,6 +251,29 @@ def inject_nav_categories():
         return dict(nav_categories=[])
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+        metrics.HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+def metrics_access_allowed():
+    """Allow /metrics with the METRICS_TOKEN bearer token, or from a direct (non-proxied) local address"""
+    token = os.environ.get('METRICS_TOKEN')
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if request.headers.get('X-Forwarded-For') or request.headers.get('X-Real-IP'):
+        return False
+    allowed_ips = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+    return request.remote_addr in [ip.strip() for ip in allowed_ips]
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -192,7 +307,8 @@ def get_nav_categories():
     return categories
 
 def get_db():
-    return psycopg2.connect(os.environ.get('DATABASE_URL'), cursor_factory=RealDictCursor)
+    with metrics.DB_CONNECT_SECONDS.time():
+        return psycopg2.connect(os.environ.get('DATABASE_URL'), connection_factory=metrics.InstrumentedConnection, cursor_factory=RealDictCursor)
 
 def get_sidebar_data():
     conn = get_db()
@@ -379,14 +495,297 @@ def init_db():
         )
     ''')
     
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS scrape_jobs (
+            id SERIAL PRIMARY KEY,
+            job_type VARCHAR(50) NOT NULL,
+            params TEXT,
+            dedup_key TEXT NOT NULL,
+            status VARCHAR(20) DEFAULT 'queued',
+            progress INTEGER DEFAULT 0,
+            progress_total INTEGER,
+            message TEXT,
+            result TEXT,
+            cancel_requested BOOLEAN DEFAULT FALSE,
+            worker VARCHAR(100),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            heartbeat_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_scrape_jobs_active_dedup ON scrape_jobs (dedup_key) WHERE status IN ('queued', 'running')")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_scrape_jobs_queued ON scrape_jobs (id) WHERE status = 'queued'")
+    
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS mirrored_images (
+            source_url TEXT PRIMARY KEY,
+            status VARCHAR(20) DEFAULT 'pending',
+            filename VARCHAR(80),
+            attempts INTEGER DEFAULT 0,
+            error TEXT,
+            claimed_at TIMESTAMP,
+            fetched_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_mirrored_images_pending ON mirrored_images (created_at) WHERE status <> 'ok'")
+    
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS uploaded_images (
+            id SERIAL PRIMARY KEY,
+            url VARCHAR(500) UNIQUE NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            variants TEXT,
+            content_hash VARCHAR(64),
+            last_uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS match_results (
+            match_id VARCHAR(50) PRIMARY KEY,
+            series_id INTEGER,
+            team1 VARCHAR(100) NOT NULL,
+            team2 VARCHAR(100) NOT NULL,
+            winner VARCHAR(100),
+            result_type VARCHAR(20) NOT NULL,
+            margin VARCHAR(50),
+            match_format VARCHAR(20),
+            venue TEXT,
+            match_date DATE,
+            innings JSONB DEFAULT '[]',
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_match_results_series ON match_results (series_id)')
+    
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS player_stats (
+            player_id INTEGER NOT NULL REFERENCES players(id) ON DELETE CASCADE,
+            format VARCHAR(20) NOT NULL,
+            matches INTEGER,
+            innings INTEGER,
+            not_outs INTEGER,
+            runs INTEGER,
+            balls_faced INTEGER,
+            fours INTEGER,
+            sixes INTEGER,
+            fifties INTEGER,
+            hundreds INTEGER,
+            ducks INTEGER,
+            bowling_innings INTEGER,
+            balls_bowled INTEGER,
+            runs_conceded INTEGER,
+            wickets INTEGER,
+            maidens INTEGER,
+            five_wickets INTEGER,
+            ten_wickets INTEGER,
+            PRIMARY KEY (player_id, format)
+        )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_player_stats_format ON player_stats (format)')
+    
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS series_standings (
+            series_id INTEGER NOT NULL,
+            team VARCHAR(100) NOT NULL,
+            played INTEGER DEFAULT 0,
+            won INTEGER DEFAULT 0,
+            lost INTEGER DEFAULT 0,
+            tied INTEGER DEFAULT 0,
+            drawn INTEGER DEFAULT 0,
+            no_result INTEGER DEFAULT 0,
+            points INTEGER DEFAULT 0,
+            runs_for INTEGER DEFAULT 0,
+            balls_for INTEGER DEFAULT 0,
+            runs_against INTEGER DEFAULT 0,
+            balls_against INTEGER DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (series_id, team)
+        )
+    ''')
+    
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS commentary (
+            id BIGSERIAL PRIMARY KEY,
+            match_id VARCHAR(50) NOT NULL,
+            ts BIGINT NOT NULL,
+            innings SMALLINT,
+            over_number NUMERIC(5, 1),
+            event VARCHAR(20),
+            text TEXT NOT NULL,
+            UNIQUE (match_id, ts)
+        )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_commentary_match ON commentary (match_id, id)')
+    
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS commentary_cursors (
+            match_id VARCHAR(50) PRIMARY KEY,
+            last_ts BIGINT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS score_progression (
+            match_id VARCHAR(50) NOT NULL,
+            innings SMALLINT NOT NULL,
+            team VARCHAR(100),
+            balls SMALLINT[] NOT NULL,
+            runs SMALLINT[] NOT NULL,
+            wickets SMALLINT[] NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (match_id, innings)
+        )
+    ''')
+    
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS head_to_head (
+            team_a VARCHAR(100) NOT NULL,
+            team_b VARCHAR(100) NOT NULL,
+            stats JSONB NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (team_a, team_b)
+        )
+    ''')
+    
     try:
         cur.execute('ALTER TABLE teams ADD COLUMN IF NOT EXISTS team_type VARCHAR(50) DEFAULT \'international\'')
         cur.execute('ALTER TABLE teams ADD COLUMN IF NOT EXISTS flag_url TEXT')
         cur.execute('ALTER TABLE teams ADD COLUMN IF NOT EXISTS cricbuzz_team_id VARCHAR(20)')
+        cur.execute('ALTER TABLE players ADD COLUMN IF NOT EXISTS profile_scraped_at TIMESTAMP')
+        cur.execute('ALTER TABLE matches ADD COLUMN IF NOT EXISTS venue TEXT')
+        cur.execute('ALTER TABLE matches ADD COLUMN IF NOT EXISTS match_format VARCHAR(20)')
+        cur.execute('ALTER TABLE matches ADD COLUMN IF NOT EXISTS starts_on DATE')
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_matches_starts_on ON matches (starts_on, id)')
+        cur.execute('ALTER TABLE series ADD COLUMN IF NOT EXISTS ends_on DATE')
+        cur.execute('ALTER TABLE series ADD COLUMN IF NOT EXISTS last_crawled_at TIMESTAMP')
+        cur.execute('ALTER TABLE series ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)')
+        cur.execute('ALTER TABLE series ADD COLUMN IF NOT EXISTS content_changed_at TIMESTAMP')
+        cur.execute('ALTER TABLE scorecards ADD COLUMN IF NOT EXISTS final_score TEXT')
+        cur.execute('ALTER TABLE scorecards ADD COLUMN IF NOT EXISTS is_live BOOLEAN DEFAULT FALSE')
+        cur.execute('ALTER TABLE scorecards ADD COLUMN IF NOT EXISTS last_updated TIMESTAMP')
+        cur.execute('ALTER TABLE scorecards ADD COLUMN IF NOT EXISTS state VARCHAR(20)')
+        cur.execute('ALTER TABLE scorecards ADD COLUMN IF NOT EXISTS state_changed_at TIMESTAMP')
+        cur.execute('ALTER TABLE scorecards ADD COLUMN IF NOT EXISTS starts_on DATE')
+        cur.execute('ALTER TABLE scorecards ADD COLUMN IF NOT EXISTS result_at TIMESTAMP')
+        cur.execute('ALTER TABLE scorecards ADD COLUMN IF NOT EXISTS finalized_at TIMESTAMP')
+        cur.execute('ALTER TABLE scorecards ADD COLUMN IF NOT EXISTS analytics JSONB')
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_scorecards_state ON scorecards (state)')
+        # Scorecards saved before the lifecycle existed: live ones stay live, ones with a result are final
+        cur.execute('''
+            UPDATE scorecards SET state = CASE WHEN is_live THEN 'live' ELSE 'final' END, state_changed_at = CURRENT_TIMESTAMP
+            WHERE state IS NULL AND (is_live OR COALESCE(match_status, '') <> '')
+        ''')
+        cur.execute('ALTER TABLE uploaded_images ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)')
+        cur.execute('ALTER TABLE uploaded_images ADD COLUMN IF NOT EXISTS last_uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP')
+        cur.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_uploaded_images_content_hash ON uploaded_images (content_hash)')
     except:
         pass
     
     conn.commit()
+    
+    # Draws used to be counted under no_result; move them to their own column once
+    try:
+        cur.execute('''
+            SELECT 1 FROM information_schema.columns WHERE table_name = 'series_standings' AND column_name = 'drawn'
+        ''')
+        if cur.fetchone() is None:
+            cur.execute('ALTER TABLE series_standings ADD COLUMN drawn INTEGER DEFAULT 0')
+            cur.execute('''
+                UPDATE series_standings s SET drawn = d.drawn, no_result = s.no_result - d.drawn
+                FROM (
+                    SELECT series_id, team, COUNT(*) AS drawn
+                    FROM match_results, LATERAL (VALUES (team1), (team2)) AS sides (team)
+                    WHERE result_type = 'draw' AND winner IS NULL AND series_id IS NOT NULL
+                    GROUP BY series_id, team
+                ) d
+                WHERE s.series_id = d.series_id AND s.team = d.team
+            ''')
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Standings drawn column migration failed: {e}")
+    
+    # Search vectors are generated columns, so Postgres keeps them current on every write from scrapers and admin CRUD
+    search_vectors = {
+        'players': "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || setweight(to_tsvector('simple', coalesce(role, '')), 'C')",
+        'teams': "setweight(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(short_name, '')), 'A') || setweight(to_tsvector('simple', coalesce(country, '')), 'B')",
+        'series': "to_tsvector('simple', coalesce(series_name, ''))",
+        'matches': "to_tsvector('simple', coalesce(match_title, ''))",
+        'posts': "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || setweight(to_tsvector('simple', coalesce(excerpt, '')), 'B') || setweight(to_tsvector('simple', coalesce(content, '')), 'D')"
+    }
+    # Stats for profiles scraped before player_stats existed
+    try:
+        cur.execute('SELECT 1 FROM player_stats LIMIT 1')
+        if cur.fetchone() is None:
+            leaderboards.materialize(cur)
+            conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Player stats backfill failed: {e}")
+    
+    # Typed start dates for matches scraped before starts_on existed; match_date is free text
+    try:
+        cur.execute("SELECT id, match_date FROM matches WHERE starts_on IS NULL AND COALESCE(match_date, '') <> ''")
+        dated = []
+        for row in cur.fetchall():
+            parsed = parse_match_date(row['match_date'])
+            if parsed:
+                dated.append((row['id'], parsed.date()))
+        if dated:
+            execute_values(cur, 'UPDATE matches m SET starts_on = v.starts_on FROM (VALUES %s) AS v (id, starts_on) WHERE m.id = v.id', dated)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Match start date backfill failed: {e}")
+    
+    for table, vector in search_vectors.items():
+        try:
+            cur.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED')
+            cur.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_search ON {table} USING GIN (search_vector)')
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Search index setup failed for {table}: {e}")
+    
+    # The autocomplete index catches up from updated_at, so bump it whenever a column it shows changes,
+    # whichever code path (or console session) makes the change
+    autocomplete_columns = {
+        'teams': 'name, short_name, slug, country, is_published',
+        'players': 'name, slug, team_id, is_published',
+        'series': 'series_name, slug, date_range',
+    }
+    try:
+        cur.execute('''
+            CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+            BEGIN
+                NEW.updated_at := CURRENT_TIMESTAMP;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"updated_at trigger function setup failed: {e}")
+    for table, columns in autocomplete_columns.items():
+        try:
+            cur.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP')
+            cur.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_updated_at ON {table} (updated_at)')
+            cur.execute('SELECT 1 FROM pg_trigger WHERE tgname = %s', (f'{table}_touch_updated_at',))
+            if cur.fetchone() is None:
+                cur.execute(f'CREATE TRIGGER {table}_touch_updated_at BEFORE UPDATE OF {columns} ON {table} '
+                            f'FOR EACH ROW EXECUTE FUNCTION touch_updated_at()')
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"updated_at trigger setup failed for {table}: {e}")
+    
     cur.close()
     conn.close()
 
@@ -505,25 +904,6 @@ def parse_match_scores(scorecard_html):
     
     return team1['code'], team1['score'], team2['code'], team2['score']
 
-def parse_match_date(date_str):
-    """Parse match date string to datetime"""
-    from datetime import datetime
-    if not date_str:
-        return None
-    try:
-        clean_date = date_str.replace(',', '').strip()
-        parts = clean_date.split()
-        if len(parts) >= 4:
-            month_day_year = ' '.join(parts[1:])
-            return datetime.strptime(month_day_year, '%b %d %Y')
-        elif len(parts) >= 3:
-            month_day = ' '.join(parts[1:])
-            current_year = datetime.now().year
-            return datetime.strptime(f"{month_day} {current_year}", '%b %d %Y')
-    except:
-        pass
-    return None
-
 def parse_team_names(match_title):
     """Extract team names from match title like 'Sri Lanka vs Pakistan, 3rd T20I'"""
     if not match_title:
@@ -540,64 +920,86 @@ def parse_team_names(match_title):
         return team1, team2, match_info
     return None, None, match_info
 
+MATCH_CARD_QUERY = '''SELECT m.*, s.series_name, sc.match_status as result, sc.scorecard_html, sc.final_score
+                   FROM matches m 
+                   LEFT JOIN series s ON m.series_id = s.id 
+                   LEFT JOIN scorecards sc ON m.match_id = sc.match_id'''
+RECENT_PAGE_SIZE = 10
+
+def match_card(row, cur):
+    """Match row with the scores, team names and flags a match list card shows"""
+    match = dict(row)
+    final_score = row.get('final_score', '')
+    if final_score and ' vs ' in final_score:
+        score_parts = final_score.split(' vs ')
+        if len(score_parts) >= 2:
+            t1_parts = score_parts[0].strip().rsplit(' ', 1)
+            t2_parts = score_parts[1].strip().rsplit(' ', 1)
+            match['team1_score'] = t1_parts[1] if len(t1_parts) > 1 else ''
+            match['team2_score'] = t2_parts[1] if len(t2_parts) > 1 else ''
+        else:
+            match['team1_score'] = ''
+            match['team2_score'] = ''
+    else:
+        t1_code, t1_score, t2_code, t2_score = parse_match_scores(row.get('scorecard_html'))
+        match['team1_score'] = t1_score
+        match['team2_score'] = t2_score
+    
+    team1_name, team2_name, match_info = parse_team_names(row.get('match_title'))
+    match['team1_name'] = team1_name
+    match['team2_name'] = team2_name
+    match['match_info'] = match_info
+    match['team1_flag'] = get_team_flag(team1_name, cur)
+    match['team2_flag'] = get_team_flag(team2_name, cur)
+    match['team1_flag_class'] = sprites.flag_class(team1_name)
+    match['team2_flag_class'] = sprites.flag_class(team2_name)
+    return match
+
+def encode_match_cursor(row):
+    """Opaque pagination cursor for the position just after a match row"""
+    return base64.urlsafe_b64encode(f"{row['starts_on'].isoformat()}|{row['id']}".encode()).decode().rstrip('=')
+
+def decode_match_cursor(cursor):
+    """(starts_on, id) from encode_match_cursor(); raises ValueError for anything else"""
+    from datetime import date
+    starts_on, row_id = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().split('|')
+    return date.fromisoformat(starts_on), int(row_id)
+
+def recent_matches_page(cur, after=None, limit=RECENT_PAGE_SIZE):
+    """Matches that started before today, newest first, after an optional decoded cursor.
+
+    after is the (starts_on, id) pair from decode_match_cursor(). Keyset
+    pagination on (starts_on, id) uses idx_matches_starts_on, so every page
+    costs the same. Returns (matches, cursor for the next page or None).
+    """
+    from datetime import datetime
+    params = [datetime.now().date()]
+    keyset = ''
+    if after:
+        keyset = 'AND (m.starts_on, m.id) < (%s, %s)'
+        params.extend(after)
+    cur.execute(f'''{MATCH_CARD_QUERY}
+                   WHERE m.starts_on < %s {keyset}
+                   ORDER BY m.starts_on DESC, m.id DESC
+                   LIMIT %s''', params + [limit + 1])
+    rows = cur.fetchall()
+    matches = [match_card(row, cur) for row in rows[:limit]]
+    return matches, encode_match_cursor(rows[limit - 1]) if len(rows) > limit else None
+
 @app.route('/')
 def index():
     from datetime import datetime
     settings = get_site_settings()
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
     
     conn = get_db()
     cur = conn.cursor()
     
-    cur.execute('''SELECT m.*, s.series_name, sc.match_status as result, sc.scorecard_html, sc.final_score
-                   FROM matches m 
-                   LEFT JOIN series s ON m.series_id = s.id 
-                   LEFT JOIN scorecards sc ON m.match_id = sc.match_id
-                   ORDER BY m.id DESC''')
-    all_matches = cur.fetchall()
-    
-    recent_matches = []
-    upcoming_matches = []
-    
-    for row in all_matches:
-        match = dict(row)
-        match_date = parse_match_date(row.get('match_date'))
-        match['parsed_date'] = match_date
-        
-        final_score = row.get('final_score', '')
-        if final_score and ' vs ' in final_score:
-            score_parts = final_score.split(' vs ')
-            if len(score_parts) >= 2:
-                t1_parts = score_parts[0].strip().rsplit(' ', 1)
-                t2_parts = score_parts[1].strip().rsplit(' ', 1)
-                match['team1_score'] = t1_parts[1] if len(t1_parts) > 1 else ''
-                match['team2_score'] = t2_parts[1] if len(t2_parts) > 1 else ''
-            else:
-                match['team1_score'] = ''
-                match['team2_score'] = ''
-        else:
-            t1_code, t1_score, t2_code, t2_score = parse_match_scores(row.get('scorecard_html'))
-            match['team1_score'] = t1_score
-            match['team2_score'] = t2_score
-        
-        team1_name, team2_name, match_info = parse_team_names(row.get('match_title'))
-        match['team1_name'] = team1_name
-        match['team2_name'] = team2_name
-        match['match_info'] = match_info
-        match['team1_flag'] = get_team_flag(team1_name, cur)
-        match['team2_flag'] = get_team_flag(team2_name, cur)
-        
-        if match_date and match_date < today:
-            recent_matches.append(match)
-        elif match_date and match_date >= today:
-            upcoming_matches.append(match)
-    
-    recent_matches.sort(key=lambda x: (x.get('result') is None, -(x['parsed_date'] or datetime.min).timestamp()))
-    upcoming_matches.sort(key=lambda x: x['parsed_date'] or datetime.max)
-    
-    initial_recent = recent_matches[:10]
-    upcoming_matches = upcoming_matches[:15]
-    has_more_recent = len(recent_matches) > 10
+    recent_matches, next_recent_cursor = recent_matches_page(cur)
+    cur.execute(f'''{MATCH_CARD_QUERY}
+                   WHERE m.starts_on >= %s
+                   ORDER BY m.starts_on, m.id
+                   LIMIT 15''', (datetime.now().date(),))
+    upcoming_matches = [match_card(row, cur) for row in cur.fetchall()]
     
     cur.execute('SELECT id, title, slug, featured_image, excerpt FROM posts WHERE is_published = TRUE ORDER BY created_at DESC LIMIT 10')
     sidebar_posts = cur.fetchall()
@@ -615,9 +1017,9 @@ def index():
                           settings=settings,
                           live_matches=live_matches,
                           matchups=matchups,
-                          recent_matches=initial_recent,
+                          recent_matches=recent_matches,
                           upcoming_matches=upcoming_matches,
-                          has_more_recent=has_more_recent,
+                          next_recent_cursor=next_recent_cursor,
                           sidebar_posts=sidebar_posts)
 
 @app.route('/admin/login', methods=['GET', 'POST'])
@@ -776,14 +1178,16 @@ def get_team_flag(team_name, cur):
         return ''
     cur.execute('SELECT flag_url FROM teams WHERE LOWER(name) = LOWER(%s) LIMIT 1', (team_name,))
     result = cur.fetchone()
-    return result['flag_url'] if result and result.get('flag_url') else ''
+    return mirror.local_url(result['flag_url']) if result and result.get('flag_url') else ''
 
 @app.route('/api/live-matches')
 def api_live_matches():
     conn = get_db()
     cur = conn.cursor()
     
-    cur.execute('SELECT * FROM live_matches WHERE is_live = TRUE ORDER BY display_order ASC, id DESC')
+    cur.execute('''SELECT lm.*, sc.analytics FROM live_matches lm
+                   LEFT JOIN scorecards sc ON sc.match_id = lm.match_id
+                   WHERE lm.is_live = TRUE ORDER BY lm.display_order ASC, lm.id DESC''')
     live_matches_data = cur.fetchall()
     
     matches_data = []
@@ -801,9 +1205,12 @@ def api_live_matches():
             'team2_name': match.get('team2_name', ''),
             'team1_flag': team1_flag,
             'team2_flag': team2_flag,
+            'team1_flag_class': sprites.flag_class(match.get('team1_name')),
+            'team2_flag_class': sprites.flag_class(match.get('team2_name')),
             'team1_score': match.get('team1_score', ''),
             'team2_score': match.get('team2_score', ''),
             'match_status': match.get('status', ''),
+            'analytics': match.get('analytics'),
             'last_updated': match.get('updated_at').isoformat() if match.get('updated_at') else ''
         })
     
@@ -813,62 +1220,21 @@ def api_live_matches():
 
 @app.route('/api/recent-matches')
 def api_recent_matches():
-    from datetime import datetime
-    offset = request.args.get('offset', 0, type=int)
-    limit = request.args.get('limit', 10, type=int)
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    cursor = request.args.get('cursor')
+    limit = min(max(request.args.get('limit', RECENT_PAGE_SIZE, type=int), 1), 50)
+    try:
+        after = decode_match_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
     
     conn = get_db()
     cur = conn.cursor()
-    
-    cur.execute('''SELECT m.*, s.series_name, sc.match_status as result, sc.scorecard_html, sc.final_score
-                   FROM matches m 
-                   LEFT JOIN series s ON m.series_id = s.id 
-                   LEFT JOIN scorecards sc ON m.match_id = sc.match_id
-                   ORDER BY m.id DESC''')
-    all_matches = cur.fetchall()
+    page, next_cursor = recent_matches_page(cur, after, limit)
     cur.close()
     conn.close()
     
-    recent_matches = []
-    for row in all_matches:
-        match = dict(row)
-        match_date = parse_match_date(row.get('match_date'))
-        match['parsed_date'] = match_date
-        
-        final_score = row.get('final_score', '')
-        if final_score and ' vs ' in final_score:
-            score_parts = final_score.split(' vs ')
-            if len(score_parts) >= 2:
-                t1_parts = score_parts[0].strip().rsplit(' ', 1)
-                t2_parts = score_parts[1].strip().rsplit(' ', 1)
-                match['team1_score'] = t1_parts[1] if len(t1_parts) > 1 else ''
-                match['team2_score'] = t2_parts[1] if len(t2_parts) > 1 else ''
-            else:
-                match['team1_score'] = ''
-                match['team2_score'] = ''
-        else:
-            t1_code, t1_score, t2_code, t2_score = parse_match_scores(row.get('scorecard_html'))
-            match['team1_score'] = t1_score
-            match['team2_score'] = t2_score
-        
-        team1_name, team2_name, match_info = parse_team_names(row.get('match_title'))
-        match['team1_name'] = team1_name
-        match['team2_name'] = team2_name
-        match['match_info'] = match_info
-        match['team1_flag'] = get_team_flag(team1_name, cur)
-        match['team2_flag'] = get_team_flag(team2_name, cur)
-        
-        if match_date and match_date < today:
-            recent_matches.append(match)
-    
-    recent_matches.sort(key=lambda x: (x.get('result') is None, -(x['parsed_date'] or datetime.min).timestamp()))
-    
-    paginated = recent_matches[offset:offset + limit]
-    has_more = len(recent_matches) > offset + limit
-    
     matches_data = []
-    for m in paginated:
+    for m in page:
         matches_data.append({
             'match_id': m.get('match_id'),
             'match_title': m.get('match_title'),
@@ -881,10 +1247,12 @@ def api_recent_matches():
             'team2_score': m.get('team2_score', ''),
             'team1_flag': m.get('team1_flag', ''),
             'team2_flag': m.get('team2_flag', ''),
+            'team1_flag_class': m.get('team1_flag_class', ''),
+            'team2_flag_class': m.get('team2_flag_class', ''),
             'result': m.get('result', '')
         })
     
-    return jsonify({'matches': matches_data, 'has_more': has_more})
+    return jsonify({'matches': matches_data, 'next_cursor': next_cursor, 'has_more': next_cursor is not None})
 
 @app.route('/api/scrape-scorecard', methods=['POST'])
 def api_scrape_scorecard():
@@ -893,10 +1261,25 @@ def api_scrape_scorecard():
     
     data = request.get_json()
     url = data.get('url', '')
+    match_id_match = re.search(r'/live-cricket-scorecard/(\d+)', url)
+    
+    if match_id_match:
+        # Final scorecards are frozen; serve the stored copy instead of fetching again
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute('SELECT scorecard_html, final_score, match_status FROM scorecards WHERE match_id = %s AND state = %s',
+                    (match_id_match.group(1), lifecycle.FINAL))
+        frozen = cur.fetchone()
+        cur.close()
+        conn.close()
+        if frozen:
+            return jsonify({'success': True, 'html': frozen['scorecard_html'], 'final_score': frozen['final_score'],
+                            'status_text': frozen['match_status'], 'state': lifecycle.FINAL, 'is_live': False,
+                            'saved': True, 'match_id': match_id_match.group(1)})
+    
     result = scrape_scorecard(url)
     
     if result.get('success') and result.get('html'):
-        match_id_match = re.search(r'/live-cricket-scorecard/(\d+)', url)
         if match_id_match:
             match_id = match_id_match.group(1)
             
@@ -907,31 +1290,17 @@ def api_scrape_scorecard():
             match_title = title_el.get_text(strip=True) if title_el else ''
             
             status_el = soup.find('div', class_='match-status')
-            match_status = result.get('status_text', '') or (status_el.get_text(strip=True) if status_el else '')
-            
-            final_score = result.get('final_score', '')
-            is_live = result.get('is_live', False)
+            result['status_text'] = result.get('status_text', '') or (status_el.get_text(strip=True) if status_el else '')
             
             conn = get_db()
             cur = conn.cursor()
-            
-            cur.execute('''
-                INSERT INTO scorecards (match_id, match_title, match_status, scorecard_html, final_score, is_live, last_updated)
-                VALUES (%s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                ON CONFLICT (match_id) DO UPDATE SET
-                    match_title = EXCLUDED.match_title,
-                    match_status = EXCLUDED.match_status,
-                    scorecard_html = EXCLUDED.scorecard_html,
-                    final_score = EXCLUDED.final_score,
-                    is_live = EXCLUDED.is_live,
-                    last_updated = CURRENT_TIMESTAMP,
-                    scraped_at = CURRENT_TIMESTAMP
-            ''', (match_id, match_title, match_status, result['html'], final_score, is_live))
-            
+            state = lifecycle.store_scorecard(cur, match_id, result, match_title=match_title)
             conn.commit()
             cur.close()
             conn.close()
             
+            result['state'] = state
+            result['is_live'] = state in lifecycle.ACTIVE_STATES
             result['saved'] = True
             result['match_id'] = match_id
     
@@ -971,16 +1340,11 @@ def api_upload_image():
         return jsonify({'success': False, 'error': 'No file selected'})
     
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4().hex}_{filename}"
-        
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(filepath)
-        
-        file_url = f"/static/uploads/{unique_filename}"
-        return jsonify({'success': True, 'url': file_url, 'filename': unique_filename})
+        try:
+            file_url = images.save_upload(file, app.config['UPLOAD_FOLDER'])
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)})
+        return jsonify({'success': True, 'url': file_url, 'filename': os.path.basename(file_url)})
     
     return jsonify({'success': False, 'error': 'File type not allowed. Use PNG, JPG, GIF, or WebP.'})
 
@@ -1001,11 +1365,31 @@ def view_matches(series_id):
     sidebar = get_sidebar_data()
     return render_template('matches.html', series=series, matches=matches, sidebar=sidebar)
 
+def queued_job_response(job_type, params=None):
+    """Enqueue a background scrape and return its job id for polling /api/jobs/<id>"""
+    job_id, created = jobs.enqueue(job_type, params)
+    message = 'Job queued' if created else 'An identical job is already in progress'
+    return jsonify({'success': True, 'job_id': job_id, 'deduplicated': not created, 'message': message})
+
+@app.route('/api/jobs/<int:job_id>')
+@login_required
+def api_get_job(job_id):
+    job = jobs.get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/api/jobs/<int:job_id>/cancel', methods=['POST'])
+@login_required
+def api_cancel_job(job_id):
+    status = jobs.cancel(job_id)
+    if status is None:
+        return jsonify({'success': False, 'message': 'Job is not queued or running'})
+    return jsonify({'success': True, 'status': status, 'message': 'Job cancelled' if status == 'cancelled' else 'Cancellation requested'})
+
 @app.route('/api/scrape-series', methods=['POST'])
 def api_scrape_series():
-    from scraper import scrape_series_data
-    result = scrape_series_data()
-    return jsonify(result)
+    return queued_job_response('scrape_series')
 
 @app.route('/api/scrape-matches/<int:series_id>', methods=['POST'])
 def api_scrape_matches(series_id):
@@ -1015,15 +1399,16 @@ def api_scrape_matches(series_id):
 
 @app.route('/api/scrape-all-matches', methods=['POST'])
 def api_scrape_all_matches():
-    from scraper import scrape_all_matches
-    result = scrape_all_matches()
-    return jsonify(result)
+    # ?full=1 crawls every series instead of only those that can still change
+    return queued_job_response('scrape_all_matches', {'full': True} if request.args.get('full') == '1' else None)
 
 @app.route('/api/clear-all-matches', methods=['POST'])
 def api_clear_all_matches():
     conn = get_db()
     cur = conn.cursor()
     cur.execute('DELETE FROM matches')
+    # Mark every series as never crawled so the next crawl re-adds all their matches
+    cur.execute('UPDATE series SET content_hash = NULL, last_crawled_at = NULL')
     conn.commit()
     cur.close()
     conn.close()
@@ -1042,6 +1427,7 @@ def api_clear_series_matches(series_id):
     
     cur.execute('DELETE FROM matches WHERE series_id = %s', (series_id,))
     deleted_count = cur.rowcount
+    cur.execute('UPDATE series SET content_hash = NULL, last_crawled_at = NULL WHERE id = %s', (series_id,))
     conn.commit()
     cur.close()
     conn.close()
@@ -1056,6 +1442,7 @@ def api_clear_all_series():
     conn.commit()
     cur.close()
     conn.close()
+    autocomplete.invalidate()
     return jsonify({'success': True, 'message': 'All series and matches cleared successfully'})
 
 @app.route('/api/clear-all-scorecards', methods=['POST'])
@@ -1084,6 +1471,7 @@ def api_clear_all_data():
         cur.execute('DELETE FROM live_matches')
         live_count = cur.rowcount
         conn.commit()
+        autocomplete.invalidate()
         message = f'All data cleared: {series_count} series, {matches_count} matches, {scorecards_count} scorecards, {live_count} live matches'
         return jsonify({'success': True, 'message': message})
     except Exception as e:
@@ -1148,11 +1536,9 @@ def api_update_auto_scrape_settings():
 
 @app.route('/api/scrape-teams/<team_type>', methods=['POST'])
 def api_scrape_teams(team_type):
-    from scraper import scrape_teams
     if team_type not in ['international', 'domestic', 'league', 'women']:
         return jsonify({'success': False, 'message': 'Invalid team type'})
-    result = scrape_teams(team_type)
-    return jsonify(result)
+    return queued_job_response('scrape_teams', {'team_type': team_type})
 
 @app.route('/api/get-scorecard/<match_id>')
 def api_get_scorecard(match_id):
@@ -1207,6 +1593,11 @@ def keyword_page(slug):
     cur = conn.cursor()
     cur.execute('SELECT * FROM keyword_pages WHERE slug = %s AND is_published = TRUE', (slug,))
     keyword_page = cur.fetchone()
+    
+    h2h = None
+    teams = results.parse_teams(keyword_page['keyword']) if keyword_page else None
+    if teams:
+        h2h = results.head_to_head(cur, *teams)
     cur.close()
     conn.close()
     
@@ -1214,7 +1605,7 @@ def keyword_page(slug):
         return 'Page not found', 404
     
     settings = get_site_settings()
-    return render_template('frontend/keyword_page.html', keyword_page=keyword_page, settings=settings)
+    return render_template('frontend/keyword_page.html', keyword_page=keyword_page, teams=teams, h2h=h2h, settings=settings)
 
 @app.route('/admin/settings', methods=['GET', 'POST'])
 @login_required
@@ -1352,6 +1743,8 @@ def admin_add_team():
         conn.commit()
         cur.close()
         conn.close()
+        jobs.enqueue('build_flag_sprite')
+        autocomplete.refresh()
         flash('Team added successfully', 'success')
         return redirect(url_for('admin_teams'))
     
@@ -1376,6 +1769,8 @@ def admin_edit_team(team_id):
             WHERE id=%s
         ''', (name, short_name, country, flag_color, description, team_id))
         conn.commit()
+        jobs.enqueue('build_flag_sprite')
+        autocomplete.invalidate()
         flash('Team updated successfully', 'success')
     
     cur.execute('SELECT * FROM teams WHERE id = %s', (team_id,))
@@ -1426,12 +1821,10 @@ def admin_add_post():
         if 'featured_image_file' in request.files:
             file = request.files['featured_image_file']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                unique_filename = f"{uuid.uuid4().hex}_{filename}"
-                os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-                file.save(filepath)
-                featured_image = f"/static/uploads/{unique_filename}"
+                try:
+                    featured_image = images.save_upload(file, app.config['UPLOAD_FOLDER'])
+                except ValueError as e:
+                    flash(f'Featured image not saved: {e}', 'error')
         
         slug = base_slug
         counter = 1
@@ -1481,12 +1874,10 @@ def admin_edit_post(post_id):
         if 'featured_image_file' in request.files:
             file = request.files['featured_image_file']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                unique_filename = f"{uuid.uuid4().hex}_{filename}"
-                os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-                file.save(filepath)
-                featured_image = f"/static/uploads/{unique_filename}"
+                try:
+                    featured_image = images.save_upload(file, app.config['UPLOAD_FOLDER'])
+                except ValueError as e:
+                    flash(f'Featured image not saved: {e}', 'error')
         
         cur.execute('''
             UPDATE posts SET title=%s, featured_image=%s, excerpt=%s, content=%s, category_id=%s, 
@@ -1495,6 +1886,7 @@ def admin_edit_post(post_id):
             WHERE id=%s
         ''', (title, featured_image, excerpt, content, category_id or None, focus_keyword, meta_title, meta_description, canonical_url, og_image, is_published, post_id))
         conn.commit()
+        jobs.enqueue('collect_upload_garbage')
         flash('Post updated successfully', 'success')
     
     cur.execute('SELECT * FROM posts WHERE id = %s', (post_id,))
@@ -1516,6 +1908,7 @@ def admin_delete_post(post_id):
     conn.commit()
     cur.close()
     conn.close()
+    jobs.enqueue('collect_upload_garbage')
     flash('Post deleted successfully', 'success')
     return redirect(url_for('admin_posts'))
 
@@ -1791,6 +2184,8 @@ def admin_delete_team(team_id):
     conn.commit()
     cur.close()
     conn.close()
+    jobs.enqueue('build_flag_sprite')
+    autocomplete.invalidate()
     flash('Team deleted successfully', 'success')
     return redirect(url_for('admin_teams'))
 
@@ -1811,9 +2206,7 @@ def admin_players():
 @app.route('/api/scrape-players/<int:team_id>', methods=['POST'])
 @login_required
 def api_scrape_players(team_id):
-    from scraper import scrape_players_from_team
-    result = scrape_players_from_team(team_id)
-    return jsonify(result)
+    return queued_job_response('scrape_players', {'team_id': team_id})
 
 @app.route('/api/delete-player/<int:player_id>', methods=['POST'])
 @login_required
@@ -1824,6 +2217,7 @@ def api_delete_player(player_id):
     conn.commit()
     cur.close()
     conn.close()
+    autocomplete.invalidate()
     return jsonify({'success': True, 'message': 'Player deleted'})
 
 @app.route('/api/scrape-player-profile/<int:player_id>', methods=['POST'])
@@ -1831,8 +2225,21 @@ def api_delete_player(player_id):
 def api_scrape_player_profile(player_id):
     from scraper import scrape_player_profile
     result = scrape_player_profile(player_id)
+    if result.get('success'):
+        jobs.enqueue('materialize_player_stats')
     return jsonify(result)
 
+@app.route('/api/scrape-player-profiles', methods=['POST'])
+@app.route('/api/scrape-player-profiles/<int:team_id>', methods=['POST'])
+@login_required
+def api_scrape_player_profiles(team_id=None):
+    return queued_job_response('scrape_player_profiles', {'team_id': team_id})
+
+@app.route('/api/rebuild-head-to-head', methods=['POST'])
+@login_required
+def api_rebuild_head_to_head():
+    return queued_job_response('rebuild_head_to_head')
+
 @app.route('/api/get-players/<int:team_id>')
 @login_required
 def api_get_players(team_id):
@@ -1979,12 +2386,35 @@ def series_detail_page(slug):
     
     cur.execute('SELECT * FROM matches WHERE series_id = %s ORDER BY match_id ASC', (series['id'],))
     matches = cur.fetchall()
+    points_table = standings.points_table(cur, series['id'])
     
     cur.close()
     conn.close()
     
     settings = get_site_settings()
-    return render_template('frontend/series_detail.html', series=series, matches=matches, settings=settings)
+    return render_template('frontend/series_detail.html', series=series, matches=matches, points_table=points_table, settings=settings)
+
+@app.route('/api/series/<int:series_id>/points-table')
+def api_points_table(series_id):
+    conn = get_db()
+    cur = conn.cursor()
+    rows = standings.points_table(cur, series_id)
+    cur.close()
+    conn.close()
+    table = [dict(row, nrr=float(row['nrr']) if row['nrr'] is not None else None) for row in rows]
+    return jsonify({'success': True, 'series_id': series_id, 'standings': table})
+
+@app.route('/api/match/<match_id>/commentary')
+def api_match_commentary(match_id):
+    after = request.args.get('after', type=int)
+    limit = min(max(request.args.get('limit', commentary.PAGE_SIZE, type=int), 1), commentary.PAGE_SIZE)
+    entries = commentary.entries_after(match_id, after, limit)
+    last_id = entries[-1]['id'] if entries else after
+    return jsonify({'success': True, 'match_id': match_id, 'entries': entries, 'last_id': last_id})
+
+@app.route('/api/match/<match_id>/progression')
+def api_match_progression(match_id):
+    return jsonify({'success': True, 'match_id': match_id, 'innings': progression.series(match_id)})
 
 @app.route('/series/<int:series_id>')
 def series_detail_redirect(series_id):
@@ -2057,6 +2487,72 @@ def match_score_by_id(match_id):
     settings = get_site_settings()
     return render_template('frontend/match_score.html', scorecard=scorecard, match=match, settings=settings, is_live=live_match is not None)
 
+@app.route('/metrics')
+def metrics_endpoint():
+    if not metrics_access_allowed():
+        return 'Not found', 404
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+@app.route('/api/search')
+def api_search():
+    q = request.args.get('q', '').strip()
+    search_type = request.args.get('type')
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 50)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    return jsonify(search.search(q, search_type, limit, offset))
+
+@app.route('/api/autocomplete')
+def api_autocomplete():
+    q = request.args.get('q', '')
+    response = jsonify({'success': True, 'query': q, 'results': autocomplete.lookup(q)})
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
+
+@app.route('/api/leaderboards/<format_slug>/<stat>')
+def api_leaderboard(format_slug, stat):
+    board = leaderboards.leaderboard(format_slug.lower(), stat)
+    if board is None:
+        return jsonify({'success': False, 'message': 'Unknown format or stat'}), 404
+    return jsonify(board)
+
+@app.route('/leaderboards')
+@app.route('/leaderboards/<format_slug>/<stat>')
+def leaderboards_page(format_slug='odi', stat='runs'):
+    board = leaderboards.leaderboard(format_slug.lower(), stat)
+    if board is None:
+        return "Leaderboard not found", 404
+    settings = get_site_settings()
+    return render_template('frontend/leaderboards.html', board=board, format_slug=format_slug.lower(), stat=stat,
+                           formats=leaderboards.FORMATS, stats=leaderboards.STATS, settings=settings)
+
+@app.route('/search')
+def search_page():
+    q = request.args.get('q', '').strip()
+    search_type = request.args.get('type')
+    page = max(request.args.get('page', 1, type=int), 1)
+    results = search.search(q, search_type, 20, (page - 1) * 20)
+    settings = get_site_settings()
+    return render_template('frontend/search.html', q=q, search_type=search_type, page=page, results=results,
+                           search_types=search.SEARCH_TYPES, settings=settings)
+
+@app.route('/media/<filename>')
+def mirrored_media(filename):
+    # Files are named by content hash, so a URL never changes meaning and can be cached forever
+    if not re.fullmatch(r'[0-9a-f]{64}\.(?:jpg|png|gif|webp|css)', filename):
+        abort(404)
+    response = send_from_directory(mirror.MIRROR_DIR, filename, max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/uploads/<filename>')
+def uploaded_file(filename):
+    # Upload names are content hashes, so they can be cached forever like /media/
+    if not images.UPLOAD_NAME_PATTERN.fullmatch(filename):
+        abort(404)
+    response = send_from_directory(app.config['UPLOAD_FOLDER'], filename, max_age=31536000)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 @app.route('/robots.txt')
 def robots():
     content = """User-agent: *
@@ -2152,6 +2648,11 @@ with app.app_context():
     init_db()
     seed_defaults()
 
+jobs.start_workers()
+start_scheduler_leader()
+autocomplete.start()
+assets.build()
+print(f"Precompressed {compression.precompress_static(app.static_folder)} static files")
+
 if __name__ == '__main__':
-    start_scheduler()
     app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False)
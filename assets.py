@@ -0,0 +1,172 @@
+"""Fingerprinted CSS/JS bundles built from the sources in assets/.
+
+build() minifies every assets/<page>.css and assets/<page>.js into
+static/dist/<page>.<hash>.<ext>, named by a digest of the minified content,
+so templates can link them with asset_url('<page>.css') and browsers can
+cache them forever: an edit produces a new URL. It runs at startup before
+static files are precompressed, and can be run as a build step with
+`python assets.py`. Superseded bundles are kept for RETENTION_DAYS so pages
+rendered before a deploy still load, and a bundle URL this instance does not
+have redirects to the current bundle of the same page.
+
+The admin theme colours change at runtime, so theme_stylesheet() renders
+them into a tiny stylesheet stored content-addressed under /media/ instead.
+"""
+import hashlib
+import os
+import re
+import time
+
+from flask import redirect, request
+from werkzeug.exceptions import NotFound
+
+import mirror
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(BASE_DIR, 'assets')
+DIST = 'dist'
+OUTPUT_DIR = os.path.join(BASE_DIR, 'static', DIST)
+HASH_LENGTH = 16
+RETENTION_DAYS = 7
+BUNDLE_NAME = re.compile(r'(?P<stem>[\w-]+)\.[0-9a-f]{%d}(?P<ext>\.css|\.js)' % HASH_LENGTH)
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# CSS variable, site_settings key and default, as base.html used to inline them
+THEME_COLOURS = (
+    ('primary', 'theme_primary', '#046A38'),
+    ('secondary', 'theme_secondary', '#FF6B00'),
+    ('accent', 'theme_accent', '#1A1A2E'),
+)
+
+_CSS_STRING = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+
+_manifest = {}
+_theme_urls = {}
+
+
+def minify_css(text):
+    """Drop comments and insignificant whitespace, leaving quoted strings untouched"""
+    parts = _CSS_STRING.split(text)
+    for i in range(0, len(parts), 2):
+        part = re.sub(r'/\*.*?\*/', '', parts[i], flags=re.S)
+        part = re.sub(r'\s+', ' ', part)
+        part = re.sub(r' ?([{};,>]) ?', r'\1', part)
+        parts[i] = part.replace(': ', ':').replace(';}', '}')
+    return ''.join(parts).strip() + '\n'
+
+
+def minify_js(text):
+    """Strip indentation, blank lines and comment lines. Lines stay separate so semicolon insertion is unchanged,
+    and template literal contents are kept verbatim"""
+    lines = []
+    in_template = False
+    for line in text.splitlines():
+        if in_template:
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if stripped and not stripped.startswith('//'):
+                lines.append(stripped)
+        if line.count('`') % 2:
+            in_template = not in_template
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build():
+    """Write a minified, fingerprinted bundle for every source and prune long-superseded ones. Returns {source: url}"""
+    global _manifest
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    manifest = {}
+    for name in sorted(os.listdir(SOURCE_DIR)):
+        stem, ext = os.path.splitext(name)
+        if ext not in MINIFIERS:
+            continue
+        with open(os.path.join(SOURCE_DIR, name), encoding='utf-8') as f:
+            data = MINIFIERS[ext](f.read()).encode('utf-8')
+        filename = f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+        path = os.path.join(OUTPUT_DIR, filename)
+        if not os.path.exists(path):
+            # Write then rename so a worker never serves a half-written bundle
+            partial = f'{path}.{os.getpid()}.tmp'
+            with open(partial, 'wb') as f:
+                f.write(data)
+            os.replace(partial, path)
+        manifest[name] = f'/static/{DIST}/{filename}'
+
+    # Current bundles (and their precompressed copies, kept no older than the bundle) are stamped with the
+    # build time, so a bundle's mtime says when it was last current. Superseded ones stay for pages
+    # rendered before a deploy and are pruned once they have been out of use for RETENTION_DAYS
+    now = time.time()
+    current = {url.rsplit('/', 1)[1] for url in manifest.values()}
+    for name in os.listdir(OUTPUT_DIR):
+        path = os.path.join(OUTPUT_DIR, name)
+        bundle = re.sub(r'\.(?:gz|br)$', '', name)
+        try:
+            if bundle in current:
+                os.utime(path, (now, now))
+            elif not name.endswith('.tmp') and os.path.getmtime(path) < now - RETENTION_DAYS * 86400:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+    _manifest = manifest
+    return manifest
+
+
+def asset_url(name):
+    """URL of the current bundle built from assets/<name>"""
+    if not _manifest:
+        build()
+    return _manifest[name]
+
+
+def theme_stylesheet(settings):
+    """URL of a stylesheet setting the admin theme colours as CSS variables"""
+    colours = tuple(settings.get(key, default) for _, key, default in THEME_COLOURS)
+    url = _theme_urls.get(colours)
+    if url is None:
+        css = ':root{' + ''.join(f'--{var}:{value};' for (var, _, _), value in zip(THEME_COLOURS, colours)) + '}\n'
+        url = _theme_urls[colours] = f"/media/{mirror.store(css.encode('utf-8'), 'css')}"
+    return url
+
+
+def _cache_bundles(response):
+    # Bundle names change with their content, so a bundle URL can be cached forever
+    filename = (request.view_args or {}).get('filename', '')
+    if request.endpoint == 'static' and filename.startswith(DIST + '/') and response.status_code in (200, 304):
+        response.headers['Cache-Control'] = IMMUTABLE
+    return response
+
+
+def _static_with_fallback(view):
+    """Wrap the static view so a bundle this instance never built (or already pruned) redirects to the current one"""
+    def static(filename):
+        try:
+            return view(filename=filename)
+        except NotFound:
+            bundle = BUNDLE_NAME.fullmatch(filename[len(DIST) + 1:]) if filename.startswith(DIST + '/') else None
+            if bundle is None:
+                raise
+            if not _manifest:
+                build()
+            url = _manifest.get(bundle['stem'] + bundle['ext'])
+            if url is None:
+                raise
+            response = redirect(url)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+    return static
+
+
+def init_app(app):
+    """Register the template helpers and bundle caching. Call after anything else that replaces the static view"""
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.jinja_env.globals['theme_stylesheet'] = theme_stylesheet
+    app.after_request(_cache_bundles)
+    app.view_functions['static'] = _static_with_fallback(app.view_functions['static'])
+
+
+if __name__ == '__main__':
+    for source, url in build().items():
+        print(f"{source} -> {url}")
@@ -0,0 +1,85 @@
+window.openMobileNav = function() {
+    document.getElementById('mobileNav').classList.add('active');
+    document.getElementById('overlay').classList.add('active');
+    document.body.style.overflow = 'hidden';
+};
+
+window.closeMobileNav = function() {
+    document.getElementById('mobileNav').classList.remove('active');
+    document.getElementById('overlay').classList.remove('active');
+    document.body.style.overflow = 'auto';
+};
+
+(function() {
+    var input = document.getElementById('acInput');
+    var list = document.getElementById('acList');
+    var timer = null;
+    var controller = null;
+    var active = -1;
+
+    function escapeHtml(text) {
+        var div = document.createElement('div');
+        div.textContent = text || '';
+        return div.innerHTML;
+    }
+
+    function close() {
+        list.classList.remove('open');
+        active = -1;
+    }
+
+    function render(results) {
+        active = -1;
+        if (!results.length) {
+            close();
+            return;
+        }
+        list.innerHTML = results.map(function(r) {
+            return '<a href="' + escapeHtml(r.url) + '" role="option">' +
+                '<span class="ac-type">' + escapeHtml(r.type) + '</span>' + escapeHtml(r.title) +
+                (r.subtitle ? '<span class="ac-subtitle">' + escapeHtml(r.subtitle) + '</span>' : '') + '</a>';
+        }).join('');
+        list.classList.add('open');
+    }
+
+    function highlight(index) {
+        var items = list.querySelectorAll('a');
+        if (!items.length) return;
+        active = (index + items.length) % items.length;
+        items.forEach(function(item, i) { item.classList.toggle('active', i === active); });
+    }
+
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        var q = input.value.trim();
+        if (q.length < 2) {
+            close();
+            return;
+        }
+        timer = setTimeout(function() {
+            if (controller) controller.abort();
+            controller = new AbortController();
+            fetch('/api/autocomplete?q=' + encodeURIComponent(q), {signal: controller.signal})
+                .then(function(r) { return r.json(); })
+                .then(function(data) { render(data.results || []); })
+                .catch(function() {});
+        }, 80);
+    });
+
+    input.addEventListener('keydown', function(e) {
+        if (e.key === 'ArrowDown') {
+            e.preventDefault();
+            highlight(active + 1);
+        } else if (e.key === 'ArrowUp') {
+            e.preventDefault();
+            highlight(active - 1);
+        } else if (e.key === 'Enter' && active >= 0) {
+            e.preventDefault();
+            window.location = list.querySelectorAll('a')[active].href;
+        } else if (e.key === 'Escape') {
+            close();
+        }
+    });
+
+    input.addEventListener('blur', function() { setTimeout(close, 150); });
+})();
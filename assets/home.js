@@ -0,0 +1,145 @@
+function showMatchTab(tabId) {
+    document.querySelectorAll('.match-tab-content').forEach(el => el.classList.remove('active'));
+    document.querySelectorAll('.match-tab').forEach(el => el.classList.remove('active'));
+
+    document.getElementById(tabId).classList.add('active');
+    event.target.classList.add('active');
+}
+
+let isLoading = false;
+let hasMore = nextCursor !== null;
+
+function loadMoreMatches() {
+    if (isLoading || !hasMore) return;
+
+    isLoading = true;
+    const btn = document.getElementById('load-more-btn');
+    const spinner = document.getElementById('loading-spinner');
+
+    btn.style.display = 'none';
+    spinner.style.display = 'block';
+
+    fetch(`/api/recent-matches?cursor=${encodeURIComponent(nextCursor)}&limit=10`)
+        .then(response => response.json())
+        .then(data => {
+            const matchesList = document.getElementById('recent-matches-list');
+
+            data.matches.forEach(match => {
+                const card = document.createElement('a');
+                card.href = `/match-score/${match.match_id}`;
+                card.className = 'cricbuzz-card';
+
+                const team1Flag = match.team1_name ? match.team1_name.toLowerCase().replace(/ /g, '-') : 'default';
+                const team2Flag = match.team2_name ? match.team2_name.toLowerCase().replace(/ /g, '-') : 'default';
+
+                card.innerHTML = `
+                    <div class="card-header">
+                        <span class="series-name">${(match.series_name || 'CRICKET MATCH').toUpperCase()}</span>
+                        <span class="chevron">›</span>
+                    </div>
+                    <div class="card-body">
+                        <div class="match-meta">
+                            <span class="match-info-text">${match.match_info || ''}${match.match_date ? ' • ' + match.match_date : ''}</span>
+                        </div>
+                        <div class="team-row">
+                            ${match.team1_flag_class ? `<span class="team-flag-img ${match.team1_flag_class}" role="img" aria-label="${match.team1_name}"></span>` : `<div class="team-flag ${team1Flag}"></div>`}
+                            <span class="team-name">${match.team1_name || 'Team 1'}</span>
+                            <span class="team-score">${match.team1_score || ''}</span>
+                        </div>
+                        <div class="team-row">
+                            ${match.team2_flag_class ? `<span class="team-flag-img ${match.team2_flag_class}" role="img" aria-label="${match.team2_name}"></span>` : `<div class="team-flag ${team2Flag}"></div>`}
+                            <span class="team-name">${match.team2_name || 'Team 2'}</span>
+                            <span class="team-score bold">${match.team2_score || ''}</span>
+                        </div>
+                        ${match.result ? `<div class="match-result">${match.result}</div>` : ''}
+                    </div>
+                `;
+                matchesList.appendChild(card);
+            });
+
+            nextCursor = data.next_cursor;
+            hasMore = nextCursor !== null;
+
+            if (hasMore) {
+                btn.style.display = 'inline-block';
+            } else {
+                document.getElementById('load-more-container').style.display = 'none';
+            }
+
+            spinner.style.display = 'none';
+            isLoading = false;
+        })
+        .catch(error => {
+            console.error('Error loading matches:', error);
+            btn.style.display = 'inline-block';
+            spinner.style.display = 'none';
+            isLoading = false;
+        });
+}
+
+function fetchLiveMatches() {
+    fetch('/api/live-matches')
+        .then(response => response.json())
+        .then(data => {
+            const liveList = document.getElementById('live-matches-list');
+            const noLive = document.getElementById('no-live-matches');
+
+            liveList.innerHTML = '';
+
+            if (data.matches && data.matches.length > 0) {
+                if (noLive) noLive.style.display = 'none';
+
+                data.matches.forEach(match => {
+                    const card = document.createElement('a');
+                    card.href = `/match-score/${match.match_id}`;
+                    card.className = 'cricbuzz-card live-card';
+
+                    const team1FlagHtml = match.team1_flag_class
+                        ? `<span class="team-flag-img ${match.team1_flag_class}" role="img" aria-label="${match.team1_name}"></span>`
+                        : match.team1_flag 
+                        ? `<img src="${match.team1_flag}" class="team-flag-img" alt="${match.team1_name}">` 
+                        : `<div class="team-flag ${match.team1_name ? match.team1_name.toLowerCase().replace(/ /g, '-') : 'default'}"></div>`;
+                    const team2FlagHtml = match.team2_flag_class
+                        ? `<span class="team-flag-img ${match.team2_flag_class}" role="img" aria-label="${match.team2_name}"></span>`
+                        : match.team2_flag 
+                        ? `<img src="${match.team2_flag}" class="team-flag-img" alt="${match.team2_name}">` 
+                        : `<div class="team-flag ${match.team2_name ? match.team2_name.toLowerCase().replace(/ /g, '-') : 'default'}"></div>`;
+
+                    card.innerHTML = `
+                        <div class="card-header">
+                            <span class="series-name">${(match.series_name || 'LIVE MATCH').toUpperCase()}</span>
+                            <span class="live-badge">LIVE</span>
+                        </div>
+                        <div class="card-body">
+                            <div class="match-meta">
+                                <span class="live-dot"></span>
+                                <span class="match-info-text">${match.match_info || match.match_title || ''}</span>
+                            </div>
+                            <div class="team-row">
+                                ${team1FlagHtml}
+                                <span class="team-name">${match.team1_name || 'Team 1'}</span>
+                                <span class="team-score">${match.team1_score || ''}</span>
+                            </div>
+                            <div class="team-row">
+                                ${team2FlagHtml}
+                                <span class="team-name">${match.team2_name || 'Team 2'}</span>
+                                <span class="team-score bold">${match.team2_score || ''}</span>
+                            </div>
+                            ${match.match_status ? `<div class="match-result live-status">${match.match_status}</div>` : ''}
+                        </div>
+                    `;
+                    liveList.appendChild(card);
+                });
+            } else {
+                if (noLive) {
+                    liveList.appendChild(noLive);
+                    noLive.style.display = 'block';
+                }
+            }
+        })
+        .catch(error => {
+            console.error('Error fetching live matches:', error);
+        });
+}
+
+fetchLiveMatches();
@@ -0,0 +1,33 @@
+(function() {
+    var panel = document.getElementById('commentary');
+    if (!panel) return;
+    var list = document.getElementById('commentaryList');
+    var lastId = null;
+
+    function render(entry) {
+        var item = document.createElement('li');
+        item.className = 'commentary-item' + (entry.event ? ' event-' + entry.event.toLowerCase() : '');
+        if (entry.over_number !== null) {
+            var over = document.createElement('span');
+            over.className = 'commentary-over';
+            over.textContent = entry.over_number.toFixed(1);
+            item.appendChild(over);
+        }
+        item.appendChild(document.createTextNode(entry.text));
+        list.insertBefore(item, list.firstChild);
+    }
+
+    function poll() {
+        var url = '/api/match/' + encodeURIComponent(panel.dataset.matchId) + '/commentary' + (lastId !== null ? '?after=' + lastId : '');
+        fetch(url)
+            .then(function(r) { return r.json(); })
+            .then(function(data) {
+                (data.entries || []).forEach(render);
+                if (data.last_id !== null && data.last_id !== undefined) lastId = data.last_id;
+            })
+            .catch(function() {});
+    }
+
+    poll();
+    setInterval(poll, 10000);
+})();
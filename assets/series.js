@@ -0,0 +1,7 @@
+function showYear(year) {
+    document.querySelectorAll('.year-section').forEach(el => el.classList.remove('active'));
+    document.querySelectorAll('.year-btn').forEach(el => el.classList.remove('active'));
+
+    document.getElementById('year-' + year).classList.add('active');
+    event.target.closest('.year-btn').classList.add('active');
+}
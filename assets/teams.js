@@ -0,0 +1,7 @@
+function showCategory(category) {
+    document.querySelectorAll('.team-category').forEach(el => el.classList.remove('active'));
+    document.querySelectorAll('.tab-btn').forEach(el => el.classList.remove('active'));
+
+    document.getElementById(category).classList.add('active');
+    event.target.classList.add('active');
+}
@@ -0,0 +1,215 @@
+"""In-memory prefix index behind the header type-ahead box.
+
+Every process keeps a sorted array of normalized keys (each name, plus every
+later word of it so "kohli" finds Virat Kohli) over published players, teams
+and series, and answers lookups with a binary search, so keystrokes never
+reach Postgres. The index is built at startup and caught up incrementally
+with rows past each table's highest seen id or updated_at (kept current by a
+trigger, see app.init_db), so new rows, renames and unpublished rows are
+picked up without a rebuild; scrape jobs refresh it straight away and other
+processes catch up within REFRESH_INTERVAL. Deletes leave nothing to see, so
+they go through invalidate(), which bumps a generation in site_settings so
+every process rebuilds from scratch.
+"""
+import datetime
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from scraper import get_db
+
+MAX_RESULTS = 8
+MIN_QUERY_LENGTH = 2
+REFRESH_INTERVAL = 60
+GENERATION_KEY = 'autocomplete_generation'
+# updated_at is the writing transaction's start time, so re-read a window behind the newest one seen
+# to catch transactions that committed late
+UPDATE_OVERLAP = datetime.timedelta(minutes=5)
+
+# Rows added after after_id or changed after since; listed is false for rows that should leave the index
+SOURCES = {
+    'team': '''
+        SELECT id, name, short_name AS alias, slug, country AS subtitle, updated_at,
+            is_published AND COALESCE(slug, '') <> '' AS listed
+        FROM teams WHERE id > %(after_id)s OR updated_at > %(since)s ORDER BY id
+    ''',
+    'player': '''
+        SELECT p.id, p.name, NULL AS alias, p.slug, t.name AS subtitle, GREATEST(p.updated_at, t.updated_at) AS updated_at,
+            p.is_published AND COALESCE(p.slug, '') <> '' AS listed
+        FROM players p LEFT JOIN teams t ON t.id = p.team_id
+        WHERE p.id > %(after_id)s OR p.updated_at > %(since)s OR t.updated_at > %(since)s ORDER BY p.id
+    ''',
+    'series': '''
+        SELECT id, series_name AS name, NULL AS alias, slug, date_range AS subtitle, updated_at,
+            series_name IS NOT NULL AS listed
+        FROM series WHERE id > %(after_id)s OR updated_at > %(since)s ORDER BY id
+    ''',
+}
+
+
+def _empty_index():
+    return ([], [], [], {}, {source: (0, None) for source in SOURCES})
+
+
+# (keys, refs, entries, rows, watermarks): keys is sorted, refs[i] is the entries index keys[i] points at,
+# rows maps (source, id) to (entries index, keys) and watermarks each source to (highest id, latest updated_at).
+# Replaced wholesale on every change so lookups never need a lock.
+_index = _empty_index()
+_generation = None
+_build_lock = threading.Lock()
+_started_pid = None
+_start_lock = threading.Lock()
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse punctuation to single spaces"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def _keys_for(*names):
+    keys = set()
+    for name in names:
+        words = normalize(name).split()
+        for i in range(len(words)):
+            keys.add(' '.join(words[i:]))
+    return keys
+
+
+def _url(source, row):
+    if source == 'player':
+        return f"/player/{row['slug']}"
+    if source == 'team':
+        return f"/team/{row['slug']}"
+    return f"/cricket-series/{row['slug']}" if row['slug'] else f"/series/{row['id']}"
+
+
+def _load(cur, index):
+    """Return index with rows added or changed since its watermarks added, replaced or dropped"""
+    keys, refs, entries, rows, watermarks = index
+    entries = list(entries)
+    rows = dict(rows)
+    watermarks = dict(watermarks)
+    new_pairs = []
+    stale = set()
+    for source, sql in SOURCES.items():
+        last_id, last_updated = watermarks[source]
+        cur.execute(sql, {'after_id': last_id, 'since': last_updated - UPDATE_OVERLAP if last_updated else None})
+        for row in cur.fetchall():
+            last_id = max(last_id, row['id'])
+            if row['updated_at'] and (last_updated is None or row['updated_at'] > last_updated):
+                last_updated = row['updated_at']
+            entry = row_keys = None
+            if row['listed']:
+                entry = {'type': source, 'title': row['name'], 'subtitle': row['subtitle'] or '', 'url': _url(source, row)}
+                row_keys = frozenset(_keys_for(row['name'], row['alias']))
+            old = rows.pop((source, row['id']), None)
+            if old and entries[old[0]] == entry and old[1] == row_keys:
+                rows[(source, row['id'])] = old
+                continue
+            if old:
+                stale.add(old[0])
+                entries[old[0]] = None
+            if entry is None:
+                continue
+            ref = len(entries)
+            entries.append(entry)
+            rows[(source, row['id'])] = (ref, row_keys)
+            new_pairs.extend((key, ref) for key in row_keys)
+        watermarks[source] = (last_id, last_updated)
+    if not new_pairs and not stale:
+        return (keys, refs, entries, rows, watermarks)
+
+    pairs = zip(keys, refs)
+    if stale:
+        pairs = [(key, ref) for key, ref in pairs if ref not in stale]
+    new_pairs.sort()
+    merged = list(heapq.merge(pairs, new_pairs))
+    return ([key for key, _ in merged], [ref for _, ref in merged], entries, rows, watermarks)
+
+
+def refresh():
+    """Catch the index up with the database, rebuilding it if invalidate() ran anywhere"""
+    global _index, _generation
+    with _build_lock:
+        started = time.perf_counter()
+        try:
+            conn = get_db()
+            cur = conn.cursor()
+            cur.execute('SELECT setting_value FROM site_settings WHERE setting_key = %s', (GENERATION_KEY,))
+            row = cur.fetchone()
+            generation = row['setting_value'] if row else None
+            rebuild = generation != _generation or not _index[2]
+            base = _empty_index() if rebuild else _index
+            index = _load(cur, base)
+            cur.close()
+            conn.close()
+        except Exception as e:
+            print(f"Autocomplete refresh error: {e}")
+            return
+        added = len(index[2]) - len(base[2])
+        _index = index
+        _generation = generation
+        if rebuild or added:
+            kind = 'Built' if rebuild else 'Added or updated'
+            print(f"Autocomplete: {kind} {added} entries ({len(index[0])} keys) in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+def invalidate():
+    """Force every process to rebuild, for deletes the watermarks cannot see"""
+    try:
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute('''
+            INSERT INTO site_settings (setting_key, setting_value) VALUES (%s, %s)
+            ON CONFLICT (setting_key) DO UPDATE SET setting_value = EXCLUDED.setting_value, updated_at = CURRENT_TIMESTAMP
+        ''', (GENERATION_KEY, str(time.time_ns())))
+        conn.commit()
+        cur.close()
+        conn.close()
+    except Exception as e:
+        print(f"Autocomplete invalidate error: {e}")
+        return
+    refresh()
+
+
+def lookup(q, limit=MAX_RESULTS):
+    """Entries with a name (or later word of one) starting with q, teams first"""
+    prefix = normalize(q)
+    if len(prefix) < MIN_QUERY_LENGTH:
+        return []
+    keys, refs, entries, _, _ = _index
+    seen = set()
+    found = []
+    i = bisect_left(keys, prefix)
+    # Gather a few extra so teams can be ranked ahead of the players sharing their prefix
+    while i < len(keys) and keys[i].startswith(prefix) and len(found) < limit * 3:
+        if refs[i] not in seen:
+            seen.add(refs[i])
+            found.append(entries[refs[i]])
+        i += 1
+    order = {source: n for n, source in enumerate(SOURCES)}
+    found.sort(key=lambda e: order[e['type']])
+    return found[:limit]
+
+
+def _refresh_loop():
+    while True:
+        refresh()
+        time.sleep(REFRESH_INTERVAL)
+
+
+def start():
+    """Build this process's index in the background and keep it caught up"""
+    global _started_pid
+    pid = os.getpid()
+    with _start_lock:
+        if _started_pid == pid:
+            return
+        _started_pid = pid
+    threading.Thread(target=_refresh_loop, name='autocomplete-refresh', daemon=True).start()
@@ -0,0 +1,80 @@
+"""Benchmark FastJSONProvider against Flask's default provider on a 500-match payload.
+
+The payload mimics /api/live-matches: RealDictRows with a date, a datetime,
+a Decimal and nested analytics, with a case of non-ASCII commentary (accented
+names, dashes, emoji) that Flask escapes. Both providers must produce the same
+response body. Run from the repository root:
+
+    python bench/json_responses.py
+"""
+import datetime
+import decimal
+import os
+import sys
+import time
+
+from flask import Flask
+from psycopg2.extras import RealDictRow
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_provider  # noqa: E402
+
+MATCHES = 500
+ITERATIONS = 200
+
+
+def match_row(i, with_dates=True, non_ascii=False):
+    row = RealDictRow()
+    row['match_id'] = 100000 + i
+    row['match_title'] = f'Team {i} vs Team {i + 1}, {i % 70 + 1}th Match'
+    row['series_name'] = 'Indian Premier League 2026'
+    row['team1_name'] = f'Team {i}'
+    row['team2_name'] = f'Team {i + 1}'
+    row['team1_score'] = '185-6 (20)'
+    row['team2_score'] = '142-4 (15.3)'
+    row['team1_flag_class'] = f'flag-sprite flag-team-{i}'
+    row['team2_flag_class'] = f'flag-sprite flag-team-{i + 1}'
+    row['match_status'] = f'Team {i + 1} need 44 runs in 27 balls'
+    row['is_live'] = True
+    row['net_run_rate'] = decimal.Decimal('0.412')
+    row['analytics'] = {
+        'innings': 2, 'batting_team': f'Team {i + 1}', 'current_run_rate': 9.16, 'target': 186,
+        'runs_needed': 44, 'balls_remaining': 27, 'required_run_rate': 9.78,
+        'win_probability': {f'Team {i + 1}': 41, f'Team {i}': 59}
+    }
+    if non_ascii:
+        row['venue'] = 'Wānkhede Stadium, Mumbai'
+        row['last_event'] = f'Müller {i} drives — “superb” four \U0001F3CF'
+    if with_dates:
+        row['match_date'] = datetime.date(2026, 4, i % 28 + 1)
+        row['updated_at'] = datetime.datetime(2026, 4, i % 28 + 1, 19, 45, 12)
+    return row
+
+
+def per_response_ms(app, payload):
+    with app.app_context():
+        started = time.perf_counter()
+        for _ in range(ITERATIONS):
+            body = app.json.response(payload).get_data()
+        return (time.perf_counter() - started) / ITERATIONS * 1000, body
+
+
+def main():
+    default_app = Flask(__name__)
+    fast_app = Flask(__name__)
+    fast_app.json = json_provider.FastJSONProvider(fast_app)
+    cases = (('with date fields', True, False), ('without date fields', False, False),
+             ('with non-ASCII text', True, True))
+    for label, with_dates, non_ascii in cases:
+        payload = {'success': True, 'matches': [match_row(i, with_dates, non_ascii) for i in range(MATCHES)]}
+        default_ms, expected = per_response_ms(default_app, payload)
+        fast_ms, actual = per_response_ms(fast_app, payload)
+        if actual != expected:
+            raise SystemExit(f'{label}: FastJSONProvider output differs from the default provider')
+        print(f'{MATCHES} matches {label}, {len(expected) // 1024} KB: '
+              f'stdlib {default_ms:6.2f} ms, orjson {fast_ms:6.2f} ms, identical output')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark scraper.iter_player_links_with_roles against the squad role lookup it replaced.
+
+Builds synthetic squad pages of about 500 KB (news filler around four role
+sections), checks that both implementations give every player the same role,
+and times them with parsing excluded. Run from the repository root:
+
+    python bench/squad_roles.py
+"""
+import os
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraper  # noqa: E402
+
+ROLE_HEADERS = ('BATTERS', 'ALL ROUNDERS', 'WICKET KEEPERS', 'BOWLERS')
+SQUAD_SIZES = (40, 100, 240)
+REPEAT = 5
+# News filler on each side of the squad, sized so pages come out around 500 KB
+NEWS_ITEMS = 800
+
+
+def legacy_roles(soup):
+    """Roles as scrape_players_from_team assigned them before the single-pass walk"""
+    html_str = str(soup)
+    role_positions = []
+    role_patterns = [
+        (r'(?i)>BATTER[S]?<|>Batter[s]?<', 'Batter'),
+        (r'(?i)>ALL[ -]?ROUNDER[S]?<|>All[ -]?Rounder[s]?<', 'All-Rounder'),
+        (r'(?i)>WICKET[ -]?KEEPER[S]?<|>Wicket[ -]?Keeper[s]?<|>WK<', 'Wicket-Keeper'),
+        (r'(?i)>BOWLER[S]?<|>Bowler[s]?<', 'Bowler'),
+    ]
+    for pattern, role in role_patterns:
+        for m in re.finditer(pattern, html_str):
+            role_positions.append((m.start(), role))
+    role_positions.sort(key=lambda x: x[0])
+
+    roles = []
+    for link in soup.find_all('a', href=re.compile(r'/profiles/\d+/')):
+        link_pos = html_str.find(str(link))
+        current_role = 'Batter'
+        for pos, role in role_positions:
+            if pos < link_pos:
+                current_role = role
+            else:
+                break
+        roles.append((link['href'], current_role))
+    return roles
+
+
+def squad_page(players):
+    """Squad page with players split evenly across the four role sections"""
+    filler = ''.join(
+        f'<div class="nav"><a href="/cricket-news/{i}">News item {i}</a><p>{"lorem ipsum " * 20}</p></div>'
+        for i in range(NEWS_ITEMS)
+    )
+    parts = [f'<html><body>{filler}<main>']
+    player_id = 1
+    for header in ROLE_HEADERS:
+        parts.append(f'<div class="cb-font-18">{header}</div>')
+        for _ in range(players // len(ROLE_HEADERS)):
+            parts.append(
+                f'<a href="/profiles/{player_id}/player-{player_id}" class="cb-col">'
+                f'<img src="//static.cricbuzz.com/a/img/v1/50x50/i1/c{player_id}/p.jpg">'
+                f'<div class="cb-font-16">Player {player_id}</div><div class="cb-font-12">Right-hand bat</div></a>'
+            )
+            player_id += 1
+    parts.append(f'</main>{filler}</body></html>')
+    return ''.join(parts)
+
+
+def best_of(f, soup):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = f(soup)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    for players in SQUAD_SIZES:
+        html = squad_page(players)
+        soup = BeautifulSoup(html, 'lxml')
+        legacy_time, expected = best_of(legacy_roles, soup)
+        current_time, actual = best_of(
+            lambda s: [(link['href'], role) for link, role in scraper.iter_player_links_with_roles(s)], soup)
+        if actual != expected:
+            mismatches = [(a, b) for a, b in zip(expected, actual) if a != b]
+            raise SystemExit(f'{players} players: roles differ from the legacy lookup, e.g. {mismatches[:3]}')
+        print(f'{players:4d} players, {len(html) // 1024} KB: legacy {legacy_time * 1000:7.1f} ms, '
+              f'single pass {current_time * 1000:6.1f} ms, roles match')
+
+
+if __name__ == '__main__':
+    main()
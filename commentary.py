@@ -0,0 +1,130 @@
+"""Ball-by-ball commentary for matches in play.
+
+ingest_live() polls Cricbuzz's commentary JSON for every match lifecycle has
+in play (toss, live or break), keeps only entries newer than the match's
+cursor in commentary_cursors, and appends them to the commentary table. The
+feed only returns the latest entries, so each poll downloads and parses a
+small window instead of the match history. Clients page forward through the
+table with /api/match/<id>/commentary?after=<last id>.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from psycopg2.extras import execute_values
+
+import lifecycle
+import ratelimit
+import scraper
+from scraper import get_db
+
+COMMENTARY_URL = 'https://www.cricbuzz.com/api/cricket-match/commentary/{match_id}'
+POLL_INTERVAL = 10
+COMMENTARY_WORKERS = 4
+PAGE_SIZE = 100
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json',
+    'Referer': 'https://www.cricbuzz.com/'
+}
+
+FORMAT_PLACEHOLDER = re.compile(r'[BI]\d+\$')
+
+
+def _expand_formats(text, formats):
+    """Replace Cricbuzz's B0$/I0$ placeholders with the bold/italic text they stand for"""
+    values = {}
+    for style in (formats or {}).values():
+        for format_id, value in zip(style.get('formatId', []), style.get('formatValue', [])):
+            values[format_id] = value
+    return FORMAT_PLACEHOLDER.sub(lambda m: values.get(m.group(0), ''), text)
+
+
+def parse_commentary(payload):
+    """Commentary entries from a commentary API response, oldest first"""
+    entries = []
+    for item in payload.get('commentaryList') or []:
+        timestamp = item.get('timestamp')
+        text = item.get('commText')
+        if not timestamp or not text:
+            continue
+        over = item.get('overNumber')
+        entries.append({
+            'ts': int(timestamp),
+            'innings': item.get('inningsId'),
+            'over': float(over) if over not in (None, '') else None,
+            'event': (item.get('event') or '')[:20] or None,
+            'text': _expand_formats(text, item.get('commentaryFormats')).replace('\\n', '\n').strip()
+        })
+    entries.sort(key=lambda e: e['ts'])
+    return entries
+
+
+def _fetch(match):
+    """(match_id, new entries) for one match, or (match_id, None) if the fetch failed"""
+    try:
+        response = scraper.fetch_page(COMMENTARY_URL.format(match_id=match['match_id']), HEADERS, 'commentary')
+        response.raise_for_status()
+        entries = parse_commentary(response.json())
+    except Exception as e:
+        print(f"Commentary fetch failed for {match['match_id']}: {e}")
+        return match['match_id'], None
+    return match['match_id'], [e for e in entries if e['ts'] > match['last_ts']]
+
+
+def ingest_live():
+    """Append new commentary for every match in play"""
+    if ratelimit.is_paused():
+        return {'success': False, 'message': 'Cricbuzz requests paused after repeated failures'}
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT sc.match_id, COALESCE(c.last_ts, 0) AS last_ts
+        FROM scorecards sc
+        LEFT JOIN commentary_cursors c ON c.match_id = sc.match_id
+        WHERE sc.state IN %s
+    ''', (lifecycle.ACTIVE_STATES,))
+    matches = cur.fetchall()
+
+    added = 0
+    with ThreadPoolExecutor(max_workers=COMMENTARY_WORKERS) as pool:
+        for match_id, entries in pool.map(_fetch, matches):
+            if not entries:
+                continue
+            execute_values(cur, '''
+                INSERT INTO commentary (match_id, ts, innings, over_number, event, text) VALUES %s
+                ON CONFLICT (match_id, ts) DO NOTHING
+            ''', [(match_id, e['ts'], e['innings'], e['over'], e['event'], e['text']) for e in entries])
+            added += len(entries)
+            cur.execute('''
+                INSERT INTO commentary_cursors (match_id, last_ts, updated_at) VALUES (%s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (match_id) DO UPDATE SET last_ts = GREATEST(commentary_cursors.last_ts, EXCLUDED.last_ts),
+                    updated_at = CURRENT_TIMESTAMP
+            ''', (match_id, entries[-1]['ts']))
+            conn.commit()
+
+    cur.close()
+    conn.close()
+    return {'success': True, 'message': f'Added {added} commentary entries across {len(matches)} matches in play', 'count': added}
+
+
+def entries_after(match_id, after=None, limit=PAGE_SIZE):
+    """Entries with id > after in order, or the latest `limit` entries when after is None"""
+    conn = get_db()
+    cur = conn.cursor()
+    if after is None:
+        cur.execute('''
+            SELECT * FROM (
+                SELECT id, innings, over_number, event, text, ts FROM commentary
+                WHERE match_id = %s ORDER BY id DESC LIMIT %s
+            ) latest ORDER BY id
+        ''', (match_id, limit))
+    else:
+        cur.execute('''
+            SELECT id, innings, over_number, event, text, ts FROM commentary
+            WHERE match_id = %s AND id > %s ORDER BY id LIMIT %s
+        ''', (match_id, after, limit))
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    return [dict(row, over_number=float(row['over_number']) if row['over_number'] is not None else None) for row in rows]
@@ -0,0 +1,185 @@
+"""gzip/brotli response compression and precompressed static files.
+
+init_app() registers an after_request hook that compresses text responses
+(HTML, JSON, CSS, JS, XML, SVG) of at least MIN_SIZE bytes with the best
+encoding the client accepts, brotli first when the brotli package is
+installed. Streamed responses are compressed chunk by chunk and flushed as
+they go. File responses are left alone: static files are served from
+.br/.gz copies written ahead of time by precompress_static(), which runs at
+startup and can be run as a build step with `python compression.py`.
+"""
+import gzip
+import mimetypes
+import os
+import zlib
+
+from flask import current_app, request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'application/xml', 'application/manifest+json',
+    'application/rss+xml', 'image/svg+xml', 'text/html', 'text/css', 'text/javascript', 'text/plain', 'text/xml'
+}
+STATIC_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.webmanifest', '.xml', '.txt', '.html')
+# Preferred first; .br/.gz are the suffixes precompress_static() writes
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(header):
+    """Encodings the client accepts with q > 0, from an Accept-Encoding header"""
+    accepted = set()
+    for part in (header or '').lower().split(','):
+        name, _, params = part.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name)
+    return accepted
+
+
+def negotiate(header, available=('br', 'gzip')):
+    accepted = accepted_encodings(header)
+    for encoding, _ in ENCODINGS:
+        if encoding in available and (encoding in accepted or '*' in accepted):
+            return encoding
+    return None
+
+
+def _available():
+    return ('br', 'gzip') if brotli else ('gzip',)
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _compress_stream(chunks, encoding):
+    """Compress an iterable of chunks, flushing after each so streamed output reaches the client promptly"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            yield compressor.process(chunk.encode() if isinstance(chunk, str) else chunk) + compressor.flush()
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            yield compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    if hasattr(chunks, 'close'):
+        chunks.close()
+
+
+def _add_vary(response):
+    vary = response.headers.get('Vary', '')
+    if 'accept-encoding' not in vary.lower():
+        response.headers['Vary'] = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+
+
+def compress_response(response):
+    """after_request hook: compress the response body if the client and content type allow it"""
+    if (response.mimetype not in COMPRESSIBLE_TYPES or response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+    _add_vary(response)
+    encoding = negotiate(request.headers.get('Accept-Encoding'), _available())
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < MIN_SIZE:
+            return response
+        response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    if response.headers.get('ETag'):
+        # The compressed body is a different representation from the plain one
+        response.headers['ETag'] = response.headers['ETag'].rstrip('"') + f'-{encoding}"'
+    return response
+
+
+def send_static(filename):
+    """Static file view that serves a fresh .br/.gz copy when the client accepts it"""
+    folder = current_app.static_folder
+    source = safe_join(folder, filename)
+    available = []
+    if source and os.path.isfile(source):
+        for name, suffix in ENCODINGS:
+            compressed = source + suffix
+            if os.path.isfile(compressed) and os.path.getmtime(compressed) >= os.path.getmtime(source):
+                available.append(name)
+    encoding = negotiate(request.headers.get('Accept-Encoding'), available)
+    if not encoding:
+        response = current_app.send_static_file(filename)
+    else:
+        suffix = dict(ENCODINGS)[encoding]
+        response = send_from_directory(folder, filename + suffix, mimetype=mimetypes.guess_type(filename)[0],
+                                       max_age=current_app.get_send_file_max_age(filename))
+        response.headers['Content-Encoding'] = encoding
+    if available:
+        _add_vary(response)
+    return response
+
+
+def precompress_static(folder):
+    """Write .gz (and .br with brotli installed) next to every compressible static file that changed. Returns files written"""
+    written = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if not name.endswith(STATIC_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            if os.path.getsize(path) < MIN_SIZE:
+                continue
+            data = None
+            for encoding, suffix in ENCODINGS:
+                if encoding == 'br' and not brotli:
+                    continue
+                target = path + suffix
+                if os.path.isfile(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                if encoding == 'br':
+                    body = brotli.compress(data, quality=11)
+                else:
+                    body = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(body) >= len(data):
+                    continue
+                # Write then rename so a worker never serves a half-written file
+                partial = f'{target}.{os.getpid()}.tmp'
+                with open(partial, 'wb') as f:
+                    f.write(body)
+                os.replace(partial, target)
+                written += 1
+    return written
+
+
+def init_app(app):
+    app.after_request(compress_response)
+    app.view_functions['static'] = send_static
+
+
+if __name__ == '__main__':
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    print(f"Precompressed {precompress_static(static_folder)} static files")
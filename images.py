@@ -0,0 +1,297 @@
+"""Upload ingest pipeline: decode once, strip metadata, write resized WebP and JPEG variants.
+
+Uploads are content-addressed: every file is named by the SHA-256 of the
+uploaded bytes, so uploading the same image again reuses the stored variants
+and /uploads/ URLs never change meaning. Variants are recorded in the
+uploaded_images table keyed by the URL stored on the post (the largest JPEG),
+and picture_tag() turns that URL into a <picture> element for templates.
+collect_garbage() deletes uploads nothing references any more.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+
+from markupsafe import Markup, escape
+from PIL import Image, ImageOps
+
+from scraper import get_db
+
+VARIANT_WIDTHS = (320, 640, 960, 1280)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+MISSING_TTL = 300
+UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
+UPLOAD_URL_PREFIX = '/uploads/'
+GC_GRACE_SECONDS = 86400
+
+UPLOAD_NAME_PATTERN = re.compile(r'([0-9a-f]{64})(?:-\d+w)?\.(?:jpg|webp|gif)')
+UPLOAD_REF_PATTERN = re.compile(r'/uploads/([0-9a-f]{64})')
+
+# Every column that can hold an /uploads/ URL; collect_garbage() keeps anything referenced from these
+REFERENCE_COLUMNS = (
+    ('posts', 'featured_image'),
+    ('posts', 'og_image'),
+    ('posts', 'content'),
+    ('post_categories', 'og_image'),
+    ('post_categories', 'content'),
+    ('pages', 'content'),
+    ('keyword_pages', 'content'),
+    ('matchups', 'image_url'),
+    ('matchups', 'content'),
+    ('teams', 'flag_url'),
+)
+
+_variants_cache = {}
+
+
+def _variant_name(digest, width, ext):
+    return f"{digest}-{width}w.{ext}"
+
+
+def _write_atomic(path, write):
+    """Write via a temp file so concurrent uploads of the same image never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_bytes(data):
+    def write(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+    return write
+
+
+def _flatten(image):
+    """JPEG has no alpha channel, so composite transparent images onto white"""
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def _existing_upload(digest):
+    """URL of an earlier upload with the same content, marking it as freshly used so GC keeps it"""
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute('''
+        UPDATE uploaded_images SET last_uploaded_at = CURRENT_TIMESTAMP
+        WHERE content_hash = %s
+        RETURNING url
+    ''', (digest,))
+    row = cur.fetchone()
+    conn.commit()
+    cur.close()
+    conn.close()
+    return row['url'] if row else None
+
+
+def _record_upload(digest, url, width, height, variants):
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute('''
+        INSERT INTO uploaded_images (url, width, height, variants, content_hash)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (url) DO UPDATE SET width = EXCLUDED.width, height = EXCLUDED.height, variants = EXCLUDED.variants,
+            content_hash = EXCLUDED.content_hash, last_uploaded_at = CURRENT_TIMESTAMP
+    ''', (url, width, height, json.dumps(variants), digest))
+    conn.commit()
+    cur.close()
+    conn.close()
+    _variants_cache[url] = (variants, None)
+
+
+def save_upload(file, upload_folder):
+    """Process an uploaded image and return the URL to store on the post.
+
+    Animated GIFs are kept as uploaded; everything else is re-encoded into
+    VARIANT_WIDTHS-wide WebP and JPEG files without EXIF or other metadata.
+    Raises ValueError if the file is not a readable image.
+    """
+    data = file.read()
+    digest = hashlib.sha256(data).hexdigest()
+    existing_url = _existing_upload(digest)
+    if existing_url and os.path.exists(os.path.join(upload_folder, os.path.basename(existing_url))):
+        return existing_url
+    os.makedirs(upload_folder, exist_ok=True)
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        if getattr(image, 'is_animated', False):
+            filename = f"{digest}.gif"
+            _write_atomic(os.path.join(upload_folder, filename), _write_bytes(data))
+            url = f"{UPLOAD_URL_PREFIX}{filename}"
+            _record_upload(digest, url, image.width, image.height, [])
+            return url
+        # Let the JPEG decoder scale down while decoding when the source is far larger than we need
+        image.draft('RGB', (VARIANT_WIDTHS[-1], VARIANT_WIDTHS[-1] * 4))
+        image = ImageOps.exif_transpose(image)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f'Could not read image: {e}')
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    widths = [w for w in VARIANT_WIDTHS if w < image.width] + [min(image.width, VARIANT_WIDTHS[-1])]
+    variants = []
+    for width in sorted(set(widths), reverse=True):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+        webp_name = _variant_name(digest, width, 'webp')
+        _write_atomic(os.path.join(upload_folder, webp_name),
+                      lambda path: resized.save(path, 'WEBP', quality=WEBP_QUALITY, method=4))
+        jpeg_name = _variant_name(digest, width, 'jpg')
+        _write_atomic(os.path.join(upload_folder, jpeg_name),
+                      lambda path: _flatten(resized).save(path, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True))
+
+        for fmt, name in (('webp', webp_name), ('jpeg', jpeg_name)):
+            variants.append({
+                'format': fmt,
+                'width': width,
+                'url': f"{UPLOAD_URL_PREFIX}{name}",
+                'bytes': os.path.getsize(os.path.join(upload_folder, name))
+            })
+
+    url = f"{UPLOAD_URL_PREFIX}{_variant_name(digest, max(widths), 'jpg')}"
+    _record_upload(digest, url, image.width, image.height, variants)
+    return url
+
+
+def _referenced_sql(columns, digest):
+    """SQL condition that is true while any of columns still contains /uploads/<digest>"""
+    checks = [f"EXISTS (SELECT 1 FROM {table} WHERE strpos({table}.{column}, '/uploads/' || {digest}) > 0)"
+              for table, column in columns]
+    return ' OR '.join(checks) or 'FALSE'
+
+
+def collect_garbage(upload_folder=UPLOAD_FOLDER):
+    """Delete uploads that no post, page, category, matchup or team references.
+
+    Uploads used within GC_GRACE_SECONDS are kept so an image uploaded for a
+    post that has not been saved yet is not collected. Files from before
+    content addressing (uuid-named) are never touched.
+    """
+    conn = get_db()
+    cur = conn.cursor()
+    referenced = set()
+    columns = []
+    for table, column in REFERENCE_COLUMNS:
+        cur.execute('SELECT to_regclass(%s) AS oid', (table,))
+        if cur.fetchone()['oid'] is None:
+            continue
+        columns.append((table, column))
+        cur.execute(f"SELECT {column} AS value FROM {table} WHERE {column} LIKE %s", ('%/uploads/%',))
+        for row in cur.fetchall():
+            referenced.update(UPLOAD_REF_PATTERN.findall(row['value']))
+
+    cur.execute('SELECT content_hash FROM uploaded_images WHERE content_hash IS NOT NULL')
+    known = {row['content_hash'] for row in cur.fetchall()}
+
+    # Rows are deleted and files removed in one transaction: a concurrent upload of the same content
+    # blocks on the row lock in _existing_upload() and re-processes the image once this commits.
+    # References are checked again in the DELETE so a post saved since the scan above keeps its images
+    cur.execute(f'''
+        DELETE FROM uploaded_images
+        WHERE content_hash IS NOT NULL AND NOT (content_hash = ANY(%s::text[]))
+          AND last_uploaded_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+          AND NOT ({_referenced_sql(columns, 'uploaded_images.content_hash')})
+        RETURNING url, content_hash
+    ''', (list(referenced), GC_GRACE_SECONDS))
+    collected = cur.fetchall()
+    garbage = {row['content_hash'] for row in collected}
+
+    removed = 0
+    freed = 0
+    cutoff = time.time() - GC_GRACE_SECONDS
+    try:
+        filenames = os.listdir(upload_folder)
+    except OSError:
+        filenames = []
+    # Files with no row at all are leftovers from an upload that failed part-way through
+    candidates = {match.group(1) for match in map(UPLOAD_NAME_PATTERN.fullmatch, filenames) if match}
+    candidates -= known | referenced
+    stray = set()
+    if candidates:
+        cur.execute(f'''
+            SELECT digest FROM unnest(%s::text[]) AS digest
+            WHERE NOT ({_referenced_sql(columns, 'digest')})
+        ''', (list(candidates),))
+        stray = {row['digest'] for row in cur.fetchall()}
+
+    for filename in filenames:
+        match = UPLOAD_NAME_PATTERN.fullmatch(filename)
+        if not match:
+            continue
+        digest = match.group(1)
+        path = os.path.join(upload_folder, filename)
+        try:
+            if digest in garbage or (digest in stray and os.path.getmtime(path) < cutoff):
+                freed += os.path.getsize(path)
+                os.remove(path)
+                removed += 1
+        except OSError as e:
+            print(f"Upload GC: could not remove {filename}: {e}")
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    for row in collected:
+        _variants_cache.pop(row['url'], None)
+    message = f'Removed {len(collected)} unreferenced uploads ({removed} files, {freed // 1024} KB)'
+    print(f"Upload GC: {message}")
+    return {'success': True, 'message': message}
+
+
+def get_variants(url):
+    """Variants recorded for an uploaded image URL, cached in-process (uploads never change)"""
+    if not url or not url.startswith((UPLOAD_URL_PREFIX, '/static/uploads/')):
+        return []
+    cached = _variants_cache.get(url)
+    if cached and (cached[1] is None or cached[1] > time.time()):
+        return cached[0]
+    try:
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute('SELECT variants FROM uploaded_images WHERE url = %s', (url,))
+        row = cur.fetchone()
+        cur.close()
+        conn.close()
+    except Exception as e:
+        print(f"Image variant lookup error: {e}")
+        return []
+    if row and row['variants']:
+        variants = json.loads(row['variants'])
+        _variants_cache[url] = (variants, None)
+    else:
+        variants = []
+        _variants_cache[url] = (variants, time.time() + MISSING_TTL)
+    return variants
+
+
+def picture_tag(url, alt='', sizes='100vw', css_class='', loading=None):
+    """Render an uploaded image as <picture> with WebP/JPEG srcsets, or a plain <img> for other URLs"""
+    attrs = f' alt="{escape(alt)}"'
+    if css_class:
+        attrs += f' class="{escape(css_class)}"'
+    if loading:
+        attrs += f' loading="{escape(loading)}"'
+
+    variants = get_variants(url)
+    if not variants:
+        return Markup(f'<img src="{escape(url)}"{attrs}>')
+
+    srcsets = {}
+    for v in sorted(variants, key=lambda v: v['width']):
+        srcsets.setdefault(v['format'], []).append(f"{v['url']} {v['width']}w")
+    return Markup(
+        '<picture style="display:contents">'
+        f'<source type="image/webp" srcset="{escape(", ".join(srcsets.get("webp", [])))}" sizes="{escape(sizes)}">'
+        f'<img src="{escape(url)}" srcset="{escape(", ".join(srcsets.get("jpeg", [])))}" sizes="{escape(sizes)}"{attrs}>'
+        '</picture>'
+    )
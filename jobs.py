@@ -0,0 +1,333 @@
+"""Postgres-backed job queue for long-running admin scrapes.
+
+Admin endpoints enqueue a job and return its id straight away. Worker threads
+in every app process claim queued jobs with FOR UPDATE SKIP LOCKED, report
+progress into the scrape_jobs row, and stop at the next progress report once
+a cancellation has been requested. A heartbeat thread refreshes each running
+job's row between reports, so only the jobs of a worker that died are requeued.
+Identical jobs that are already queued or running are deduplicated by a
+partial unique index on dedup_key.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+
+import autocomplete
+import images
+import leaderboards
+import metrics
+import mirror
+import results
+import scraper
+import sprites
+from scraper import get_db
+
+WORKER_THREADS = int(os.environ.get('JOB_WORKERS', '2'))
+POLL_INTERVAL = 2
+STALE_AFTER = 900
+# Running jobs touch heartbeat_at this often even when their handler never reports progress
+HEARTBEAT_INTERVAL = 60
+PROGRESS_INTERVAL = 1
+
+JOBS = metrics.Counter('cricbuzz_jobs_total', 'Background jobs finished by type and final status', ['job_type', 'status'])
+
+_handlers = {}
+_workers_pid = None
+_workers_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def job_handler(job_type):
+    """Register a function(job, progress) that runs jobs of job_type and returns a scraper result dict"""
+    def decorator(f):
+        _handlers[job_type] = f
+        return f
+    return decorator
+
+
+def enqueue(job_type, params=None):
+    """Queue a job unless an identical one is already queued or running. Returns (job_id, created)"""
+    params = params or {}
+    params_json = json.dumps(params, sort_keys=True)
+    dedup_key = f"{job_type}:{params_json}"
+
+    conn = get_db()
+    cur = conn.cursor()
+    row = None
+    created = False
+    for _ in range(3):
+        cur.execute('''
+            INSERT INTO scrape_jobs (job_type, params, dedup_key)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (dedup_key) WHERE status IN ('queued', 'running') DO NOTHING
+            RETURNING id
+        ''', (job_type, params_json, dedup_key))
+        row = cur.fetchone()
+        if row:
+            created = True
+            break
+        cur.execute("SELECT id FROM scrape_jobs WHERE dedup_key = %s AND status IN ('queued', 'running')", (dedup_key,))
+        row = cur.fetchone()
+        if row:
+            break
+    conn.commit()
+    cur.close()
+    conn.close()
+    return row['id'], created
+
+
+def get_job(job_id):
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute('SELECT * FROM scrape_jobs WHERE id = %s', (job_id,))
+    job = cur.fetchone()
+    cur.close()
+    conn.close()
+    if not job:
+        return None
+    return {
+        'id': job['id'],
+        'job_type': job['job_type'],
+        'params': json.loads(job['params'] or '{}'),
+        'status': job['status'],
+        'progress': job['progress'],
+        'progress_total': job['progress_total'],
+        'message': job['message'] or '',
+        'cancel_requested': job['cancel_requested'],
+        'created_at': job['created_at'].isoformat() if job['created_at'] else '',
+        'started_at': job['started_at'].isoformat() if job['started_at'] else '',
+        'finished_at': job['finished_at'].isoformat() if job['finished_at'] else ''
+    }
+
+
+def cancel(job_id):
+    """Cancel a queued job now, or ask a running job to stop at its next progress report"""
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute('''
+        UPDATE scrape_jobs SET cancel_requested = TRUE,
+            status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+            message = CASE WHEN status = 'queued' THEN 'Cancelled' ELSE message END,
+            finished_at = CASE WHEN status = 'queued' THEN CURRENT_TIMESTAMP ELSE finished_at END
+        WHERE id = %s AND status IN ('queued', 'running')
+        RETURNING status
+    ''', (job_id,))
+    row = cur.fetchone()
+    conn.commit()
+    cur.close()
+    conn.close()
+    return row['status'] if row else None
+
+
+def _progress_reporter(job_id):
+    last_report = [0.0]
+
+    def report(done, total=None, message=None):
+        # Handlers may report per item; write (and check for cancellation) at most once per PROGRESS_INTERVAL
+        now = time.monotonic()
+        if now - last_report[0] < PROGRESS_INTERVAL and done != total:
+            return
+        last_report[0] = now
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute('''
+            UPDATE scrape_jobs SET progress = %s, progress_total = COALESCE(%s, progress_total),
+                message = COALESCE(%s, message), heartbeat_at = CURRENT_TIMESTAMP
+            WHERE id = %s
+            RETURNING cancel_requested
+        ''', (done, total, message, job_id))
+        row = cur.fetchone()
+        conn.commit()
+        cur.close()
+        conn.close()
+        if row and row['cancel_requested']:
+            raise JobCancelled()
+    return report
+
+
+def _claim_next(worker_name):
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute('''
+        UPDATE scrape_jobs SET status = 'queued', worker = NULL
+        WHERE status = 'running' AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+    ''', (STALE_AFTER,))
+    cur.execute('''
+        UPDATE scrape_jobs SET status = 'running', worker = %s,
+            started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP
+        WHERE id = (
+            SELECT id FROM scrape_jobs WHERE status = 'queued'
+            ORDER BY id FOR UPDATE SKIP LOCKED LIMIT 1
+        )
+        RETURNING *
+    ''', (worker_name,))
+    job = cur.fetchone()
+    conn.commit()
+    cur.close()
+    conn.close()
+    return job
+
+
+def _heartbeat(job_id, worker_name, stop):
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        try:
+            conn = get_db()
+            cur = conn.cursor()
+            cur.execute('''
+                UPDATE scrape_jobs SET heartbeat_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND worker = %s AND status = 'running'
+            ''', (job_id, worker_name))
+            conn.commit()
+            cur.close()
+            conn.close()
+        except Exception as e:
+            print(f"Job {job_id} heartbeat error: {e}")
+
+
+def _finish(job_id, worker_name, status, message, result):
+    """Record the outcome unless the job was requeued and claimed by another worker meanwhile. Returns whether it was"""
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute('''
+        UPDATE scrape_jobs SET status = %s, message = %s, result = %s, finished_at = CURRENT_TIMESTAMP
+        WHERE id = %s AND worker = %s
+    ''', (status, message, json.dumps(result) if result is not None else None, job_id, worker_name))
+    finished = cur.rowcount > 0
+    conn.commit()
+    cur.close()
+    conn.close()
+    return finished
+
+
+def _run(job):
+    handler = _handlers.get(job['job_type'])
+    result = None
+    stop_heartbeat = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job['id'], job['worker'], stop_heartbeat),
+                     name=f"job-heartbeat-{job['id']}", daemon=True).start()
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job type {job['job_type']}")
+        job = dict(job, params=json.loads(job['params'] or '{}'))
+        result = handler(job, _progress_reporter(job['id']))
+        status = 'completed' if result.get('success') else 'failed'
+        message = result.get('message', '')
+    except JobCancelled:
+        status = 'cancelled'
+        message = 'Cancelled'
+    except Exception as e:
+        traceback.print_exc()
+        status = 'failed'
+        message = f'Error: {str(e)}'
+    finally:
+        stop_heartbeat.set()
+    if not _finish(job['id'], job['worker'], status, message, result):
+        print(f"Job {job['id']} ({job['job_type']}) was taken over by another worker; dropping this run's {status} result")
+        return
+    JOBS.inc(job_type=job['job_type'], status=status)
+    print(f"Job {job['id']} ({job['job_type']}) {status}: {message}")
+
+
+def _worker_loop(worker_name):
+    while True:
+        try:
+            job = _claim_next(worker_name)
+        except Exception as e:
+            print(f"Job queue error: {e}")
+            job = None
+        if job is None:
+            time.sleep(POLL_INTERVAL)
+            continue
+        try:
+            _run(job)
+        except Exception as e:
+            print(f"Job {job['id']} crashed: {e}")
+
+
+def start_workers():
+    """Start this process's worker threads once (set JOB_WORKERS=0 to disable)"""
+    global _workers_pid
+    pid = os.getpid()
+    with _workers_lock:
+        if _workers_pid == pid or WORKER_THREADS <= 0:
+            return
+        _workers_pid = pid
+    for i in range(WORKER_THREADS):
+        worker_name = f"{socket.gethostname()}:{pid}:{i}"
+        threading.Thread(target=_worker_loop, args=(worker_name,), name=f'job-worker-{i}', daemon=True).start()
+
+
+@job_handler('scrape_series')
+def _scrape_series(job, progress):
+    result = scraper.scrape_series_data(progress=progress)
+    if result.get('success'):
+        autocomplete.refresh()
+    return result
+
+
+@job_handler('scrape_all_matches')
+def _scrape_all_matches(job, progress):
+    return scraper.scrape_all_matches(progress=progress, full=job['params'].get('full', False))
+
+
+@job_handler('scrape_teams')
+def _scrape_teams(job, progress):
+    result = scraper.scrape_teams(job['params']['team_type'], progress=progress)
+    if result.get('success'):
+        autocomplete.refresh()
+        enqueue('mirror_images')
+    return result
+
+
+@job_handler('scrape_players')
+def _scrape_players(job, progress):
+    result = scraper.scrape_players_from_team(job['params']['team_id'], progress=progress)
+    if result.get('success'):
+        autocomplete.refresh()
+        enqueue('mirror_images')
+    return result
+
+
+@job_handler('scrape_player_profiles')
+def _scrape_player_profiles(job, progress):
+    # Players refreshed since the job was queued are skipped, so a requeued job resumes where it stopped
+    team_id = job['params'].get('team_id')
+    result = scraper.scrape_player_profiles(team_id=team_id, refreshed_before=job['created_at'] if team_id else None, progress=progress)
+    enqueue('materialize_player_stats')
+    return result
+
+
+@job_handler('mirror_images')
+def _mirror_images(job, progress):
+    # Rebuild even when nothing new was downloaded: newly scraped teams may reuse an already mirrored flag
+    result = mirror.mirror_pending(progress=progress)
+    enqueue('build_flag_sprite')
+    return result
+
+
+@job_handler('build_flag_sprite')
+def _build_flag_sprite(job, progress):
+    return sprites.build_flag_sprite()
+
+
+@job_handler('collect_upload_garbage')
+def _collect_upload_garbage(job, progress):
+    return images.collect_garbage()
+
+
+@job_handler('materialize_player_stats')
+def _materialize_player_stats(job, progress):
+    started = time.perf_counter()
+    count = leaderboards.materialize()
+    return {'success': True, 'message': f'Materialized {count} player stat rows in {time.perf_counter() - started:.2f}s'}
+
+
+@job_handler('rebuild_head_to_head')
+def _rebuild_head_to_head(job, progress):
+    return results.rebuild()
@@ -0,0 +1,59 @@
+"""Flask JSON provider that serializes API responses with orjson when it is installed.
+
+The response body is byte for byte what Flask's default provider produces:
+RealDictRows are plain dicts, dates and datetimes become HTTP dates, Decimals
+and UUIDs become strings, and keys are sorted. orjson does the dict/list/str
+work in C and falls back to the provider's default() only for those types.
+Flask escapes non-ASCII text (and DEL) as \\uXXXX, so escape_non_ascii()
+rewrites just those characters in orjson's output, astral ones as surrogate
+pairs. The stdlib encoder is used without orjson and for a value orjson cannot
+encode (integers beyond 64 bits). dumps() (the tojson filter) is left to the
+default provider.
+"""
+import codecs
+from json.encoder import encode_basestring_ascii
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _escape_run(error):
+    # Called by encode('ascii') with each run of non-ASCII characters. Non-ASCII text never needs
+    # the quote/backslash escapes, so the stdlib's C string encoder gives its exact \\uXXXX form
+    return encode_basestring_ascii(error.object[error.start:error.end])[1:-1], error.end
+
+
+codecs.register_error('json_provider.escape', _escape_run)
+
+
+def escape_non_ascii(body):
+    """orjson output (UTF-8 bytes) with non-ASCII characters escaped the way json.dumps(ensure_ascii=True) does"""
+    if body.isascii() and b'\x7f' not in body:
+        return body
+    return body.decode('utf-8').encode('ascii', 'json_provider.escape').replace(b'\x7f', b'\\u007f')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    def _orjson_dumps(self, obj):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = self._orjson_dumps(obj)
+        except TypeError:
+            return super().response(*args, **kwargs)
+        if self.ensure_ascii:
+            body = escape_non_ascii(body)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
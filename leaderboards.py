@@ -0,0 +1,138 @@
+"""Career-stat leaderboards across every scraped player profile.
+
+Profiles keep their career stats as JSON text, which is fine for one player
+page but useless for ranking. materialize() unpacks every player's stats into
+typed integer columns in player_stats with one set-based INSERT ... SELECT,
+and leaderboard() ranks a format's rows with a single window-function query.
+Results are cached per process for CACHE_TTL and dropped whenever the stats
+are rematerialized here.
+"""
+import threading
+import time
+
+from scraper import get_db
+
+FORMATS = {'test': 'Test', 'odi': 'ODI', 't20i': 'T20I', 'ipl': 'IPL'}
+LEADERBOARD_SIZE = 50
+CACHE_TTL = 300
+
+# JSON stat name -> player_stats column, per profile table
+BATTING_FIELDS = {
+    'Matches': 'matches', 'Innings': 'innings', 'Not Out': 'not_outs', 'Runs': 'runs', 'Balls': 'balls_faced',
+    'Fours': 'fours', 'Sixes': 'sixes', '50s': 'fifties', '100s': 'hundreds', 'Ducks': 'ducks'
+}
+BOWLING_FIELDS = {
+    'Innings': 'bowling_innings', 'Balls': 'balls_bowled', 'Runs': 'runs_conceded', 'Wickets': 'wickets',
+    'Maidens': 'maidens', '5w': 'five_wickets', '10w': 'ten_wickets'
+}
+
+# value is a SQL expression over player_stats; qualify keeps small samples out of the rate stats
+STATS = {
+    'runs': {'label': 'Most Runs', 'value': 'runs', 'qualify': 'runs > 0'},
+    'batting-average': {'label': 'Best Batting Average', 'value': 'runs::numeric / NULLIF(innings - not_outs, 0)',
+                        'qualify': 'innings >= 10', 'decimals': 2},
+    'strike-rate': {'label': 'Best Batting Strike Rate', 'value': 'runs * 100.0 / NULLIF(balls_faced, 0)',
+                    'qualify': 'balls_faced >= 250', 'decimals': 2},
+    'hundreds': {'label': 'Most Hundreds', 'value': 'hundreds', 'qualify': 'hundreds > 0'},
+    'fifties': {'label': 'Most Fifties', 'value': 'fifties', 'qualify': 'fifties > 0'},
+    'sixes': {'label': 'Most Sixes', 'value': 'sixes', 'qualify': 'sixes > 0'},
+    'wickets': {'label': 'Most Wickets', 'value': 'wickets', 'qualify': 'wickets > 0'},
+    'bowling-average': {'label': 'Best Bowling Average', 'value': 'runs_conceded::numeric / NULLIF(wickets, 0)',
+                        'qualify': 'wickets >= 20', 'ascending': True, 'decimals': 2},
+    'economy': {'label': 'Best Economy Rate', 'value': 'runs_conceded * 6.0 / NULLIF(balls_bowled, 0)',
+                'qualify': 'balls_bowled >= 300', 'ascending': True, 'decimals': 2},
+    'five-wickets': {'label': 'Most Five-Wicket Hauls', 'value': 'five_wickets', 'qualify': 'five_wickets > 0'},
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _int_field(source, name):
+    # Profiles show '-' for stats that do not apply, so anything non-numeric becomes NULL
+    return (f"CASE WHEN {source}->>'{name}' ~ '^[0-9]+$' THEN ({source}->>'{name}')::integer END")
+
+
+def materialize(cur=None):
+    """Rewrite player_stats from every player's stored career stats. Returns the row count"""
+    own_connection = cur is None
+    if own_connection:
+        conn = get_db()
+        cur = conn.cursor()
+    columns = list(BATTING_FIELDS.values()) + list(BOWLING_FIELDS.values())
+    values = ([_int_field('bat.value', name) for name in BATTING_FIELDS]
+              + [_int_field('bowl.value', name) for name in BOWLING_FIELDS])
+    cur.execute('DELETE FROM player_stats')
+    cur.execute(f'''
+        INSERT INTO player_stats (player_id, format, {', '.join(columns)})
+        SELECT p.id, f.format, {', '.join(values)}
+        FROM players p
+        CROSS JOIN LATERAL (
+            SELECT jsonb_object_keys(COALESCE(p.batting_stats::jsonb, '{{}}') || COALESCE(p.bowling_stats::jsonb, '{{}}')) AS format
+        ) f
+        LEFT JOIN LATERAL (SELECT p.batting_stats::jsonb -> f.format AS value) bat ON TRUE
+        LEFT JOIN LATERAL (SELECT p.bowling_stats::jsonb -> f.format AS value) bowl ON TRUE
+        WHERE p.profile_scraped IS TRUE
+    ''')
+    count = cur.rowcount
+    if own_connection:
+        conn.commit()
+        cur.close()
+        conn.close()
+    invalidate()
+    return count
+
+
+def invalidate():
+    with _cache_lock:
+        _cache.clear()
+
+
+def leaderboard(format_slug, stat):
+    """Top LEADERBOARD_SIZE players for a format and stat, or None if either is unknown"""
+    fmt = FORMATS.get(format_slug)
+    spec = STATS.get(stat)
+    if not fmt or not spec:
+        return None
+
+    key = (fmt, stat)
+    cached = _cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    order = 'ASC' if spec.get('ascending') else 'DESC'
+    conn = get_db()
+    cur = conn.cursor()
+    # A cricketer has one players row per squad they are listed in, so keep one row per Cricbuzz id
+    cur.execute(f'''
+        SELECT RANK() OVER (ORDER BY value {order}) AS rank, *
+        FROM (
+            SELECT DISTINCT ON (COALESCE(p.cricbuzz_id, p.id::text))
+                p.name, p.slug, t.name AS team_name, s.matches, ({spec['value']}) AS value
+            FROM player_stats s
+            JOIN players p ON p.id = s.player_id AND p.is_published
+            LEFT JOIN teams t ON t.id = p.team_id
+            WHERE s.format = %s AND {spec['qualify']}
+            ORDER BY COALESCE(p.cricbuzz_id, p.id::text), s.matches DESC NULLS LAST
+        ) ranked
+        WHERE value IS NOT NULL
+        ORDER BY value {order}, matches, name
+        LIMIT %s
+    ''', (fmt, LEADERBOARD_SIZE))
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+
+    decimals = spec.get('decimals')
+    leaders = [{
+        'rank': row['rank'],
+        'name': row['name'],
+        'url': f"/player/{row['slug']}" if row['slug'] else None,
+        'team': row['team_name'],
+        'matches': row['matches'],
+        'value': round(float(row['value']), decimals) if decimals else int(row['value'])
+    } for row in rows]
+    result = {'success': True, 'format': fmt, 'stat': stat, 'label': spec['label'], 'leaders': leaders}
+    with _cache_lock:
+        _cache[key] = (time.monotonic() + CACHE_TTL, result)
+    return result
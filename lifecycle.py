@@ -0,0 +1,183 @@
+"""Per-match lifecycle: scheduled -> toss -> live <-> break -> completed -> final.
+
+The state lives in scorecards.state and only moves forward, driven by what
+each scorecard scrape parses (status line class and text, innings present).
+Once a result appears the match is completed; one finalization scrape
+FINALIZE_AFTER later freezes it as final and it is never fetched again.
+refresh_matches() therefore only fetches matches that are in play, due to
+start, or waiting for their finalization scrape.
+"""
+import re
+from datetime import datetime, timedelta
+
+import analytics
+import progression
+import ratelimit
+import results
+import scraper
+from scraper import get_db
+
+SCHEDULED = 'scheduled'
+TOSS = 'toss'
+LIVE = 'live'
+BREAK = 'break'
+COMPLETED = 'completed'
+FINAL = 'final'
+
+ACTIVE_STATES = (TOSS, LIVE, BREAK)
+# live and break share a rank so a match can move between them in either direction
+_RANK = {SCHEDULED: 0, TOSS: 1, LIVE: 2, BREAK: 2, COMPLETED: 3, FINAL: 4}
+
+FINALIZE_AFTER = 900
+SCHEDULED_POLL_INTERVAL = 900
+PICKUP_DAYS_BACK = 1
+
+RESULT_PATTERN = re.compile(r'\bwon\b(?! the toss)|\bwin by\b|\bdrawn\b|\btied\b|\bno result\b|\babandoned\b', re.I)
+BREAK_PATTERN = re.compile(r'\binnings break\b|\bstumps\b|\blunch\b|\btea\b|\brain\b|\bbad light\b|\bwet outfield\b|\bdelayed\b', re.I)
+TOSS_PATTERN = re.compile(r'\bwon the toss\b|\bopt(?:ed)? to\b|\belected to\b', re.I)
+
+
+def classify(result):
+    """Lifecycle state observed in a scrape_scorecard() result"""
+    status_kind = result.get('status_kind', '')
+    status_line = result.get('status_line', '')
+    if status_kind == 'complete' or RESULT_PATTERN.search(status_line):
+        return COMPLETED
+    if BREAK_PATTERN.search(status_line):
+        return BREAK
+    if result.get('innings_count') or status_kind == 'live':
+        return LIVE
+    if TOSS_PATTERN.search(status_line):
+        return TOSS
+    return SCHEDULED
+
+
+def advance(current, observed):
+    """Next state given the stored one; a scrape can never move a match backwards"""
+    if current is None:
+        return observed
+    if _RANK[observed] >= _RANK[current]:
+        return observed
+    return current
+
+
+def store_scorecard(cur, match_id, result, match_title=None, finalize=False):
+    """Save a scrape_scorecard() result and move the match along its lifecycle.
+
+    Final scorecards are frozen: nothing is written and FINAL is returned.
+    finalize=True marks this scrape as the one-shot finalization.
+    """
+    cur.execute('SELECT state FROM scorecards WHERE match_id = %s FOR UPDATE', (match_id,))
+    row = cur.fetchone()
+    current = row['state'] if row else None
+    if current == FINAL:
+        return FINAL
+    state = FINAL if finalize else advance(current, classify(result))
+
+    cur.execute('''
+        INSERT INTO scorecards (match_id, match_title, match_status, scorecard_html, final_score, is_live, state,
+                                state_changed_at, result_at, finalized_at, last_updated)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP,
+                CASE WHEN %s THEN CURRENT_TIMESTAMP END, CASE WHEN %s THEN CURRENT_TIMESTAMP END, CURRENT_TIMESTAMP)
+        ON CONFLICT (match_id) DO UPDATE SET
+            match_title = COALESCE(EXCLUDED.match_title, scorecards.match_title),
+            match_status = EXCLUDED.match_status,
+            scorecard_html = EXCLUDED.scorecard_html,
+            final_score = EXCLUDED.final_score,
+            is_live = EXCLUDED.is_live,
+            state = EXCLUDED.state,
+            state_changed_at = CASE WHEN scorecards.state IS DISTINCT FROM EXCLUDED.state
+                                    THEN CURRENT_TIMESTAMP ELSE scorecards.state_changed_at END,
+            result_at = COALESCE(scorecards.result_at, EXCLUDED.result_at),
+            finalized_at = EXCLUDED.finalized_at,
+            last_updated = CURRENT_TIMESTAMP,
+            scraped_at = CURRENT_TIMESTAMP
+    ''', (match_id, match_title, result.get('status_text', ''), result['html'], result.get('final_score', ''),
+          state in ACTIVE_STATES, state, state in (COMPLETED, FINAL), state == FINAL))
+    if state != SCHEDULED:
+        progression.record(cur, match_id, result.get('innings') or [])
+    if state == FINAL:
+        results.record(cur, match_id, dict(result, match_title=match_title))
+    if state != current:
+        print(f"Match {match_id}: {current or 'new'} -> {state}")
+    return state
+
+
+def scorecard_url(match_id, match_url=None):
+    if match_url and '/live-cricket-scores/' in match_url:
+        return match_url.replace('/live-cricket-scores/', '/live-cricket-scorecard/')
+    return f"https://www.cricbuzz.com/live-cricket-scorecard/{match_id}"
+
+
+def _pick_up_due_matches(cur):
+    """Add a scheduled scorecard row for every match dated today or yesterday that has none yet"""
+    today = datetime.now().date()
+    earliest = today - timedelta(days=PICKUP_DAYS_BACK)
+    # match_date is free text, so narrow by month name in SQL and parse the survivors in Python
+    months = sorted({f"%{day:%b}%" for day in (earliest, today)})
+    cur.execute('''
+        SELECT m.match_id, m.match_title, m.match_date
+        FROM matches m
+        LEFT JOIN scorecards sc ON sc.match_id = m.match_id::text
+        WHERE m.match_id IS NOT NULL AND (sc.match_id IS NULL OR sc.state IS NULL)
+          AND m.match_date ILIKE ANY(%s)
+    ''', (months,))
+    due = []
+    for row in cur.fetchall():
+        match_date = scraper.parse_match_date(row['match_date'])
+        if match_date and earliest <= match_date.date() <= today:
+            due.append((str(row['match_id']), row['match_title'], match_date.date()))
+    for match_id, match_title, starts_on in due:
+        cur.execute('''
+            INSERT INTO scorecards (match_id, match_title, state, starts_on, state_changed_at)
+            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (match_id) DO UPDATE SET state = EXCLUDED.state, starts_on = EXCLUDED.starts_on,
+                state_changed_at = CURRENT_TIMESTAMP
+            WHERE scorecards.state IS NULL
+        ''', (match_id, match_title, SCHEDULED, starts_on))
+    return len(due)
+
+
+def refresh_matches():
+    """Scrape every match that is in play, due to start, or due its finalization scrape"""
+    conn = get_db()
+    cur = conn.cursor()
+    picked_up = _pick_up_due_matches(cur)
+    conn.commit()
+
+    cur.execute('''
+        SELECT sc.match_id, sc.state, m.match_url
+        FROM scorecards sc
+        LEFT JOIN LATERAL (
+            SELECT match_url FROM matches WHERE match_id::text = sc.match_id LIMIT 1
+        ) m ON TRUE
+        WHERE sc.state IN %s
+           OR (sc.state = %s AND sc.starts_on >= CURRENT_DATE - %s
+               AND (sc.last_updated IS NULL OR sc.last_updated < CURRENT_TIMESTAMP - make_interval(secs => %s)))
+           OR (sc.state = %s AND sc.last_updated < CURRENT_TIMESTAMP - make_interval(secs => %s))
+        ORDER BY sc.state_changed_at
+    ''', (ACTIVE_STATES, SCHEDULED, PICKUP_DAYS_BACK, SCHEDULED_POLL_INTERVAL, COMPLETED, FINALIZE_AFTER))
+    due = cur.fetchall()
+
+    scraped = 0
+    for match in due:
+        if ratelimit.is_paused():
+            break
+        result = scraper.scrape_scorecard(scorecard_url(match['match_id'], match.get('match_url')))
+        if result.get('success'):
+            store_scorecard(cur, match['match_id'], result, finalize=match['state'] == COMPLETED)
+            scraped += 1
+        else:
+            # Back off like a successful poll would, except for in-play matches which retry next run
+            cur.execute('''
+                UPDATE scorecards SET last_updated = CURRENT_TIMESTAMP
+                WHERE match_id = %s AND state NOT IN %s
+            ''', (match['match_id'], ACTIVE_STATES))
+            print(f"Match {match['match_id']} refresh failed: {result.get('message', '')}")
+        conn.commit()
+
+    analytics.refresh(cur)
+    conn.commit()
+    cur.close()
+    conn.close()
+    return {'success': True, 'message': f'Refreshed {scraped} of {len(due)} due matches ({picked_up} scheduled today)', 'count': scraped}
@@ -0,0 +1,329 @@
+"""In-process Prometheus collectors shared by the Flask app and the scrapers.
+
+Each process keeps its metrics in memory and periodically writes a snapshot
+to METRICS_DIR. The /metrics endpoint merges the snapshots of every gunicorn
+worker so counters and histograms aggregate across the whole deployment.
+Snapshots of exited workers are folded into a retired snapshot, so totals
+never go backwards; only their summed gauges (open connections) are dropped.
+"""
+import bisect
+import collections
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2.extensions
+
+METRICS_DIR = os.environ.get('METRICS_DIR') or os.path.join(tempfile.gettempdir(), 'cricbuzz_metrics')
+FLUSH_INTERVAL = 5
+RETIRED_FILE = 'retired.json'
+RETIRE_LOCK_FILE = 'retire.lock'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = {}
+_lock = threading.Lock()
+_flusher_pid = None
+# One entry per connection freed without close(). Finalizers only append here (deque appends are atomic)
+# and flush() applies them, so garbage collection never waits on _lock
+_closed_by_gc = collections.deque()
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        _registry[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, '')) for label in self.labels)
+
+    def _format_labels(self, key, extra=None):
+        pairs = list(zip(self.labels, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+        return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        _ensure_flusher()
+
+    def merge(self, merged, key, value):
+        merged[key] = merged.get(key, 0) + value
+
+    def render(self, merged):
+        return [f'{self.name}{self._format_labels(key)} {value}' for key, value in sorted(merged.items())]
+
+
+class Gauge(_Metric):
+    """Gauge merged across workers either by summing them or by taking the latest write"""
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labels=(), aggregate='latest'):
+        super().__init__(name, help_text, labels)
+        self.aggregate = aggregate
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = [value, time.time()]
+        _ensure_flusher()
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            current = self.values.get(key, [0, 0])[0]
+            self.values[key] = [current + amount, time.time()]
+        _ensure_flusher()
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def merge(self, merged, key, value):
+        if self.aggregate == 'sum':
+            current = merged.get(key, [0, 0])
+            merged[key] = [current[0] + value[0], max(current[1], value[1])]
+        elif key not in merged or value[1] > merged[key][1]:
+            merged[key] = value
+
+    def render(self, merged):
+        return [f'{self.name}{self._format_labels(key)} {value[0]}' for key, value in sorted(merged.items())]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+            if idx < len(self.buckets):
+                state[idx] += 1
+            state[-2] += value
+            state[-1] += 1
+        _ensure_flusher()
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def merge(self, merged, key, value):
+        current = merged.get(key)
+        if current is None or len(current) != len(value):
+            merged[key] = list(value)
+        else:
+            merged[key] = [a + b for a, b in zip(current, value)]
+
+    def render(self, merged):
+        lines = []
+        for key, state in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{self._format_labels(key, ("le", bound))} {cumulative}')
+            lines.append(f'{self.name}_bucket{self._format_labels(key, ("le", "+Inf"))} {state[-1]}')
+            lines.append(f'{self.name}_sum{self._format_labels(key)} {state[-2]}')
+            lines.append(f'{self.name}_count{self._format_labels(key)} {state[-1]}')
+        return lines
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that tracks how many connections are currently open"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        DB_CONNECTIONS.inc()
+        DB_CONNECTIONS_OPEN.inc()
+        self._counted_open = True
+
+    def close(self):
+        if getattr(self, '_counted_open', False):
+            self._counted_open = False
+            DB_CONNECTIONS_OPEN.dec()
+        super().close()
+
+    def __del__(self):
+        # Connections dropped without close() are closed by psycopg2 when they are freed.
+        # This can run inside any metric update holding _lock, so it must not take the lock itself
+        if getattr(self, '_counted_open', False):
+            self._counted_open = False
+            _closed_by_gc.append(1)
+
+
+SCRAPE_FETCH_SECONDS = Histogram('cricbuzz_scrape_fetch_seconds', 'Time spent fetching a Cricbuzz page', ['target'])
+SCRAPE_PARSE_SECONDS = Histogram('cricbuzz_scrape_parse_seconds', 'Time spent processing a fetched Cricbuzz page', ['target'])
+SCRAPE_HTTP_ERRORS = Counter('cricbuzz_scrape_http_errors_total', 'Failed Cricbuzz fetches by HTTP status or exception', ['target', 'status'])
+SCRAPE_ROWS = Counter('cricbuzz_scrape_rows_upserted_total', 'Rows inserted or updated by scrapers', ['target'])
+SCRAPE_ITEMS = Gauge('cricbuzz_scrape_last_items', 'Items found by the most recent run of a scraper', ['target'])
+SCRAPE_LAST_SUCCESS = Gauge('cricbuzz_scrape_last_success_timestamp_seconds', 'Unix time of the last successful scraper run', ['target'])
+SCHEDULER_JOB_LAG = Histogram('cricbuzz_scheduler_job_lag_seconds', 'Delay between scheduled and actual job start', ['job'])
+SCHEDULER_JOB_EVENTS = Counter('cricbuzz_scheduler_job_events_total', 'Scheduler job errors and missed runs', ['job', 'event'])
+DB_CONNECT_SECONDS = Histogram('cricbuzz_db_connect_seconds', 'Time spent opening a database connection')
+DB_CONNECTIONS = Counter('cricbuzz_db_connections_total', 'Database connections opened')
+DB_CONNECTIONS_OPEN = Gauge('cricbuzz_db_connections_open', 'Database connections currently open', aggregate='sum')
+HTTP_REQUEST_SECONDS = Histogram('cricbuzz_http_request_seconds', 'Flask request latency', ['endpoint', 'method'])
+HTTP_REQUESTS = Counter('cricbuzz_http_requests_total', 'Flask requests by endpoint and status', ['endpoint', 'method', 'status'])
+
+
+def record_scrape(target, items=None, rows=0):
+    """Record the outcome of a successful scraper run"""
+    if items is not None:
+        SCRAPE_ITEMS.set(items, target=target)
+    if rows:
+        SCRAPE_ROWS.inc(rows, target=target)
+    SCRAPE_LAST_SUCCESS.set(time.time(), target=target)
+
+
+def _snapshot_path(pid):
+    return os.path.join(METRICS_DIR, f'worker_{pid}.json')
+
+
+def flush():
+    """Write this process's metrics to its snapshot file"""
+    freed = 0
+    while _closed_by_gc:
+        _closed_by_gc.popleft()
+        freed += 1
+    if freed:
+        DB_CONNECTIONS_OPEN.dec(freed)
+    with _lock:
+        data = {name: [[list(key), value] for key, value in metric.values.items()]
+                for name, metric in _registry.items() if metric.values}
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = _snapshot_path(os.getpid())
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Metrics flush error: {e}")
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        flush()
+
+
+def _ensure_flusher():
+    global _flusher_pid
+    pid = os.getpid()
+    if _flusher_pid == pid:
+        return
+    with _lock:
+        if _flusher_pid == pid:
+            return
+        _flusher_pid = pid
+    threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _load_snapshot(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        return None
+
+
+def _merge_snapshot(merged, data, retired=False):
+    for name, samples in data.items():
+        metric = _registry.get(name)
+        if metric is None:
+            continue
+        # A dead worker's share of a summed gauge (like open connections) no longer exists
+        if retired and isinstance(metric, Gauge) and metric.aggregate == 'sum':
+            continue
+        for key, value in samples:
+            metric.merge(merged[name], tuple(key), value)
+
+
+def _retire(dead_paths):
+    """Fold exited workers' snapshots into RETIRED_FILE, then delete them. Caller holds the retire lock"""
+    retired_path = os.path.join(METRICS_DIR, RETIRED_FILE)
+    retired = {name: {} for name in _registry}
+    _merge_snapshot(retired, _load_snapshot(retired_path) or {}, retired=True)
+    for path in dead_paths:
+        _merge_snapshot(retired, _load_snapshot(path) or {}, retired=True)
+    data = {name: [[list(key), value] for key, value in values.items()] for name, values in retired.items() if values}
+    tmp_path = f'{retired_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, retired_path)
+    for path in dead_paths:
+        os.remove(path)
+
+
+def render():
+    """Merge all worker snapshots and return them in Prometheus text format"""
+    flush()
+    merged = {name: {} for name in _registry}
+    try:
+        with open(os.path.join(METRICS_DIR, RETIRE_LOCK_FILE), 'w') as lock:
+            # Serialises retiring so two workers never fold the same dead snapshot twice
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            snapshots = []
+            dead_paths = []
+            for filename in os.listdir(METRICS_DIR):
+                if not (filename.startswith('worker_') and filename.endswith('.json')):
+                    continue
+                try:
+                    pid = int(filename[len('worker_'):-len('.json')])
+                except ValueError:
+                    continue
+                path = os.path.join(METRICS_DIR, filename)
+                (snapshots if _pid_alive(pid) else dead_paths).append(path)
+            if dead_paths:
+                _retire(dead_paths)
+            snapshots.append(os.path.join(METRICS_DIR, RETIRED_FILE))
+            for path in snapshots:
+                data = _load_snapshot(path)
+                if data:
+                    _merge_snapshot(merged, data)
+    except OSError as e:
+        print(f"Metrics merge error: {e}")
+
+    lines = []
+    for name, metric in _registry.items():
+        lines.append(f'# HELP {name} {metric.help}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        lines.extend(metric.render(merged[name]))
+    return '\n'.join(lines) + '\n'
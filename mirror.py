@@ -0,0 +1,172 @@
+"""Local mirror of Cricbuzz-hosted team flags and player headshots.
+
+Remote image URLs stay in teams.flag_url and players.image_url. A background
+sweep registers them in mirrored_images, claims pending ones with FOR UPDATE
+SKIP LOCKED so only one process downloads each URL, and stores the bytes on
+disk named by their SHA-256. local_url() rewrites a remote URL to its /media/
+copy at render time and falls back to the remote URL until it is mirrored.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+import ratelimit
+from scraper import get_db
+
+MIRROR_DIR = os.environ.get('MIRROR_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'media_cache')
+MIRROR_WORKERS = 4
+BATCH_SIZE = 200
+MAX_BYTES = 5 * 1024 * 1024
+MAX_ATTEMPTS = 3
+RETRY_AFTER = 3600
+CLAIM_TIMEOUT = 600
+REFRESH_INTERVAL = 60
+
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'image/webp,image/png,image/jpeg,image/*;q=0.8',
+    'Referer': 'https://www.cricbuzz.com/'
+}
+
+_local_urls = {}
+_loaded_at = 0
+_refresh_lock = threading.Lock()
+
+
+def _register_known_urls(cur):
+    cur.execute('''
+        INSERT INTO mirrored_images (source_url)
+        SELECT flag_url FROM teams WHERE flag_url LIKE 'http%'
+        UNION
+        SELECT image_url FROM players WHERE image_url LIKE 'http%'
+        ON CONFLICT (source_url) DO NOTHING
+    ''')
+    return cur.rowcount
+
+
+def _claim_batch(cur):
+    cur.execute('''
+        UPDATE mirrored_images SET status = 'fetching', attempts = attempts + 1, claimed_at = CURRENT_TIMESTAMP
+        WHERE source_url IN (
+            SELECT source_url FROM mirrored_images
+            WHERE status = 'pending'
+               OR (status = 'fetching' AND claimed_at < CURRENT_TIMESTAMP - make_interval(secs => %s))
+               OR (status = 'failed' AND attempts < %s AND claimed_at < CURRENT_TIMESTAMP - make_interval(secs => %s))
+            ORDER BY created_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING source_url
+    ''', (CLAIM_TIMEOUT, MAX_ATTEMPTS, RETRY_AFTER, BATCH_SIZE))
+    return [row['source_url'] for row in cur.fetchall()]
+
+
+def _download(url):
+    """Fetch one image and store it content-addressed. Returns (filename, error)"""
+    try:
+        response = ratelimit.get(url, headers=HEADERS)
+        if response.status_code != 200:
+            return None, f'HTTP {response.status_code}'
+        data = response.content
+        if len(data) > MAX_BYTES:
+            return None, f'{len(data)} bytes is too large'
+        # Only serve bytes Pillow recognises as a raster image, never whatever the remote claims it is
+        with Image.open(io.BytesIO(data)) as image:
+            ext = FORMAT_EXTENSIONS.get(image.format)
+            image.verify()
+        if not ext:
+            return None, 'Unsupported image format'
+    except Exception as e:
+        return None, str(e)[:500]
+
+    return store(data, ext), None
+
+
+def store(data, ext):
+    """Write bytes to MIRROR_DIR under their SHA-256 digest and return the filename"""
+    filename = f"{hashlib.sha256(data).hexdigest()}.{ext}"
+    path = os.path.join(MIRROR_DIR, filename)
+    if not os.path.exists(path):
+        os.makedirs(MIRROR_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return filename
+
+
+def mirror_pending(progress=None):
+    """Register remote flag/headshot URLs and download every pending one"""
+    conn = get_db()
+    cur = conn.cursor()
+    registered = _register_known_urls(cur)
+    conn.commit()
+
+    mirrored = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=MIRROR_WORKERS) as executor:
+        while not ratelimit.is_paused():
+            urls = _claim_batch(cur)
+            conn.commit()
+            if not urls:
+                break
+            for url, (filename, error) in zip(urls, executor.map(_download, urls)):
+                if filename:
+                    cur.execute('''
+                        UPDATE mirrored_images SET status = 'ok', filename = %s, error = NULL, fetched_at = CURRENT_TIMESTAMP
+                        WHERE source_url = %s
+                    ''', (filename, url))
+                    mirrored += 1
+                else:
+                    cur.execute("UPDATE mirrored_images SET status = 'failed', error = %s WHERE source_url = %s", (error, url))
+                    failed += 1
+            conn.commit()
+            if progress:
+                progress(mirrored + failed)
+    cur.close()
+    conn.close()
+
+    if mirrored:
+        _invalidate()
+    message = f'Mirrored {mirrored} images ({failed} failed, {registered} new URLs)'
+    if mirrored or failed:
+        print(f"Image mirror: {message}")
+    return {'success': True, 'message': message, 'mirrored': mirrored, 'failed': failed}
+
+
+def _invalidate():
+    global _loaded_at
+    _loaded_at = 0
+
+
+def _refresh():
+    global _local_urls, _loaded_at
+    try:
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute("SELECT source_url, filename FROM mirrored_images WHERE status = 'ok'")
+        rows = cur.fetchall()
+        cur.close()
+        conn.close()
+        _local_urls = {row['source_url']: f"/media/{row['filename']}" for row in rows}
+    except Exception as e:
+        print(f"Image mirror lookup error: {e}")
+    _loaded_at = time.monotonic()
+
+
+def local_url(url):
+    """Mirrored /media/ URL for a remote image, or the URL unchanged if it has not been mirrored yet"""
+    if not url or not url.startswith('http'):
+        return url
+    if time.monotonic() - _loaded_at > REFRESH_INTERVAL:
+        with _refresh_lock:
+            if time.monotonic() - _loaded_at > REFRESH_INTERVAL:
+                _refresh()
+    return _local_urls.get(url, url)
@@ -0,0 +1,51 @@
+"""Score progression (worm and run-rate data) for matches in play.
+
+Every scorecard refresh overwrites the match's score, so record() keeps the
+history: one score_progression row per match and innings holding parallel
+SMALLINT arrays of balls, runs and wickets. A point is appended only when it
+differs from the innings' last point, so an unchanged score between polls
+costs nothing and a full five-day Test stays a few kilobytes per innings.
+"""
+from scraper import get_db
+
+
+def record(cur, match_id, innings):
+    """Append the current score of each innings if it changed. Runs in the caller's transaction
+
+    innings entries come from scrape_scorecard() and carry the match innings number they were parsed from.
+    """
+    for entry in innings:
+        number = entry.get('innings')
+        if number is None or entry.get('balls') is None:
+            continue
+        cur.execute('''
+            INSERT INTO score_progression (match_id, innings, team, balls, runs, wickets, updated_at)
+            VALUES (%s, %s, %s, ARRAY[%s]::smallint[], ARRAY[%s]::smallint[], ARRAY[%s]::smallint[], CURRENT_TIMESTAMP)
+            ON CONFLICT (match_id, innings) DO UPDATE SET
+                balls = score_progression.balls || EXCLUDED.balls,
+                runs = score_progression.runs || EXCLUDED.runs,
+                wickets = score_progression.wickets || EXCLUDED.wickets,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE (score_progression.balls[cardinality(score_progression.balls)],
+                   score_progression.runs[cardinality(score_progression.runs)],
+                   score_progression.wickets[cardinality(score_progression.wickets)])
+                  IS DISTINCT FROM (EXCLUDED.balls[1], EXCLUDED.runs[1], EXCLUDED.wickets[1])
+        ''', (str(match_id), number, (entry.get('team') or '')[:100], entry['balls'], entry['runs'], entry['wickets']))
+
+
+def series(match_id):
+    """Per-innings [balls, runs, wickets] points for charting, oldest first"""
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT innings, team, balls, runs, wickets FROM score_progression
+        WHERE match_id = %s ORDER BY innings
+    ''', (str(match_id),))
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    return [{
+        'innings': row['innings'],
+        'team': row['team'],
+        'points': [list(point) for point in zip(row['balls'], row['runs'], row['wickets'])]
+    } for row in rows]
@@ -0,0 +1,176 @@
+"""Shared rate limiting, retries and circuit breaking for outbound Cricbuzz requests.
+
+Every scraper fetch goes through get(), which takes a token from a per-host
+token bucket, retries 429/5xx responses and timeouts with jittered
+exponential backoff (honouring Retry-After), and trips a per-host circuit
+breaker after repeated failures, including 401/403 block pages, so scheduled
+jobs can stand down.
+"""
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+import metrics
+
+CRICBUZZ_HOST = 'www.cricbuzz.com'
+
+REQUESTS_PER_SECOND = float(os.environ.get('SCRAPE_RATE_LIMIT', '2'))
+BURST = int(os.environ.get('SCRAPE_BURST', '4'))
+TIMEOUT = (10, 30)
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60
+MAX_RETRY_AFTER = 300
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Block pages: retrying will not help, but they count towards opening the circuit
+BLOCKED_STATUSES = {401, 403, 451}
+FAILURE_THRESHOLD = 5
+COOLDOWN = 300
+
+CIRCUIT_OPEN = metrics.Gauge('cricbuzz_scrape_circuit_open', 'Whether the circuit breaker for a host is open', ['host'])
+RETRIES = metrics.Counter('cricbuzz_scrape_retries_total', 'Retried outbound requests by host and reason', ['host', 'reason'])
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds):
+        """Stop handing out tokens for a while, e.g. after a 429"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+            self.updated = self.paused_until
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    def __init__(self, host, threshold, cooldown):
+        self.host = host
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def is_open(self):
+        with self.lock:
+            return self.opened_at is not None and time.monotonic() - self.opened_at < self.cooldown
+
+    def record_success(self):
+        with self.lock:
+            was_open = self.opened_at is not None
+            self.failures = 0
+            self.opened_at = None
+        if was_open:
+            CIRCUIT_OPEN.set(0, host=self.host)
+            print(f"Circuit breaker closed for {self.host}")
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            tripped = self.failures >= self.threshold
+            if tripped:
+                self.opened_at = time.monotonic()
+        if tripped:
+            CIRCUIT_OPEN.set(1, host=self.host)
+            print(f"Circuit breaker open for {self.host} after {self.failures} consecutive failures")
+
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+def _for_host(host):
+    with _hosts_lock:
+        if host not in _hosts:
+            _hosts[host] = (TokenBucket(REQUESTS_PER_SECOND, BURST), CircuitBreaker(host, FAILURE_THRESHOLD, COOLDOWN))
+        return _hosts[host]
+
+
+def is_paused(host=CRICBUZZ_HOST):
+    """True while the circuit breaker for host is open; scheduled jobs should skip their run"""
+    return _for_host(host)[1].is_open()
+
+
+def _backoff(attempt):
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def _retry_after(response):
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = retry_at.timestamp() - time.time()
+    return min(max(seconds, 0), MAX_RETRY_AFTER)
+
+
+def get(url, headers=None, **kwargs):
+    """Rate-limited GET with retries; returns the final response or raises the final error"""
+    host = urlparse(url).netloc
+    bucket, breaker = _for_host(host)
+    if breaker.is_open():
+        raise CircuitOpenError(f'Too many failures talking to {host}, pausing requests')
+
+    for attempt in range(MAX_RETRIES + 1):
+        bucket.acquire()
+        try:
+            response = requests.get(url, headers=headers, timeout=TIMEOUT, **kwargs)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            if attempt == MAX_RETRIES:
+                breaker.record_failure()
+                raise
+            reason = type(e).__name__
+            delay = _backoff(attempt)
+        else:
+            if response.status_code in BLOCKED_STATUSES:
+                breaker.record_failure()
+                return response
+            if response.status_code not in RETRY_STATUSES:
+                breaker.record_success()
+                return response
+            if attempt == MAX_RETRIES:
+                breaker.record_failure()
+                return response
+            reason = response.status_code
+            retry_after = _retry_after(response)
+            delay = retry_after if retry_after is not None else _backoff(attempt)
+            if response.status_code == 429 or retry_after is not None:
+                bucket.pause(delay)
+        RETRIES.inc(host=host, reason=reason)
+        time.sleep(delay)
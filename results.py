@@ -0,0 +1,275 @@
+"""Structured match results and the head-to-head records built from them.
+
+When lifecycle finalizes a match, record() parses the scorecard into a
+match_results row (teams, winner, margin, format, venue, innings) and folds
+that one result into the head_to_head row for the pair, so keyword pages
+read a precomputed record with a single primary-key lookup, and into the
+series points table (see standings). rebuild() reparses every final
+scorecard and refolds all pairs and tables from scratch.
+"""
+import json
+import re
+
+import scraper
+import standings
+from scraper import get_db
+
+RECENT_FORM = 10
+TOP_TOTALS = 5
+
+TITLE_PATTERN = re.compile(r'^\s*(.+?)\s+vs\.?\s+(.+?)\s*(?:,|$)', re.I)
+WINNER_PATTERN = re.compile(r'^(.+?)\s+won\b(?! the toss)', re.I)
+MARGIN_PATTERN = re.compile(r'\bby\s+(.+?)\s*$', re.I)
+FORMAT_PATTERNS = (
+    ('Test', re.compile(r'\btest\b', re.I)),
+    ('ODI', re.compile(r'\bodi\b|\bone[- ]day\b', re.I)),
+    ('T20I', re.compile(r'\bt20i\b', re.I)),
+    ('T20', re.compile(r'\bt20\b|\bipl\b|\bbbl\b|\bpsl\b|\bcpl\b|\bsa20\b|\bhundred\b', re.I)),
+)
+FINAL_SCORE_PATTERN = re.compile(r'^(.*\S)\s+(\d+(?:\s*[-/]\s*\d+)?\s*d?)$', re.I)
+
+
+def pair_key(team1, team2):
+    """Order-independent key for a team pair: ('india', 'pakistan')"""
+    return tuple(sorted((team1.strip().lower(), team2.strip().lower())))
+
+
+def parse_teams(match_title):
+    """('India', 'Pakistan') from a title like 'India vs Pakistan, 3rd T20I', or None"""
+    match = TITLE_PATTERN.match(match_title or '')
+    if not match:
+        return None
+    return match.group(1).strip(), match.group(2).strip()
+
+
+def match_format(match_title, series_name='', stored_format=''):
+    for name, pattern in FORMAT_PATTERNS:
+        if pattern.search(match_title or ''):
+            return name
+    if stored_format:
+        return stored_format.upper() if stored_format.lower() != 'test' else 'Test'
+    for name, pattern in FORMAT_PATTERNS:
+        if pattern.search(series_name or ''):
+            return name
+    return 'Other'
+
+
+def _aliases(cur, teams):
+    """Lowercase names a scorecard may use for each team: full name, short name, initials"""
+    cur.execute('SELECT name, short_name FROM teams WHERE LOWER(name) IN %s', (tuple(t.lower() for t in teams),))
+    short_names = {row['name'].lower(): (row['short_name'] or '').lower() for row in cur.fetchall()}
+    aliases = {}
+    for team in teams:
+        names = {team.lower(), ''.join(word[0] for word in team.split()).lower()}
+        if short_names.get(team.lower()):
+            names.add(short_names[team.lower()])
+        aliases[team] = names
+    return aliases
+
+
+def _resolve(name, aliases):
+    name = (name or '').strip().lower()
+    for team, names in aliases.items():
+        if name in names:
+            return team
+    return None
+
+
+def parse_result(status_line):
+    """(result_type, winner_text, margin) from a Cricbuzz status line"""
+    status = status_line or ''
+    winner = WINNER_PATTERN.search(status)
+    margin = MARGIN_PATTERN.search(status)
+    lowered = status.lower()
+    if 'tied' in lowered:
+        # A super over decides the winner of a tie: "Match tied (India won the Super Over)"
+        super_over = re.search(r'\(\s*(.+?)\s+won\b', status, re.I)
+        return 'tie', super_over.group(1) if super_over else None, ''
+    if winner:
+        return 'win', winner.group(1), margin.group(1) if margin else ''
+    if 'drawn' in lowered:
+        return 'draw', None, ''
+    if 'no result' in lowered or 'abandoned' in lowered:
+        return 'no_result', None, ''
+    return None, None, ''
+
+
+def parse_final_score(final_score):
+    """Innings parsed back out of a stored final_score string ('IND 185-6 vs PAK 180'); balls are unknown"""
+    innings = []
+    for part in (final_score or '').split(' vs '):
+        match = FINAL_SCORE_PATTERN.match(part.strip())
+        if match:
+            parsed = scraper.parse_innings_score(match.group(1), match.group(2))
+            if parsed:
+                innings.append(parsed)
+    return innings
+
+
+def record(cur, match_id, scorecard):
+    """Store the structured result of a finalized match and fold it into its head-to-head record.
+
+    scorecard needs status_line and innings (a scrape_scorecard() result or the
+    equivalent rebuilt from a stored row). Does nothing for matches already
+    recorded or without two identifiable teams. Runs in the caller's transaction.
+    """
+    cur.execute('''
+        SELECT m.series_id, m.match_title, m.match_date, m.venue, m.match_format, s.series_name
+        FROM matches m LEFT JOIN series s ON s.id = m.series_id
+        WHERE m.match_id = %s LIMIT 1
+    ''', (match_id,))
+    match = cur.fetchone()
+    title = (match or {}).get('match_title') or scorecard.get('match_title')
+    teams = parse_teams(title)
+    if not teams:
+        return None
+
+    result_type, winner_text, margin = parse_result(scorecard.get('status_line'))
+    if not result_type:
+        return None
+    aliases = _aliases(cur, teams)
+    winner = _resolve(winner_text, aliases) if winner_text else None
+    innings = []
+    for entry in scorecard.get('innings') or []:
+        team = _resolve(entry['team'], aliases)
+        if team:
+            innings.append(dict(entry, team=team))
+
+    played_on = scraper.parse_match_date(match['match_date']) if match else None
+    row = {
+        'match_id': str(match_id),
+        'series_id': match['series_id'] if match else None,
+        'team1': teams[0],
+        'team2': teams[1],
+        'winner': winner,
+        'result_type': result_type,
+        'margin': margin,
+        'match_format': match_format(title, (match or {}).get('series_name'), (match or {}).get('match_format')),
+        'venue': (match or {}).get('venue'),
+        'match_date': played_on.date() if played_on else None,
+        'innings': innings
+    }
+    cur.execute('''
+        INSERT INTO match_results (match_id, series_id, team1, team2, winner, result_type, margin, match_format, venue, match_date, innings)
+        VALUES (%(match_id)s, %(series_id)s, %(team1)s, %(team2)s, %(winner)s, %(result_type)s, %(margin)s,
+                %(match_format)s, %(venue)s, %(match_date)s, %(innings_json)s)
+        ON CONFLICT (match_id) DO NOTHING
+        RETURNING match_id
+    ''', dict(row, innings_json=json.dumps(innings)))
+    if cur.fetchone() is None:
+        return None
+
+    key = pair_key(row['team1'], row['team2'])
+    cur.execute('SELECT stats FROM head_to_head WHERE team_a = %s AND team_b = %s FOR UPDATE', key)
+    existing = cur.fetchone()
+    stats = fold(existing['stats'] if existing else empty_stats(), row)
+    _save(cur, key, stats)
+    standings.apply(cur, row)
+    return row
+
+
+def empty_stats():
+    return {
+        'played': 0, 'wins': {}, 'ties': 0, 'draws': 0, 'no_results': 0,
+        'formats': {}, 'venues': {}, 'highest_totals': [], 'recent': []
+    }
+
+
+def _tally(bucket, result):
+    bucket['played'] = bucket.get('played', 0) + 1
+    if result['winner']:
+        wins = bucket.setdefault('wins', {})
+        wins[result['winner']] = wins.get(result['winner'], 0) + 1
+
+
+def fold(stats, result):
+    """Add one match_results row to a head-to-head stats dict"""
+    _tally(stats, result)
+    if result['result_type'] == 'tie':
+        stats['ties'] += 1
+    elif result['result_type'] == 'draw':
+        stats['draws'] += 1
+    elif result['result_type'] == 'no_result':
+        stats['no_results'] += 1
+    _tally(stats['formats'].setdefault(result['match_format'], {}), result)
+    if result.get('venue'):
+        _tally(stats['venues'].setdefault(result['venue'], {}), result)
+
+    played_on = result['match_date'].isoformat() if result.get('match_date') else None
+    for entry in result['innings']:
+        stats['highest_totals'].append({
+            'team': entry['team'], 'runs': entry['runs'], 'wickets': entry['wickets'],
+            'format': result['match_format'], 'match_id': result['match_id'], 'date': played_on
+        })
+    stats['highest_totals'] = sorted(stats['highest_totals'], key=lambda t: -t['runs'])[:TOP_TOTALS]
+
+    stats['recent'].append({
+        'match_id': result['match_id'], 'date': played_on, 'winner': result['winner'],
+        'result_type': result['result_type'], 'margin': result['margin'], 'format': result['match_format']
+    })
+    stats['recent'] = sorted(stats['recent'], key=lambda r: r['date'] or '', reverse=True)[:RECENT_FORM]
+    return stats
+
+
+def _save(cur, key, stats):
+    cur.execute('''
+        INSERT INTO head_to_head (team_a, team_b, stats, updated_at) VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (team_a, team_b) DO UPDATE SET stats = EXCLUDED.stats, updated_at = CURRENT_TIMESTAMP
+    ''', (key[0], key[1], json.dumps(stats)))
+
+
+def rebuild():
+    """Record every final scorecard that has no result yet, then refold all head-to-head records"""
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT sc.match_id, sc.match_title, sc.match_status, sc.final_score
+        FROM scorecards sc
+        LEFT JOIN match_results r ON r.match_id = sc.match_id
+        WHERE sc.state = 'final' AND r.match_id IS NULL
+    ''')
+    recorded = 0
+    for scorecard in cur.fetchall():
+        stored = {
+            'match_title': scorecard['match_title'],
+            'status_line': scorecard['match_status'],
+            'innings': parse_final_score(scorecard['final_score'])
+        }
+        if record(cur, scorecard['match_id'], stored):
+            recorded += 1
+    conn.commit()
+
+    # Concurrent record() calls wait on these locks and fold into the rebuilt rows once this commits
+    cur.execute('LOCK TABLE head_to_head, series_standings IN EXCLUSIVE MODE')
+    cur.execute('SELECT * FROM match_results ORDER BY match_date NULLS FIRST, match_id')
+    records = {}
+    for result in cur.fetchall():
+        key = pair_key(result['team1'], result['team2'])
+        fold(records.setdefault(key, empty_stats()), result)
+    cur.execute('DELETE FROM head_to_head')
+    for key, stats in records.items():
+        _save(cur, key, stats)
+    standings.rebuild(cur)
+    conn.commit()
+    cur.close()
+    conn.close()
+    return {'success': True, 'message': f'Recorded {recorded} new results, rebuilt {len(records)} head-to-head records and all points tables'}
+
+
+def head_to_head(cur, team1, team2):
+    """Precomputed record for a pair, with wins reported from team1's side, or None"""
+    key = pair_key(team1, team2)
+    cur.execute('SELECT stats, updated_at FROM head_to_head WHERE team_a = %s AND team_b = %s', key)
+    row = cur.fetchone()
+    if not row:
+        return None
+    stats = row['stats']
+    wins = {name.lower(): count for name, count in stats['wins'].items()}
+    stats['team1_wins'] = wins.get(team1.lower(), 0)
+    stats['team2_wins'] = wins.get(team2.lower(), 0)
+    for bucket in stats['formats'].values():
+        bucket_wins = {name.lower(): count for name, count in bucket.get('wins', {}).items()}
+        bucket['team1_wins'] = bucket_wins.get(team1.lower(), 0)
+        bucket['team2_wins'] = bucket_wins.get(team2.lower(), 0)
+    stats['updated_at'] = row['updated_at']
+    return stats
@@ -1,15 +1,34 @@
+import hashlib
 import os
 import re
 import time
-import requests
-from bs4 import BeautifulSoup
+from datetime import datetime, timedelta
+from bs4 import BeautifulSoup, NavigableString, Tag
 import psycopg2
 from psycopg2.extras import RealDictCursor
+import aliases
+import metrics
+import ratelimit
 
 def get_db():
-    return psycopg2.connect(os.environ.get('DATABASE_URL'), cursor_factory=RealDictCursor)
+    with metrics.DB_CONNECT_SECONDS.time():
+        return psycopg2.connect(os.environ.get('DATABASE_URL'), connection_factory=metrics.InstrumentedConnection, cursor_factory=RealDictCursor)
 
-def scrape_series_data():
+def fetch_page(url, headers, target):
+    """Fetch a Cricbuzz page through the shared rate limiter, recording latency and HTTP errors for /metrics"""
+    started = time.perf_counter()
+    try:
+        response = ratelimit.get(url, headers=headers)
+    except Exception as e:
+        metrics.SCRAPE_HTTP_ERRORS.inc(target=target, status=type(e).__name__)
+        raise
+    finally:
+        metrics.SCRAPE_FETCH_SECONDS.observe(time.perf_counter() - started, target=target)
+    if response.status_code >= 400:
+        metrics.SCRAPE_HTTP_ERRORS.inc(target=target, status=response.status_code)
+    return response
+
+def scrape_series_data(progress=None):
     url = "https://www.cricbuzz.com/cricket-schedule/series/all"
     
     headers = {
@@ -19,7 +38,7 @@ def scrape_series_data():
     }
     
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = fetch_page(url, headers, 'scrape_series_data')
         response.raise_for_status()
         html = response.text
     except Exception as e:
@@ -28,6 +47,7 @@ def scrape_series_data():
     if not html:
         return {'success': False, 'message': 'Empty response from website'}
     
+    parse_started = time.perf_counter()
     soup = BeautifulSoup(html, 'html.parser')
     
     series_count = 0
@@ -95,11 +115,19 @@ def scrape_series_data():
                         (cricbuzz_series_id, series_month, series_year, series_name, date_range, series_url)
                     )
                     series_count += 1
+            
+            if progress:
+                # Commit first so a cancellation keeps the series saved so far
+                conn.commit()
+                progress(len(processed_urls), None, f'{series_count} new series from {len(processed_urls)} listed')
     
     conn.commit()
     cur.close()
     conn.close()
     
+    metrics.SCRAPE_PARSE_SECONDS.observe(time.perf_counter() - parse_started, target='scrape_series_data')
+    metrics.record_scrape('scrape_series_data', items=len(processed_urls), rows=series_count)
+    
     return {'success': True, 'message': f'Successfully scraped {series_count} new series'}
 
 def extract_matches_from_rsc(html, cricbuzz_series_id):
@@ -203,11 +231,100 @@ def extract_matches_from_rsc(html, cricbuzz_series_id):
     
     return matches
 
+MATCH_ID_MARKER = re.compile(r'matchId[\\":]+(\d+)')
+MATCH_INFO_WINDOW = re.compile(r'[^{}]{0,500}')
+MATCH_INFO_FIELDS = {
+    'start_date': re.compile(r'startDate[\\":]+(\d{13})'),
+    'status': re.compile(r'status[\\":]+([^"\'\\]+)'),
+}
+DAY_HEADING_PATTERN = re.compile(r'(Mon|Tue|Wed|Thu|Fri|Sat|Sun),\s*[A-Za-z]+\s*\d+')
+
+def index_match_metadata(html):
+    """{match_id: {start_date, status}} from one pass over the JSON embedded in a page.
+
+    Each matchId is followed by its scalar fields up to the first nested object,
+    so only that brace-free window is searched. Each field comes from the first
+    occurrence of the id that has it, so a bare reference does not hide later ones.
+    """
+    index = {}
+    complete = set()
+    for marker in MATCH_ID_MARKER.finditer(html):
+        match_id = marker.group(1)
+        if match_id in complete:
+            continue
+        window = MATCH_INFO_WINDOW.match(html, marker.end()).group(0)
+        info = index.setdefault(match_id, {})
+        for field, pattern in MATCH_INFO_FIELDS.items():
+            if field not in info:
+                found = pattern.search(window)
+                if found:
+                    info[field] = found.group(1)
+        if len(info) == len(MATCH_INFO_FIELDS):
+            complete.add(match_id)
+    return index
+
+def index_link_dates(soup, links):
+    """{id(link): nearest day heading before it} for a set of links, in one document-order walk"""
+    wanted = {id(link) for link in links}
+    dates = {}
+    last_heading = ''
+    for node in soup.descendants:
+        if isinstance(node, NavigableString):
+            if DAY_HEADING_PATTERN.search(node):
+                last_heading = node.strip()
+        elif id(node) in wanted:
+            dates[id(node)] = last_heading
+    return dates
+
+def _any_of(fragments):
+    """Compiled search for any of the given substrings, or None when there are none"""
+    return re.compile('|'.join(re.escape(f) for f in fragments)) if fragments else None
+
+def compile_series_matcher(series_name, series_slug):
+    """Build match_belongs_to_series(match_slug, match_title, match_href) for one series.
+
+    All rules are resolved against the series once, leaving each call a few
+    precompiled regex searches. Team and league names come from aliases.
+    """
+    series_name_lower = series_name.lower()
+    slug_parts = tuple(part for part in (series_slug.replace('-', ' ').split() if series_slug else []) if len(part) > 2)
+    check_slug_parts = len(series_slug.replace('-', ' ').split()) >= 2 if series_slug else False
+
+    is_franchise_league = any(name in series_name_lower for name in aliases.FRANCHISE_NAMES)
+    league_pattern = _any_of([marker for league, markers in aliases.LEAGUES.items()
+                              if league in series_name_lower for marker in markers])
+    is_womens = 'women' in series_name_lower or 'wpl' in series_name_lower
+    is_u19 = 'u19' in series_name_lower or 'under-19' in series_name_lower or 'under 19' in series_name_lower
+    team_patterns = [_any_of(team['aliases']) for name, team in aliases.TEAMS.items() if name in series_name_lower]
+
+    def match_belongs_to_series(match_slug, match_title='', match_href=''):
+        match_text = (match_slug + ' ' + match_title).lower()
+        match_href_lower = match_href.lower()
+
+        # Primary check: if series_slug is in the match URL, it belongs to this series
+        if series_slug and series_slug in match_href_lower:
+            return True
+        # Secondary check: at least two major parts of the series slug appear in the URL
+        if check_slug_parts and sum(1 for part in slug_parts if part in match_href_lower) >= 2:
+            return True
+        if is_franchise_league:
+            return bool(league_pattern and league_pattern.search(match_href_lower))
+        if is_u19:
+            return 'u19' in match_text or 'under-19' in match_text or 'under19' in match_text
+        if is_womens:
+            return 'wom' in match_text
+        # International series: every team named in the series must appear in the match
+        if team_patterns:
+            return all(pattern.search(match_text) for pattern in team_patterns)
+        return False
+
+    return match_belongs_to_series
+
 def scrape_matches_from_series(series_id):
     conn = get_db()
     cur = conn.cursor()
     
-    cur.execute('SELECT series_url, series_name, series_id as cricbuzz_series_id FROM series WHERE id = %s', (series_id,))
+    cur.execute('SELECT series_url, series_name, series_id as cricbuzz_series_id, content_hash FROM series WHERE id = %s', (series_id,))
     series = cur.fetchone()
     
     if not series:
@@ -226,16 +343,32 @@ def scrape_matches_from_series(series_id):
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
     }
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = fetch_page(url, headers, 'scrape_matches_from_series')
+        response.raise_for_status()
         html = response.text
     except Exception as e:
         return {'success': False, 'message': f'Request error: {str(e)}'}
     
+    parse_started = time.perf_counter()
+    
     # Try RSC extraction first (gets all matches including upcoming)
     rsc_matches = []
     if cricbuzz_series_id:
         rsc_matches = extract_matches_from_rsc(html, cricbuzz_series_id)
     
+    fingerprint = series_fingerprint(html, rsc_matches)
+    cur.execute('''
+        UPDATE series SET last_crawled_at = CURRENT_TIMESTAMP, content_hash = %s,
+            content_changed_at = CASE WHEN content_hash IS DISTINCT FROM %s THEN CURRENT_TIMESTAMP ELSE content_changed_at END
+        WHERE id = %s
+    ''', (fingerprint, fingerprint, series_id))
+    if series['content_hash'] == fingerprint:
+        conn.commit()
+        cur.close()
+        conn.close()
+        metrics.record_scrape('scrape_matches_from_series', items=0, rows=0)
+        return {'success': True, 'message': 'Successfully scraped 0 new matches (unchanged since last crawl)'}
+    
     match_count = 0
     processed_match_ids = set()
     
@@ -257,18 +390,27 @@ def scrape_matches_from_series(series_id):
         
         if match_title and len(match_title) > 2:
             cur.execute('SELECT id FROM matches WHERE match_id = %s AND series_id = %s', (match_id, series_id))
-            if cur.fetchone() is None:
+            existing = cur.fetchone()
+            if existing is None:
                 cur.execute(
-                    'INSERT INTO matches (series_id, match_id, match_title, match_url, match_date, slug) VALUES (%s, %s, %s, %s, %s, %s)',
-                    (series_id, match_id, match_title, match_url, match_date, match_slug)
+                    'INSERT INTO matches (series_id, match_id, match_title, match_url, match_date, slug, venue, match_format, starts_on) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)',
+                    (series_id, match_id, match_title, match_url, match_date, match_slug, m.get('venue') or None, m.get('format') or None, match_start_date(match_date))
                 )
                 match_count += 1
+            else:
+                cur.execute('''
+                    UPDATE matches SET venue = COALESCE(venue, %s), match_format = COALESCE(match_format, %s),
+                        starts_on = COALESCE(starts_on, %s)
+                    WHERE id = %s AND (venue IS NULL OR match_format IS NULL OR starts_on IS NULL)
+                ''', (m.get('venue') or None, m.get('format') or None, match_start_date(match_date), existing['id']))
     
     # If RSC extraction found matches, commit and return
     if match_count > 0:
         conn.commit()
         cur.close()
         conn.close()
+        metrics.SCRAPE_PARSE_SECONDS.observe(time.perf_counter() - parse_started, target='scrape_matches_from_series')
+        metrics.record_scrape('scrape_matches_from_series', items=len(processed_match_ids), rows=match_count)
         return {'success': True, 'message': f'Successfully scraped {match_count} new matches (RSC method)'}
     
     if not html:
@@ -276,101 +418,7 @@ def scrape_matches_from_series(series_id):
         conn.close()
         return {'success': False, 'message': 'Empty response from website'}
     
-    country_map = {
-        'india': ['ind', 'india', 'indian'],
-        'new zealand': ['nz', 'new-zealand', 'newzealand'],
-        'australia': ['aus', 'australia', 'australian'],
-        'england': ['eng', 'england', 'english'],
-        'pakistan': ['pak', 'pakistan'],
-        'south africa': ['sa', 'south-africa', 'southafrica'],
-        'sri lanka': ['sl', 'sri-lanka', 'srilanka'],
-        'bangladesh': ['ban', 'bangladesh'],
-        'west indies': ['wi', 'west-indies', 'westindies', 'windies'],
-        'afghanistan': ['afg', 'afghanistan'],
-        'zimbabwe': ['zim', 'zimbabwe'],
-        'ireland': ['ire', 'ireland'],
-        'uae': ['uae', 'emirates'],
-        'usa': ['usa', 'united-states'],
-        'nepal': ['nep', 'nepal'],
-        'namibia': ['nam', 'namibia'],
-        'netherlands': ['ned', 'netherlands', 'dutch'],
-        'scotland': ['sco', 'scotland'],
-        'oman': ['oman'],
-        'canada': ['can', 'canada'],
-    }
-    
-    series_name_lower = series_name.lower()
-    series_teams = []
-    for country, aliases in country_map.items():
-        if country in series_name_lower:
-            series_teams.append(aliases)
-    
-    is_franchise_league = any(x in series_name_lower for x in ['big bash', 'bbl', 'ipl', 'psl', 'cpl', 'bpl', 'sa20', 't20 league', 'hundred', 'wpl', 'major league'])
-    is_womens = 'women' in series_name_lower or 'wpl' in series_name_lower
-    is_u19 = 'u19' in series_name_lower or 'under-19' in series_name_lower or 'under 19' in series_name_lower
-    
-    international_markers = ['odi', 'test', 't20i', '1st-odi', '2nd-odi', '3rd-odi', '1st-test', '2nd-test', '1st-t20i', '2nd-t20i', '3rd-t20i']
-    
-    def match_belongs_to_series(match_slug, match_title='', match_href=''):
-        match_text = (match_slug + ' ' + match_title).lower()
-        match_href_lower = match_href.lower()
-        
-        # Primary check: if series_slug is in the match URL, it belongs to this series
-        if series_slug and series_slug in match_href_lower:
-            return True
-        
-        # Secondary check: series slug variations in URL
-        series_slug_parts = series_slug.replace('-', ' ').split() if series_slug else []
-        if len(series_slug_parts) >= 2:
-            # Check if major parts of series slug are in URL
-            matches_found = sum(1 for part in series_slug_parts if len(part) > 2 and part in match_href_lower)
-            if matches_found >= 2:
-                return True
-        
-        # For franchise leagues, also check common abbreviations
-        if is_franchise_league:
-            league_markers = {
-                'big bash': ['bbl'],
-                'ipl': ['ipl', 'indian-premier-league'],
-                'psl': ['psl', 'pakistan-super-league'],
-                'cpl': ['cpl', 'caribbean-premier-league'],
-                'sa20': ['sa20'],
-                'wpl': ['wpl', 'womens-premier-league'],
-                'hundred': ['hundred'],
-            }
-            for league, markers in league_markers.items():
-                if league in series_name_lower:
-                    for marker in markers:
-                        if marker in match_href_lower:
-                            return True
-            return False
-        
-        # For U19 series, check for U19 matches
-        if is_u19:
-            if 'u19' in match_text or 'under-19' in match_text or 'under19' in match_text:
-                return True
-            return False
-        
-        # For women's series, check for women's matches
-        if is_womens:
-            if 'women' in match_text or 'wom' in match_text:
-                return True
-            return False
-        
-        # For international series with teams, check if match contains those teams
-        if series_teams:
-            for team_aliases in series_teams:
-                found = False
-                for alias in team_aliases:
-                    if alias in match_text:
-                        found = True
-                        break
-                if not found:
-                    return False
-            return True
-        
-        # Default: reject if no match found
-        return False
+    match_belongs_to_series = compile_series_matcher(series_name, series_slug)
     
     match_count = 0
     processed_match_ids = set()
@@ -378,6 +426,8 @@ def scrape_matches_from_series(series_id):
     soup = BeautifulSoup(html, 'html.parser')
     
     match_links = soup.find_all('a', href=re.compile(r'/live-cricket-scores/\d+/'))
+    match_metadata = index_match_metadata(html)
+    link_dates = index_link_dates(soup, match_links)
     
     for link in match_links:
         href = link.get('href', '')
@@ -408,32 +458,22 @@ def scrape_matches_from_series(series_id):
         
         match_date = ''
         
-        date_pattern = re.compile(rf'{match_id}[^{{}}]{{0,500}}startDate[\\\":]+(\d{{13}})')
-        date_match = date_pattern.search(html)
-        if date_match:
+        metadata = match_metadata.get(match_id, {})
+        if metadata.get('start_date'):
             try:
-                timestamp = int(date_match.group(1)) / 1000
-                from datetime import datetime
-                dt = datetime.fromtimestamp(timestamp)
-                match_date = dt.strftime('%a, %b %d %Y')
-            except:
+                match_date = datetime.fromtimestamp(int(metadata['start_date']) / 1000).strftime('%a, %b %d %Y')
+            except (ValueError, OverflowError, OSError):
                 pass
         
-        if not match_date:
-            status_pattern = re.compile(rf'{match_id}[^{{}}]{{0,500}}status[\\\":]+([^"\'\\\\]+)')
-            status_match = status_pattern.search(html)
-            if status_match:
-                status_text = status_match.group(1)
-                date_in_status = re.search(r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+(\d+)', status_text)
-                if date_in_status:
-                    month = date_in_status.group(1)
-                    day = date_in_status.group(2)
-                    match_date = f"{month} {day}, 2026"
+        if not match_date and metadata.get('status'):
+            date_in_status = re.search(r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+(\d+)', metadata['status'])
+            if date_in_status:
+                month = date_in_status.group(1)
+                day = date_in_status.group(2)
+                match_date = f"{month} {day}, 2026"
         
         if not match_date:
-            date_elem = link.find_previous(string=re.compile(r'(Mon|Tue|Wed|Thu|Fri|Sat|Sun),\s*[A-Za-z]+\s*\d+'))
-            if date_elem:
-                match_date = date_elem.strip()
+            match_date = link_dates.get(id(link), '')
         
         match_url = f"https://www.cricbuzz.com{href}"
         
@@ -443,8 +483,8 @@ def scrape_matches_from_series(series_id):
                 match_slug = re.sub(r'[^a-zA-Z0-9 ]', '', match_title).lower()
                 match_slug = re.sub(r' +', '-', match_slug).strip('-')
                 cur.execute(
-                    'INSERT INTO matches (series_id, match_id, match_title, match_url, match_date, slug) VALUES (%s, %s, %s, %s, %s, %s)',
-                    (series_id, match_id, match_title, match_url, match_date, match_slug)
+                    'INSERT INTO matches (series_id, match_id, match_title, match_url, match_date, slug, starts_on) VALUES (%s, %s, %s, %s, %s, %s, %s)',
+                    (series_id, match_id, match_title, match_url, match_date, match_slug, match_start_date(match_date))
                 )
                 match_count += 1
     
@@ -452,14 +492,74 @@ def scrape_matches_from_series(series_id):
     cur.close()
     conn.close()
     
+    metrics.SCRAPE_PARSE_SECONDS.observe(time.perf_counter() - parse_started, target='scrape_matches_from_series')
+    metrics.record_scrape('scrape_matches_from_series', items=len(processed_match_ids), rows=match_count)
+    
     return {'success': True, 'message': f'Successfully scraped {match_count} new matches'}
 
-def scrape_all_matches():
+SERIES_ACTIVE_GRACE_DAYS = 2
+SERIES_AUDIT_INTERVAL_DAYS = 30
+SERIES_AUDIT_BATCH = 5
+SERIES_UNDATED_RECRAWL_HOURS = 24
+
+def series_fingerprint(html, rsc_matches):
+    """Hash of the match list on a series page, ignoring everything else on the page that changes between fetches"""
+    if rsc_matches:
+        items = sorted(f"{m['id']}|{m.get('title', '')}|{m.get('date', '')}|{m.get('venue', '')}|{m.get('format', '')}" for m in rsc_matches)
+    else:
+        items = sorted(set(re.findall(r'/live-cricket-scores/\d+/[^"\'?\\\s]+', html or '')))
+    return hashlib.sha256('\n'.join(items).encode()).hexdigest()
+
+def series_end_date(date_range, year):
+    """Last day of a series from its listing date range ('Jan 28 - Feb 16') and year, or None"""
+    match = re.match(r'\s*([A-Z][a-z]{2})\s*(\d{1,2})\s*-\s*([A-Z][a-z]{2})\s*(\d{1,2})', date_range or '')
+    if not match or not (year or '').isdigit():
+        return None
+    try:
+        starts = datetime.strptime(f"{match.group(1)} {match.group(2)} {year}", '%b %d %Y').date()
+        ends = datetime.strptime(f"{match.group(3)} {match.group(4)} {year}", '%b %d %Y').date()
+    except ValueError:
+        return None
+    # Series running over New Year end in the following year
+    return ends if ends >= starts else ends.replace(year=ends.year + 1)
+
+def plan_series_crawl(cur, full=False):
+    """Series ids worth fetching: never crawled, active or upcoming, undated ones daily, and a few stale completed ones"""
+    cur.execute('SELECT id, date_range, year, ends_on, last_crawled_at, content_changed_at FROM series ORDER BY id')
+    all_series = cur.fetchall()
+    if full:
+        return [row['id'] for row in all_series], len(all_series)
+
+    now = datetime.now()
+    active_since = now.date() - timedelta(days=SERIES_ACTIVE_GRACE_DAYS)
+    settled_before = now - timedelta(days=SERIES_AUDIT_INTERVAL_DAYS)
+    due = []
+    audits = []
+    for row in all_series:
+        ends_on = row['ends_on']
+        if ends_on is None:
+            ends_on = series_end_date(row['date_range'], row['year'])
+            if ends_on:
+                cur.execute('UPDATE series SET ends_on = %s WHERE id = %s', (ends_on, row['id']))
+        last_crawled = row['last_crawled_at']
+        if last_crawled is None or (ends_on and ends_on >= active_since):
+            due.append(row['id'])
+        elif ends_on is None and (row['content_changed_at'] or last_crawled) > settled_before:
+            # Undated series count as finished once their match list has stopped changing
+            if last_crawled < now - timedelta(hours=SERIES_UNDATED_RECRAWL_HOURS):
+                due.append(row['id'])
+        elif last_crawled < settled_before:
+            audits.append((last_crawled, row['id']))
+    due.extend(series_id for _, series_id in sorted(audits)[:SERIES_AUDIT_BATCH])
+    return due, len(all_series)
+
+def scrape_all_matches(progress=None, full=False):
+    """Crawl the match lists of series that can still change; full=True crawls every series"""
     conn = get_db()
     cur = conn.cursor()
     
-    cur.execute('SELECT id, series_name FROM series ORDER BY id')
-    all_series = cur.fetchall()
+    due, series_total = plan_series_crawl(cur, full)
+    conn.commit()
     
     cur.close()
     conn.close()
@@ -467,16 +567,19 @@ def scrape_all_matches():
     total_matches = 0
     series_processed = 0
     
-    for series in all_series:
-        result = scrape_matches_from_series(series['id'])
+    for series_id in due:
+        if ratelimit.is_paused():
+            return {'success': False, 'message': f'Stopped after {series_processed} series: Cricbuzz requests paused after repeated failures ({total_matches} matches scraped)'}
+        result = scrape_matches_from_series(series_id)
         if result['success']:
             match = re.search(r'(\d+)', result['message'])
             if match:
                 total_matches += int(match.group(1))
         series_processed += 1
-        time.sleep(0.5)
+        if progress:
+            progress(series_processed, len(due), f'{total_matches} matches from {series_processed} series')
     
-    return {'success': True, 'message': f'Scraped {total_matches} matches from {series_processed} series'}
+    return {'success': True, 'message': f'Scraped {total_matches} matches from {series_processed} of {series_total} series'}
 
 def scrape_live_scores():
     """Scrape ONLY live match scores from Cricbuzz live scores page"""
@@ -489,7 +592,7 @@ def scrape_live_scores():
     }
     
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = fetch_page(url, headers, 'scrape_live_scores')
         response.raise_for_status()
         html = response.text
     except Exception as e:
@@ -498,6 +601,7 @@ def scrape_live_scores():
     if not html:
         return {'success': False, 'message': 'Empty response from website'}
     
+    parse_started = time.perf_counter()
     soup = BeautifulSoup(html, 'html.parser')
     live_matches = []
     processed_ids = set()
@@ -659,7 +763,10 @@ def scrape_live_scores():
                         'is_live': True
                     })
     
+    metrics.SCRAPE_PARSE_SECONDS.observe(time.perf_counter() - parse_started, target='scrape_live_scores')
+    
     if not live_matches:
+        metrics.record_scrape('scrape_live_scores', items=0)
         return {'success': True, 'message': 'No live matches found at the moment', 'count': 0}
     
     conn = get_db()
@@ -680,8 +787,52 @@ def scrape_live_scores():
     cur.close()
     conn.close()
     
+    metrics.record_scrape('scrape_live_scores', items=len(live_matches), rows=len(live_matches))
+    
     return {'success': True, 'message': f'Successfully scraped {len(live_matches)} live matches', 'count': len(live_matches)}
 
+def parse_match_date(date_str):
+    """Parse match date string to datetime"""
+    from datetime import datetime
+    if not date_str:
+        return None
+    try:
+        clean_date = date_str.replace(',', '').strip()
+        parts = clean_date.split()
+        if len(parts) >= 4:
+            month_day_year = ' '.join(parts[1:])
+            return datetime.strptime(month_day_year, '%b %d %Y')
+        elif len(parts) >= 3:
+            month_day = ' '.join(parts[1:])
+            current_year = datetime.now().year
+            return datetime.strptime(f"{month_day} {current_year}", '%b %d %Y')
+    except:
+        pass
+    return None
+
+def match_start_date(date_str):
+    """Date for the matches.starts_on column, or None when the free-text date cannot be parsed"""
+    parsed = parse_match_date(date_str)
+    return parsed.date() if parsed else None
+
+STATUS_CLASS_PATTERN = re.compile(r'\btext-cb(Complete|Live|Preview)\b')
+SCORE_PATTERN = re.compile(r'(\d+)(?:\s*[-/]\s*(\d+))?\s*(d)?', re.I)
+OVERS_PATTERN = re.compile(r'(\d+)(?:\.(\d))?\s*Ov', re.I)
+
+def parse_innings_score(team, score_text, overs_text=''):
+    """Structured {team, runs, wickets, balls, declared} from a scorecard header like '185-6' and '(20 Ov)'"""
+    score = SCORE_PATTERN.search(score_text or '')
+    if not score:
+        return None
+    overs = OVERS_PATTERN.search(overs_text or '')
+    return {
+        'team': team,
+        'runs': int(score.group(1)),
+        'wickets': int(score.group(2)) if score.group(2) else 10,
+        'balls': int(overs.group(1)) * 6 + int(overs.group(2) or 0) if overs else None,
+        'declared': bool(score.group(3))
+    }
+
 def scrape_scorecard(url):
     if not url or 'cricbuzz.com/live-cricket-scorecard' not in url:
         return {'success': False, 'message': 'Invalid scorecard URL'}
@@ -693,34 +844,32 @@ def scrape_scorecard(url):
     }
     
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = fetch_page(url, headers, 'scrape_scorecard')
         response.raise_for_status()
         html = response.text
     except Exception as e:
         return {'success': False, 'message': f'Error fetching scorecard: {str(e)}'}
     
+    parse_started = time.perf_counter()
     soup = BeautifulSoup(html, 'html.parser')
     scorecard_html = ''
     match_header_html = ''
     team_scores = []
+    innings_scores = []
     
     title = soup.find('title')
     if title:
         title_text = title.get_text(strip=True).replace('Cricket scorecard | ', '').replace(' | Cricbuzz.com', '')
         match_header_html = f'<div class="match-header"><h2>{title_text}</h2></div>'
     
-    status_div = soup.find('div', class_='text-cbComplete')
-    status_text = status_div.get_text(strip=True) if status_div else ''
-    
-    is_live = False
-    live_indicators = soup.find_all('div', class_=re.compile(r'text-live|cb-text-live|live-score'))
-    if live_indicators:
-        is_live = True
-    live_text_check = soup.find(string=re.compile(r'\bLive\b|\bIn Progress\b|\bDay \d+\b', re.I))
-    if live_text_check and 'won' not in status_text.lower() and 'drawn' not in status_text.lower():
-        is_live = True
-    if status_text and ('won' in status_text.lower() or 'drawn' in status_text.lower() or 'match' in status_text.lower()):
-        is_live = False
+    # The status line's colour class says which phase Cricbuzz thinks the match is in
+    status_kind = ''
+    status_line = ''
+    status_line_div = soup.find('div', class_=STATUS_CLASS_PATTERN)
+    if status_line_div:
+        status_kind = STATUS_CLASS_PATTERN.search(' '.join(status_line_div.get('class', []))).group(1).lower()
+        status_line = status_line_div.get_text(strip=True)
+    status_text = status_line if status_kind == 'complete' else ''
     
     innings_divs = soup.find_all('div', id=re.compile(r'^scard-team-\d+-innings-\d+$'))
     
@@ -742,6 +891,11 @@ def scrape_scorecard(url):
                 score_entry = f"{team_text} {score_text}"
                 if score_entry not in team_scores:
                     team_scores.append(score_entry)
+                    parsed = parse_innings_score(team_text, score_text, overs_text)
+                    if parsed:
+                        # The id's innings number counts innings across the match, whichever entries were skipped
+                        parsed['innings'] = int(innings_id.rsplit('-', 1)[1])
+                        innings_scores.append(parsed)
         
         bat_grids = innings.find_all('div', class_=re.compile(r'scorecard-bat-grid'))
         
@@ -836,9 +990,21 @@ def scrape_scorecard(url):
     else:
         scorecard_html = match_header_html + match_summary + '<div class="scorecard-data">' + scorecard_html + '</div>'
     
-    return {'success': True, 'html': scorecard_html, 'final_score': final_score, 'is_live': is_live, 'status_text': status_text}
+    metrics.SCRAPE_PARSE_SECONDS.observe(time.perf_counter() - parse_started, target='scrape_scorecard')
+    metrics.record_scrape('scrape_scorecard', items=len(innings_divs))
+    
+    return {
+        'success': True,
+        'html': scorecard_html,
+        'final_score': final_score,
+        'status_text': status_text,
+        'status_kind': status_kind,
+        'status_line': status_line,
+        'innings_count': len(innings_divs),
+        'innings': innings_scores
+    }
 
-def scrape_teams(team_type='international'):
+def scrape_teams(team_type='international', progress=None):
     urls = {
         'international': 'https://www.cricbuzz.com/cricket-team',
         'domestic': 'https://www.cricbuzz.com/cricket-team/domestic',
@@ -855,7 +1021,7 @@ def scrape_teams(team_type='international'):
     }
     
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = fetch_page(url, headers, 'scrape_teams')
         response.raise_for_status()
         html = response.text
     except Exception as e:
@@ -864,6 +1030,7 @@ def scrape_teams(team_type='international'):
     if not html:
         return {'success': False, 'message': 'Empty response from website'}
     
+    parse_started = time.perf_counter()
     soup = BeautifulSoup(html, 'html.parser')
     
     team_count = 0
@@ -872,7 +1039,12 @@ def scrape_teams(team_type='international'):
     
     team_containers = soup.find_all('a', href=re.compile(r'/cricket-team/[^/]+/\d+'))
     
-    for container in team_containers:
+    for done, container in enumerate(team_containers):
+        if progress and done:
+            # Commit first so a cancellation keeps the teams saved so far
+            conn.commit()
+            progress(done, len(team_containers), f'{team_count} {team_type} teams')
+        
         href = container.get('href', '')
         if not href:
             continue
@@ -904,16 +1076,9 @@ def scrape_teams(team_type='international'):
                     if flag_url.startswith('//'):
                         flag_url = 'https:' + flag_url
         
-        short_name = team_name[:3].upper() if len(team_name) >= 3 else team_name.upper()
-        
-        color_map = {
-            'india': '#FF9933', 'pakistan': '#01411C', 'australia': '#FFCD00',
-            'england': '#002366', 'new-zealand': '#000000', 'south-africa': '#007A4D',
-            'sri-lanka': '#0033A0', 'bangladesh': '#006A4E', 'afghanistan': '#000000',
-            'west-indies': '#7B0041', 'zimbabwe': '#FCE300', 'ireland': '#169B62',
-            'netherlands': '#FF6600', 'scotland': '#0065BF', 'nepal': '#DC143C'
-        }
-        flag_color = color_map.get(team_slug.lower(), '#046A38')
+        known_team = aliases.team_for_slug(team_slug) or {}
+        short_name = known_team.get('short_name') or (team_name[:3].upper() if len(team_name) >= 3 else team_name.upper())
+        flag_color = known_team.get('color', aliases.DEFAULT_COLOR)
         
         cricbuzz_team_id = team_id
         
@@ -936,9 +1101,36 @@ def scrape_teams(team_type='international'):
     cur.close()
     conn.close()
     
+    metrics.SCRAPE_PARSE_SECONDS.observe(time.perf_counter() - parse_started, target='scrape_teams')
+    metrics.record_scrape('scrape_teams', items=team_count, rows=team_count)
+    
     return {'success': True, 'message': f'Successfully scraped {team_count} {team_type} teams'}
 
-def scrape_players_from_team(team_id):
+ROLE_HEADER_PATTERN = re.compile(r'^(?:(BATTERS?)|(ALL[ -]?ROUNDERS?)|(WICKET[ -]?KEEPERS?|WK)|(BOWLERS?))$', re.I)
+ROLE_HEADER_NAMES = ('Batter', 'All-Rounder', 'Wicket-Keeper', 'Bowler')
+PROFILE_LINK_PATTERN = re.compile(r'/profiles/\d+/')
+
+def iter_player_links_with_roles(soup):
+    """Yield (link, role) for each profile link on a squad page in one document-order pass.
+    
+    The role is the most recent section header (Batters, All Rounders, ...) seen before
+    the link. Header-like text inside a profile link belongs to that player's card and
+    does not start a new section.
+    """
+    current_role = 'Batter'
+    for node in soup.descendants:
+        if isinstance(node, Tag):
+            if node.name == 'a' and PROFILE_LINK_PATTERN.search(node.get('href', '')):
+                yield node, current_role
+        elif type(node) is NavigableString:
+            text = node.strip()
+            if not text or len(text) > 16:
+                continue
+            role_match = ROLE_HEADER_PATTERN.match(text)
+            if role_match and not node.find_parent('a', href=PROFILE_LINK_PATTERN):
+                current_role = ROLE_HEADER_NAMES[role_match.lastindex - 1]
+
+def scrape_players_from_team(team_id, progress=None):
     conn = get_db()
     cur = conn.cursor()
     
@@ -967,7 +1159,7 @@ def scrape_players_from_team(team_id):
     }
     
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = fetch_page(url, headers, 'scrape_players_from_team')
         response.raise_for_status()
         html = response.text
     except Exception as e:
@@ -975,29 +1167,19 @@ def scrape_players_from_team(team_id):
         conn.close()
         return {'success': False, 'message': f'Request error: {str(e)}'}
     
+    parse_started = time.perf_counter()
     soup = BeautifulSoup(html, 'lxml')
     
     player_count = 0
-    
-    html_str = str(soup)
-    
-    role_positions = []
-    role_patterns = [
-        (r'(?i)>BATTER[S]?<|>Batter[s]?<', 'Batter'),
-        (r'(?i)>ALL[ -]?ROUNDER[S]?<|>All[ -]?Rounder[s]?<', 'All-Rounder'),
-        (r'(?i)>WICKET[ -]?KEEPER[S]?<|>Wicket[ -]?Keeper[s]?<|>WK<', 'Wicket-Keeper'),
-        (r'(?i)>BOWLER[S]?<|>Bowler[s]?<', 'Bowler'),
-    ]
-    
-    for pattern, role in role_patterns:
-        for m in re.finditer(pattern, html_str):
-            role_positions.append((m.start(), role))
-    
-    role_positions.sort(key=lambda x: x[0])
-    
-    player_links = soup.find_all('a', href=re.compile(r'/profiles/\d+/'))
-    
-    for link in player_links:
+    link_count = 0
+    link_total = len(soup.find_all('a', href=PROFILE_LINK_PATTERN)) if progress else None
+    
+    for link, current_role in iter_player_links_with_roles(soup):
+        if progress and link_count:
+            # Commit first so a cancellation keeps the players saved so far
+            conn.commit()
+            progress(link_count, link_total, f'{player_count} new players for {team_name}')
+        link_count += 1
         href = link.get('href', '')
         player_match = re.search(r'/profiles/(\d+)/([^/]+)', href)
         
@@ -1017,16 +1199,6 @@ def scrape_players_from_team(team_id):
         if not player_name or len(player_name) < 2:
             continue
         
-        link_html = str(link)
-        link_pos = html_str.find(link_html)
-        
-        current_role = 'Batter'
-        for pos, role in role_positions:
-            if pos < link_pos:
-                current_role = role
-            else:
-                break
-        
         img = link.find('img')
         image_url = ''
         if img and img.get('src'):
@@ -1048,40 +1220,21 @@ def scrape_players_from_team(team_id):
     cur.close()
     conn.close()
     
+    metrics.SCRAPE_PARSE_SECONDS.observe(time.perf_counter() - parse_started, target='scrape_players_from_team')
+    metrics.record_scrape('scrape_players_from_team', items=link_count, rows=player_count)
+    
     return {'success': True, 'message': f'Successfully scraped {player_count} players for {team_name}'}
 
 
-def scrape_player_profile(player_id):
-    import json
-    conn = get_db()
-    cur = conn.cursor()
-    
-    cur.execute('SELECT id, name, cricbuzz_id, slug, profile_url FROM players WHERE id = %s', (player_id,))
-    player = cur.fetchone()
-    
-    if not player:
-        cur.close()
-        conn.close()
-        return {'success': False, 'message': 'Player not found'}
-    
-    profile_url = player.get('profile_url')
-    if not profile_url:
-        profile_url = f"https://www.cricbuzz.com/profiles/{player['cricbuzz_id']}/{player['slug']}"
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-    }
-    
-    try:
-        response = requests.get(profile_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        html = response.text
-    except Exception as e:
-        cur.close()
-        conn.close()
-        return {'success': False, 'message': f'Request error: {str(e)}'}
-    
+PROFILE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+}
+PROFILE_FETCH_WORKERS = 4
+PROFILE_BATCH_SIZE = 25
+
+def parse_player_profile(html):
+    """Parse personal info, career stats and career timeline from a Cricbuzz profile page"""
     soup = BeautifulSoup(html, 'lxml')
     
     personal_info = {}
@@ -1160,9 +1313,45 @@ def scrape_player_profile(player_id):
                                 'last_match': last_text
                             })
     
+    return personal_info, batting_stats, bowling_stats, career_timeline
+
+def fetch_player_profile(player):
+    """Fetch and parse one player's profile; returns the parsed tuple or raises on request errors"""
+    profile_url = player.get('profile_url')
+    if not profile_url:
+        profile_url = f"https://www.cricbuzz.com/profiles/{player['cricbuzz_id']}/{player['slug']}"
+    
+    response = fetch_page(profile_url, PROFILE_HEADERS, 'scrape_player_profile')
+    response.raise_for_status()
+    
+    parse_started = time.perf_counter()
+    profile = parse_player_profile(response.text)
+    metrics.SCRAPE_PARSE_SECONDS.observe(time.perf_counter() - parse_started, target='scrape_player_profile')
+    return profile
+
+def scrape_player_profile(player_id):
+    import json
+    conn = get_db()
+    cur = conn.cursor()
+    
+    cur.execute('SELECT id, name, cricbuzz_id, slug, profile_url FROM players WHERE id = %s', (player_id,))
+    player = cur.fetchone()
+    
+    if not player:
+        cur.close()
+        conn.close()
+        return {'success': False, 'message': 'Player not found'}
+    
+    try:
+        personal_info, batting_stats, bowling_stats, career_timeline = fetch_player_profile(player)
+    except Exception as e:
+        cur.close()
+        conn.close()
+        return {'success': False, 'message': f'Request error: {str(e)}'}
+    
     cur.execute('''
         UPDATE players 
-        SET personal_info = %s, batting_stats = %s, bowling_stats = %s, career_timeline = %s, profile_scraped = TRUE
+        SET personal_info = %s, batting_stats = %s, bowling_stats = %s, career_timeline = %s, profile_scraped = TRUE, profile_scraped_at = CURRENT_TIMESTAMP
         WHERE id = %s
     ''', (json.dumps(personal_info), json.dumps(batting_stats), json.dumps(bowling_stats), json.dumps(career_timeline), player_id))
     
@@ -1170,4 +1359,85 @@ def scrape_player_profile(player_id):
     cur.close()
     conn.close()
     
+    metrics.record_scrape('scrape_player_profile', items=len(batting_stats) + len(bowling_stats), rows=1)
+    
     return {'success': True, 'message': f'Profile scraped for {player["name"]}'}
+
+def _fetch_player_profile_or_none(player):
+    try:
+        return fetch_player_profile(player)
+    except Exception as e:
+        print(f"Profile scrape failed for {player['name']}: {e}")
+        return None
+
+def scrape_player_profiles(team_id=None, stale_days=30, refreshed_before=None, progress=None):
+    """Scrape profiles for one team, or for every player whose profile is missing or stale.
+    
+    Profiles are fetched concurrently through the shared rate limiter and written back
+    in chunks, each in one UPDATE and its own commit. Players refreshed after
+    refreshed_before are skipped, so re-running an interrupted batch resumes it.
+    """
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+    from datetime import datetime, timedelta
+    from psycopg2.extras import execute_values
+    
+    if refreshed_before is None:
+        refreshed_before = datetime.now() if team_id else datetime.now() - timedelta(days=stale_days)
+    
+    conn = get_db()
+    cur = conn.cursor()
+    
+    if team_id:
+        cur.execute('''
+            SELECT id, name, cricbuzz_id, slug, profile_url FROM players
+            WHERE team_id = %s AND (profile_scraped_at IS NULL OR profile_scraped_at < %s)
+            ORDER BY id
+        ''', (team_id, refreshed_before))
+    else:
+        cur.execute('''
+            SELECT id, name, cricbuzz_id, slug, profile_url FROM players
+            WHERE profile_scraped IS NOT TRUE OR profile_scraped_at IS NULL OR profile_scraped_at < %s
+            ORDER BY id
+        ''', (refreshed_before,))
+    players = cur.fetchall()
+    
+    total = len(players)
+    scraped = 0
+    failed = 0
+    stopped = False
+    
+    with ThreadPoolExecutor(max_workers=PROFILE_FETCH_WORKERS) as pool:
+        for start in range(0, total, PROFILE_BATCH_SIZE):
+            if ratelimit.is_paused():
+                stopped = True
+                break
+            chunk = players[start:start + PROFILE_BATCH_SIZE]
+            rows = []
+            for player, profile in zip(chunk, pool.map(_fetch_player_profile_or_none, chunk)):
+                if profile is None:
+                    failed += 1
+                    continue
+                rows.append((player['id'],) + tuple(json.dumps(part) for part in profile))
+            
+            if rows:
+                execute_values(cur, '''
+                    UPDATE players AS p
+                    SET personal_info = v.personal_info, batting_stats = v.batting_stats, bowling_stats = v.bowling_stats,
+                        career_timeline = v.career_timeline, profile_scraped = TRUE, profile_scraped_at = CURRENT_TIMESTAMP
+                    FROM (VALUES %s) AS v(id, personal_info, batting_stats, bowling_stats, career_timeline)
+                    WHERE p.id = v.id
+                ''', rows, template='(%s, %s::jsonb, %s::jsonb, %s::jsonb, %s::jsonb)')
+                conn.commit()
+                scraped += len(rows)
+                metrics.SCRAPE_ROWS.inc(len(rows), target='scrape_player_profile')
+            
+            if progress:
+                progress(start + len(chunk), total, f'{scraped} profiles scraped, {failed} failed')
+    
+    cur.close()
+    conn.close()
+    
+    if stopped:
+        return {'success': False, 'message': f'Stopped after {scraped} of {total} profiles: Cricbuzz requests paused after repeated failures'}
+    return {'success': True, 'message': f'Scraped {scraped} of {total} player profiles ({failed} failed)'}
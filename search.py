@@ -0,0 +1,139 @@
+"""Full-text search over players, teams, series, matches and posts.
+
+Each searchable table has a generated search_vector tsvector column with a
+GIN index (see init_db), so Postgres keeps it current on every insert and
+update from the scrapers and admin CRUD. Queries match each word as a
+prefix and are ranked, ordered and paginated by ts_rank in SQL. Facet counts
+come from a separate count per type that stops at FACET_CAP, so very common
+prefixes stay fast on large tables.
+"""
+import re
+
+from scraper import get_db
+
+FACET_CAP = 500
+MAX_TERMS = 8
+
+SEARCH_TYPES = {
+    'player': {
+        'label': 'Players',
+        'columns': 'p.id, p.name AS title, p.slug, p.role, t.name AS team_name, ts_rank(p.search_vector, query) AS rank',
+        'from': "players p LEFT JOIN teams t ON t.id = p.team_id, to_tsquery('simple', %(query)s) query",
+        'where': 'p.search_vector @@ query AND p.is_published'
+    },
+    'team': {
+        'label': 'Teams',
+        'columns': 'id, name AS title, slug, country, team_type, ts_rank(search_vector, query) AS rank',
+        'from': "teams, to_tsquery('simple', %(query)s) query",
+        'where': 'search_vector @@ query AND is_published'
+    },
+    'series': {
+        'label': 'Series',
+        'columns': 'id, series_name AS title, slug, date_range, ts_rank(search_vector, query) AS rank',
+        'from': "series, to_tsquery('simple', %(query)s) query",
+        'where': 'search_vector @@ query'
+    },
+    'match': {
+        'label': 'Matches',
+        'columns': 'id, match_title AS title, slug, match_id, match_date, ts_rank(search_vector, query) AS rank',
+        'from': "matches, to_tsquery('simple', %(query)s) query",
+        'where': 'search_vector @@ query'
+    },
+    'post': {
+        'label': 'Posts',
+        'columns': 'id, title, slug, excerpt, ts_rank(search_vector, query) AS rank',
+        'from': "posts, to_tsquery('simple', %(query)s) query",
+        'where': 'search_vector @@ query AND is_published'
+    },
+}
+
+
+def _page_sql(spec):
+    return f"""
+        SELECT {spec['columns']} FROM {spec['from']}
+        WHERE {spec['where']}
+        ORDER BY rank DESC, title, id
+        LIMIT %(limit)s OFFSET %(offset)s
+    """
+
+
+def _count_sql(spec):
+    return f"""
+        SELECT count(*) AS matches FROM (
+            SELECT 1 FROM {spec['from']} WHERE {spec['where']} LIMIT %(cap)s
+        ) c
+    """
+
+
+def build_tsquery(q):
+    """Turn free text into a prefix tsquery ('ind pak' -> 'ind:* & pak:*'), or '' if nothing searchable"""
+    terms = re.findall(r'\w+', (q or '').lower())
+    # Stray single letters ("t20i's" -> "s") would match almost everything as a prefix
+    terms = [term for term in terms if len(term) > 1] or terms[:1]
+    terms = terms[:MAX_TERMS]
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def _result(search_type, row):
+    if search_type == 'player':
+        subtitle = ' • '.join(part for part in (row['role'], row['team_name']) if part)
+        url = f"/player/{row['slug']}"
+    elif search_type == 'team':
+        subtitle = row['country'] or (row['team_type'] or '').title()
+        url = f"/team/{row['slug']}"
+    elif search_type == 'series':
+        subtitle = row['date_range'] or ''
+        url = f"/cricket-series/{row['slug']}" if row['slug'] else f"/series/{row['id']}"
+    elif search_type == 'match':
+        subtitle = row['match_date'] or ''
+        url = f"/cricket-match/{row['slug']}" if row['slug'] else f"/match-score/{row['match_id']}"
+    else:
+        subtitle = row['excerpt'] or ''
+        url = f"/post/{row['slug']}"
+    return {'type': search_type, 'title': row['title'], 'subtitle': subtitle, 'url': url, 'rank': round(row['rank'], 4)}
+
+
+def search(q, search_type=None, limit=20, offset=0):
+    """Ranked results for q, optionally restricted to one type, with per-type match counts as facets.
+
+    Facet counts stop at FACET_CAP; facets_capped lists the types that hit it.
+    """
+    query = build_tsquery(q)
+    if not query:
+        return {'success': True, 'query': q or '', 'results': [], 'facets': {}, 'facets_capped': [], 'has_more': False}
+
+    conn = get_db()
+    cur = conn.cursor()
+    facets = {}
+    capped = []
+    for name, spec in SEARCH_TYPES.items():
+        cur.execute(_count_sql(spec), {'query': query, 'cap': FACET_CAP})
+        facets[name] = cur.fetchone()['matches']
+        if facets[name] >= FACET_CAP:
+            capped.append(name)
+
+    if search_type in SEARCH_TYPES:
+        # One type: the database pages it directly
+        types, params, skip = [search_type], {'limit': limit + 1, 'offset': offset}, 0
+    else:
+        # All types: the top offset + limit of the merged list are among the top offset + limit of each type
+        types, params, skip = list(SEARCH_TYPES), {'limit': offset + limit + 1, 'offset': 0}, offset
+    matches = []
+    for name in types:
+        if not facets[name]:
+            continue
+        cur.execute(_page_sql(SEARCH_TYPES[name]), dict(params, query=query))
+        matches.extend((row['rank'], name, row) for row in cur.fetchall())
+    cur.close()
+    conn.close()
+
+    matches.sort(key=lambda m: (-m[0], m[2]['title'] or ''))
+    page = matches[skip:skip + limit]
+    return {
+        'success': True,
+        'query': q,
+        'results': [_result(name, row) for _, name, row in page],
+        'facets': facets,
+        'facets_capped': capped,
+        'has_more': len(matches) > skip + limit
+    }
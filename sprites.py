@@ -0,0 +1,140 @@
+"""Team flag sprite sheet built from the mirrored flags of published teams.
+
+build_flag_sprite() packs every flag into one WebP image plus a stylesheet
+with a .flag-<slug> background-position rule per team, both stored
+content-addressed next to the mirrored images. Pages link the stylesheet
+once and render flags as sprite spans instead of one <img> per team.
+"""
+import io
+import json
+import math
+import os
+import re
+import threading
+import time
+
+from PIL import Image, ImageOps
+
+import mirror
+from scraper import get_db
+
+DISPLAY_SIZE = (24, 16)
+SCALE = 2
+SETTING_KEY = 'flag_sprite'
+REFRESH_INTERVAL = 60
+
+_manifest = {}
+_loaded_at = 0
+_refresh_lock = threading.Lock()
+
+
+def _css_class(slug):
+    return 'flag-' + re.sub(r'[^a-z0-9-]+', '-', slug.lower()).strip('-')
+
+
+def build_flag_sprite():
+    """Rebuild the sprite sheet and stylesheet from the flags of published teams"""
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT t.name, t.slug, m.filename
+        FROM teams t
+        JOIN mirrored_images m ON m.source_url = t.flag_url AND m.status = 'ok'
+        WHERE t.is_published = TRUE
+        ORDER BY t.slug
+    ''')
+    teams = cur.fetchall()
+
+    cell_w, cell_h = DISPLAY_SIZE[0] * SCALE, DISPLAY_SIZE[1] * SCALE
+    columns = max(1, math.ceil(math.sqrt(len(teams))))
+    rows = max(1, math.ceil(len(teams) / columns))
+    sheet = Image.new('RGBA', (columns * cell_w, rows * cell_h), (0, 0, 0, 0))
+
+    rules = []
+    classes = {}
+    placed = 0
+    for team in teams:
+        css_class = _css_class(team['slug'])
+        try:
+            with Image.open(os.path.join(mirror.MIRROR_DIR, team['filename'])) as flag:
+                flag = ImageOps.fit(flag.convert('RGBA'), (cell_w, cell_h), Image.Resampling.LANCZOS)
+        except OSError as e:
+            print(f"Flag sprite: skipping {team['slug']}: {e}")
+            continue
+        x, y = (placed % columns) * cell_w, (placed // columns) * cell_h
+        sheet.paste(flag, (x, y))
+        rules.append(f".{css_class}{{background-position:-{x // SCALE}px -{y // SCALE}px}}")
+        classes[team['name'].lower()] = f"flag-sprite {css_class}"
+        placed += 1
+
+    if not placed:
+        cur.close()
+        conn.close()
+        return {'success': True, 'message': 'No mirrored team flags to build a sprite from'}
+
+    used_rows = math.ceil(placed / columns)
+    sheet = sheet.crop((0, 0, columns * cell_w, used_rows * cell_h))
+    buffer = io.BytesIO()
+    sheet.save(buffer, 'WEBP', quality=90, method=6)
+    sprite_file = mirror.store(buffer.getvalue(), 'webp')
+
+    css = (
+        f".flag-sprite{{display:inline-block;flex-shrink:0;background:url(/media/{sprite_file}) no-repeat;"
+        f"background-size:{columns * DISPLAY_SIZE[0]}px {used_rows * DISPLAY_SIZE[1]}px}}\n"
+        + '\n'.join(rules) + '\n'
+    )
+    css_file = mirror.store(css.encode('utf-8'), 'css')
+
+    manifest = {'css': f"/media/{css_file}", 'classes': classes}
+    cur.execute('''
+        INSERT INTO site_settings (setting_key, setting_value) VALUES (%s, %s)
+        ON CONFLICT (setting_key) DO UPDATE SET setting_value = EXCLUDED.setting_value, updated_at = CURRENT_TIMESTAMP
+    ''', (SETTING_KEY, json.dumps(manifest)))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    _invalidate()
+    message = f'Built flag sprite with {placed} teams ({len(buffer.getvalue())} bytes)'
+    print(f"Flag sprite: {message}")
+    return {'success': True, 'message': message}
+
+
+def _invalidate():
+    global _loaded_at
+    _loaded_at = 0
+
+
+def _refresh():
+    global _manifest, _loaded_at
+    try:
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute('SELECT setting_value FROM site_settings WHERE setting_key = %s', (SETTING_KEY,))
+        row = cur.fetchone()
+        cur.close()
+        conn.close()
+        _manifest = json.loads(row['setting_value']) if row and row['setting_value'] else {}
+    except Exception as e:
+        print(f"Flag sprite lookup error: {e}")
+    _loaded_at = time.monotonic()
+
+
+def _current():
+    if time.monotonic() - _loaded_at > REFRESH_INTERVAL:
+        with _refresh_lock:
+            if time.monotonic() - _loaded_at > REFRESH_INTERVAL:
+                _refresh()
+    return _manifest
+
+
+def stylesheet_url():
+    """URL of the current sprite stylesheet, or '' before the first build"""
+    return _current().get('css', '')
+
+
+def flag_class(team_name):
+    """CSS classes that draw team_name's flag from the sprite, or '' if it is not in the sprite"""
+    if not team_name:
+        return ''
+    return _current().get('classes', {}).get(team_name.lower(), '')
@@ -0,0 +1,92 @@
+"""Series points tables derived from recorded match results.
+
+series_standings keeps one row per series and team holding running totals:
+results (won, lost, tied, drawn, no result), points, and the runs and balls
+behind net run rate. apply() adds a single finalized result to those totals
+with an upsert, so a result landing in a 70-match league touches two rows
+instead of recomputing the series, and NRR is worked out from the stored sums
+when the table is read.
+"""
+RESULT_POINTS = {'win': 2, 'loss': 0, 'tie': 1, 'no_result': 1, 'draw': 1}
+# An all-out side counts as having faced its full quota of overs for NRR
+QUOTA_BALLS = {'T20': 120, 'T20I': 120, 'ODI': 300}
+
+
+def _innings_balls(innings, quota):
+    if quota and innings['wickets'] >= 10:
+        return quota
+    return innings.get('balls')
+
+
+def _team_line(result, team, opponent):
+    """Increments for one side of a result: (won, lost, tied, drawn, no_result, points, runs_for, balls_for, runs_against, balls_against)"""
+    # A tie decided by a super over is a win for the super over winner, as in league tables
+    if result['winner']:
+        outcome = 'win' if result['winner'] == team else 'loss'
+    else:
+        outcome = result['result_type']
+
+    runs_for = balls_for = runs_against = balls_against = 0
+    quota = QUOTA_BALLS.get(result['match_format'])
+    batted = next((i for i in result['innings'] if i['team'] == team), None)
+    bowled = next((i for i in result['innings'] if i['team'] == opponent), None)
+    # Only completed matches count towards NRR, and only when both innings' balls are known
+    if outcome != 'no_result' and result['match_format'] != 'Test' and batted and bowled:
+        faced, delivered = _innings_balls(batted, quota), _innings_balls(bowled, quota)
+        if faced and delivered:
+            runs_for, balls_for = batted['runs'], faced
+            runs_against, balls_against = bowled['runs'], delivered
+
+    return (
+        outcome == 'win', outcome == 'loss', outcome == 'tie', outcome == 'draw', outcome == 'no_result',
+        RESULT_POINTS[outcome], runs_for, balls_for, runs_against, balls_against
+    )
+
+
+def apply(cur, result):
+    """Fold one match_results row into its series table. Runs in the caller's transaction"""
+    if not result.get('series_id'):
+        return
+    if result['result_type'] == 'win' and not result['winner']:
+        print(f"Standings: skipping match {result['match_id']}, winner could not be matched to either team")
+        return
+    for team, opponent in ((result['team1'], result['team2']), (result['team2'], result['team1'])):
+        cur.execute('''
+            INSERT INTO series_standings (series_id, team, played, won, lost, tied, drawn, no_result, points,
+                                          runs_for, balls_for, runs_against, balls_against)
+            VALUES (%s, %s, 1, %s::int, %s::int, %s::int, %s::int, %s::int, %s, %s, %s, %s, %s)
+            ON CONFLICT (series_id, team) DO UPDATE SET
+                played = series_standings.played + 1,
+                won = series_standings.won + EXCLUDED.won,
+                lost = series_standings.lost + EXCLUDED.lost,
+                tied = series_standings.tied + EXCLUDED.tied,
+                drawn = series_standings.drawn + EXCLUDED.drawn,
+                no_result = series_standings.no_result + EXCLUDED.no_result,
+                points = series_standings.points + EXCLUDED.points,
+                runs_for = series_standings.runs_for + EXCLUDED.runs_for,
+                balls_for = series_standings.balls_for + EXCLUDED.balls_for,
+                runs_against = series_standings.runs_against + EXCLUDED.runs_against,
+                balls_against = series_standings.balls_against + EXCLUDED.balls_against,
+                updated_at = CURRENT_TIMESTAMP
+        ''', (result['series_id'], team) + _team_line(result, team, opponent))
+
+
+def rebuild(cur):
+    """Recompute every series table from match_results"""
+    cur.execute('DELETE FROM series_standings')
+    cur.execute('SELECT * FROM match_results WHERE series_id IS NOT NULL ORDER BY match_id')
+    for result in cur.fetchall():
+        apply(cur, result)
+
+
+def points_table(cur, series_id):
+    """Standings sorted by points then NRR, or [] for series with fewer than three teams"""
+    cur.execute('''
+        SELECT team, played, won, lost, tied, drawn, no_result, points,
+               ROUND((runs_for * 6.0 / NULLIF(balls_for, 0) - runs_against * 6.0 / NULLIF(balls_against, 0))::numeric, 3) AS nrr
+        FROM series_standings
+        WHERE series_id = %s
+        ORDER BY points DESC, nrr DESC NULLS LAST, won DESC, team
+    ''', (series_id,))
+    rows = cur.fetchall()
+    return rows if len(rows) >= 3 else []
@@ -0,0 +1,68 @@
+"""FastJSONProvider must produce exactly the bytes Flask's default provider does."""
+import datetime
+import decimal
+import os
+import sys
+import uuid
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from psycopg2.extras import RealDictRow
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_provider  # noqa: E402
+
+
+def _row(**values):
+    row = RealDictRow()
+    for key, value in values.items():
+        row[key] = value
+    return row
+
+
+PAYLOADS = {
+    'realdictrow': _row(match_id=101, team1_name='India', team2_name='Pakistan', is_live=True, venue=None),
+    'date': {'match_date': datetime.date(2026, 1, 14)},
+    'datetime': {'updated_at': datetime.datetime(2026, 1, 14, 9, 30, 5, 123456)},
+    'aware_datetime': {'updated_at': datetime.datetime(2026, 1, 14, 9, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=5, minutes=30)))},
+    'decimal': {'net_run_rate': decimal.Decimal('-0.125'), 'points': decimal.Decimal('12')},
+    'uuid': {'request_id': uuid.UUID('12345678-1234-5678-1234-567812345678')},
+    'rows': {'success': True, 'matches': [
+        _row(match_id=i, match_date=datetime.date(2026, 1, i), created_at=datetime.datetime(2026, 1, i, 12),
+             run_rate=decimal.Decimal('7.25'), analytics={'win_probability': {'IND': 61, 'PAK': 39}, 'target': None})
+        for i in range(1, 6)
+    ]},
+    'non_ascii': {'text': 'Müller drives, four — “superb”', 'venue': 'Wānkhede'},
+    'astral_and_del': {'reaction': 'Six! \U0001F3CF\U0001F525', 'raw': 'tab\tdel\x7f line\u2028sep', 'Ünïcode key': 1},
+    'empty': {'matches': [], 'analytics': {}},
+}
+
+
+def _apps(debug):
+    default_app = Flask(__name__)
+    fast_app = Flask(__name__)
+    fast_app.json = json_provider.FastJSONProvider(fast_app)
+    default_app.debug = fast_app.debug = debug
+    return default_app, fast_app
+
+
+@pytest.mark.parametrize('debug', [False, True])
+@pytest.mark.parametrize('name', sorted(PAYLOADS))
+def test_dumps_matches_default_provider(name, debug):
+    default_app, fast_app = _apps(debug)
+    assert isinstance(default_app.json, DefaultJSONProvider)
+    assert fast_app.json.dumps(PAYLOADS[name]) == default_app.json.dumps(PAYLOADS[name])
+
+
+@pytest.mark.parametrize('debug', [False, True])
+@pytest.mark.parametrize('name', sorted(PAYLOADS))
+def test_response_matches_default_provider(name, debug):
+    default_app, fast_app = _apps(debug)
+    with default_app.app_context():
+        expected = default_app.json.response(PAYLOADS[name])
+    with fast_app.app_context():
+        actual = fast_app.json.response(PAYLOADS[name])
+    assert actual.get_data() == expected.get_data()
+    assert actual.mimetype == expected.mimetype